@@ -0,0 +1,192 @@
+"""
+Benchmark suite: DBTLineageTracer on a generated synthetic project (see synthetic_project.py)
+
+Times tracer construction (cold and warm compact manifest), single-column traces,
+whole-table traces, project graph builds and visual DAG rendering, each on a fresh tracer, and reports the
+minimum and median of --repeat runs. Save a run with --output and pass it back later
+with --compare to flag scenarios that got slower than --tolerance allows.
+
+Usage:
+    python benchmarks/bench_lineage_engine.py --models 400 --depth 8 --fan-in 3 --output bench_baseline.json
+    python benchmarks/bench_lineage_engine.py --models 400 --depth 8 --fan-in 3 --compare bench_baseline.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import sqlglot
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import lineage_dag
+from dbt_lineage_tracer import DBTLineageTracer, build_comprehensive_technical_context, build_enhanced_visual_dag
+from manifest_loader import compact_manifest_path
+from synthetic_project import SHAPES, generate_project
+
+
+def time_runs(setup, action, repeat):
+    """
+    Run setup() then time action(setup_result) `repeat` times; returns per-run seconds
+    """
+    runs = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        action(state)
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def run_scenarios(project, repeat, trace_count, jobs=None):
+    """
+    Returns {scenario: [seconds per run]}
+    """
+    compiled_dir, manifest_path = project["compiled_dir"], project["manifest_path"]
+    marts = project["marts"][:trace_count]
+    columns = project["columns"]
+    staging = sorted(name for name in project["models"] if name.startswith("stg_"))
+
+    def new_tracer(_=None):
+        return DBTLineageTracer(compiled_dir, manifest_path=manifest_path)
+
+    def drop_compact_manifest():
+        compact_manifest_path(manifest_path).unlink(missing_ok=True)
+
+    def trace_columns(tracer):
+        for index, mart in enumerate(marts):
+            tracer.trace_column_lineage_across_files(mart, columns[1 + index % (len(columns) - 1)])
+
+    def trace_tables(tracer):
+        for mart in marts:
+            tracer.trace_table(mart)
+
+    def technical_contexts():
+        tracer = new_tracer()
+        contexts = [
+            build_comprehensive_technical_context(tracer, mart, columns[1 + index % (len(columns) - 1)])
+            for index, mart in enumerate(marts)
+        ]
+        lineage_dag._analysis_cache.clear()
+        return contexts
+
+    def render_dags(contexts):
+        for context in contexts:
+            build_enhanced_visual_dag(context)
+
+    def trace_impacts(tracer):
+        # No project graph: only models the identifier pre-scan cannot rule out are analysed
+        for index, model in enumerate(staging[:trace_count]):
+            tracer.trace_column_impact(model, columns[1 + index % (len(columns) - 1)])
+
+    scenarios = {
+        "construction_cold": time_runs(drop_compact_manifest, new_tracer, repeat),
+        "construction": time_runs(lambda: None, new_tracer, repeat),
+        "single_column_trace": time_runs(new_tracer, trace_columns, repeat),
+        "table_trace": time_runs(new_tracer, trace_tables, repeat),
+        "graph_build": time_runs(new_tracer, lambda tracer: tracer.build_project_lineage_graph(), repeat),
+        "dag_render": time_runs(technical_contexts, render_dags, repeat),
+        "impact_prescan": time_runs(new_tracer, trace_impacts, repeat),
+    }
+    if jobs:
+        scenarios[f"graph_build_jobs_{jobs}"] = time_runs(
+            new_tracer, lambda tracer: tracer.build_project_lineage_graph(jobs), repeat
+        )
+    return scenarios
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Scenarios whose median is more than `tolerance` times the baseline median
+    """
+    regressions = []
+    for scenario, current in results["results"].items():
+        previous = baseline.get("results", {}).get(scenario)
+        if previous and current["median"] > previous["median"] * tolerance:
+            regressions.append((scenario, previous["median"], current["median"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the lineage engine on a synthetic dbt project')
+    parser.add_argument('--models', type=int, default=200)
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--fan-in', type=int, default=2)
+    parser.add_argument('--shape', default='mixed', choices=SHAPES + ('mixed',))
+    parser.add_argument('--columns', type=int, default=20)
+    parser.add_argument('--snapshot-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--traces', type=int, default=5, help='Marts traced per trace scenario')
+    parser.add_argument('--jobs', '-j', type=int, help='Also time a parallel graph build with this many workers')
+    parser.add_argument('--project-dir', help='Generate the project here instead of a temporary directory')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Results JSON from an earlier run to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='Allowed slowdown factor of a median before --compare reports a regression (default: 1.25)')
+    args = parser.parse_args()
+
+    params = {key: getattr(args, key) for key in
+              ('models', 'depth', 'fan_in', 'shape', 'columns', 'snapshot_ratio', 'seed', 'repeat', 'traces', 'jobs')}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        project = generate_project(args.project_dir or tmp_dir, args.models, args.depth, args.fan_in,
+                                   args.shape, args.columns, args.snapshot_ratio, args.seed)
+        print(f"📊 LINEAGE ENGINE BENCHMARK: {len(project['models'])} models, depth {args.depth}, "
+              f"fan-in {args.fan_in}, shape {args.shape}, {args.columns} columns, {len(project['snapshots'])} snapshots")
+        scenarios = run_scenarios(project, args.repeat, args.traces, args.jobs)
+
+    results = {
+        "meta": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlglot": sqlglot.__version__,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "params": params,
+        "results": {
+            scenario: {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+            for scenario, runs in scenarios.items()
+        }
+    }
+
+    print(f"{'scenario':<24}{'min ms':>12}{'median ms':>12}")
+    for scenario, result in results["results"].items():
+        print(f"{scenario:<24}{result['min'] * 1000:>12.1f}{result['median'] * 1000:>12.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print(f"⚠️  Baseline was recorded with different parameters: {baseline.get('params')}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            for scenario, previous, current in regressions:
+                print(f"❌ REGRESSION {scenario}: {previous * 1000:.1f} ms -> {current * 1000:.1f} ms "
+                      f"({current / previous:.2f}x)")
+            sys.exit(1)
+        print(f"✅ No regressions against {args.compare} (tolerance {args.tolerance}x)")
+
+
+if __name__ == "__main__":
+    main()
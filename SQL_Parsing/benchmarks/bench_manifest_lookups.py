@@ -0,0 +1,132 @@
+"""
+Benchmark: indexed manifest lookups vs. the original linear scans over manifest nodes
+
+Generates a synthetic manifest (default 20,000 nodes, 2% snapshots), then resolves a
+mix of model, snapshot and unknown table references with both implementations,
+checks they agree, and prints the timings.
+
+Usage:
+    python benchmarks/bench_manifest_lookups.py --nodes 20000 --lookups 2000
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dbt_lineage_tracer import DBTLineageTracer
+
+
+def build_synthetic_manifest(node_count, snapshot_ratio=0.02, seed=7):
+    """
+    Manifest with node_count models/snapshots; every snapshot depends on two earlier models
+    """
+    rng = random.Random(seed)
+    nodes = {}
+    model_keys = []
+
+    for i in range(node_count):
+        is_snapshot = model_keys and rng.random() < snapshot_ratio
+        resource_type = "snapshot" if is_snapshot else "model"
+        name = f"snp_table_{i}" if is_snapshot else f"wrk_table_{i}"
+        key = f"{resource_type}.bench_project.{name}"
+        nodes[key] = {
+            "database": "PH_BENCH_DB",
+            "schema": f"SCHEMA_{i % 50}",
+            "name": name,
+            "alias": name,
+            "resource_type": resource_type,
+            "depends_on": {"nodes": rng.sample(model_keys, min(2, len(model_keys))) if is_snapshot else [], "macros": []},
+            "relation_name": f"\"PH_BENCH_DB\".\"SCHEMA_{i % 50}\".\"{name}\""
+        }
+        if not is_snapshot:
+            model_keys.append(key)
+
+    return {"metadata": {"adapter_type": "snowflake"}, "nodes": nodes, "sources": {}}
+
+
+def linear_check_snapshot(manifest_data, table_name):
+    """The pre-index snapshot matching loop, kept here as the benchmark baseline"""
+    for key, node in manifest_data.get('nodes', {}).items():
+        if not key.startswith('snapshot.'):
+            continue
+        clean_relation = node.get('relation_name', '').replace('"', '').lower()
+        clean_table_name = table_name.lower()
+        if (clean_relation == clean_table_name or
+            clean_relation.endswith(f".{clean_table_name}") or
+            node.get('name', '').lower() == clean_table_name or
+            node.get('alias', '').lower() == clean_table_name):
+            return node.get('depends_on', {}).get('nodes', [])
+    return []
+
+
+def linear_resolve_relation(manifest_data, table_reference):
+    """The pre-index relation_name resolution loop, kept here as the benchmark baseline"""
+    clean_table_ref = table_reference.replace('"', '').lower()
+    for key, node in manifest_data.get('nodes', {}).items():
+        relation_name = node.get('relation_name', '')
+        if not relation_name:
+            continue
+        clean_relation = relation_name.replace('"', '').lower()
+        if (clean_relation == clean_table_ref or
+            clean_relation.endswith(f".{clean_table_ref}") or
+            clean_table_ref.endswith(f".{clean_relation}") or
+            clean_relation.split('.')[-1] == clean_table_ref.split('.')[-1]):
+            return relation_name.replace('"', '')
+    return None
+
+
+def time_it(fn, references):
+    start = time.perf_counter()
+    results = [fn(reference) for reference in references]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark indexed vs linear manifest lookups')
+    parser.add_argument('--nodes', type=int, default=20000, help='Synthetic manifest size (default: 20000)')
+    parser.add_argument('--lookups', type=int, default=2000, help='Table references to resolve (default: 2000)')
+    args = parser.parse_args()
+
+    manifest = build_synthetic_manifest(args.nodes)
+    names = [node["name"] for node in manifest["nodes"].values()]
+    rng = random.Random(11)
+    references = []
+    for _ in range(args.lookups):
+        name = rng.choice(names)
+        references.append(rng.choice([name, f"ph_bench_db.schema_x.{name}", f"missing_{name}"]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest_path = Path(tmp) / "manifest.json"
+        manifest_path.write_text(json.dumps(manifest))
+        (Path(tmp) / "compiled").mkdir()
+
+        start = time.perf_counter()
+        tracer = DBTLineageTracer(str(Path(tmp) / "compiled"), manifest_path=str(manifest_path))
+        load_seconds = time.perf_counter() - start
+
+    linear_resolve_s, linear_resolved = time_it(lambda r: linear_resolve_relation(tracer.manifest_data, r), references)
+    indexed_resolve_s, indexed_resolved = time_it(tracer._resolve_table_to_relation_name, references)
+    assert linear_resolved == indexed_resolved, "indexed relation resolution disagrees with linear scan"
+
+    linear_snapshot_s, linear_snapshots = time_it(lambda r: linear_check_snapshot(tracer.manifest_data, r), references)
+    indexed_snapshot_s, indexed_snapshots = time_it(tracer._check_snapshot_dependencies, references)
+    assert [len(deps) for deps in linear_snapshots] == [len(deps) for deps in indexed_snapshots], \
+        "indexed snapshot matching disagrees with linear scan"
+
+    print(f"\n📊 MANIFEST LOOKUP BENCHMARK ({args.nodes} nodes, {args.lookups} lookups)")
+    print(f"Tracer construction incl. index build: {load_seconds * 1000:.1f} ms")
+    print(f"{'lookup':<28}{'linear (ms)':>14}{'indexed (ms)':>14}{'speedup':>10}")
+    for label, linear_s, indexed_s in [
+        ("_resolve_table_to_relation", linear_resolve_s, indexed_resolve_s),
+        ("_check_snapshot_dependencies", linear_snapshot_s, indexed_snapshot_s),
+    ]:
+        print(f"{label:<28}{linear_s * 1000:>14.1f}{indexed_s * 1000:>14.1f}{linear_s / max(indexed_s, 1e-9):>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Micro-benchmark: single-pass column tracing over the compiled models in target/compiled
+
+Traces every output column of every compiled model (or only --model) with
+column_lineage.trace_column_lineage and reports wall time and the number of
+sqlglot.parse_one calls. Pass --baseline with another copy of column_lineage.py
+(e.g. `git show <rev>:SQL_Parsing/column_lineage.py > /tmp/old_column_lineage.py`)
+to time it on the same workload and check both produce identical results.
+
+Usage:
+    python benchmarks/bench_single_pass.py --model wrk_multi_channel_sales --repeat 20
+    python benchmarks/bench_single_pass.py --baseline /tmp/old_column_lineage.py
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import sys
+import time
+from pathlib import Path
+
+import sqlglot
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import column_lineage
+
+
+def load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def collect_workload(compiled_dir, model=None):
+    """
+    (model name, sql, output column) for every non-star output column
+    """
+    workload = []
+    for sql_file in sorted(Path(compiled_dir).rglob("*.sql")):
+        if model and sql_file.stem != model:
+            continue
+        sql = sql_file.read_text(encoding='utf-8')
+        with contextlib.redirect_stdout(io.StringIO()):
+            columns = column_lineage.extract_snowflake_columns(sql)
+        names = {}
+        for select_columns in columns:
+            for col_info in select_columns:
+                if col_info["type"] != "star":
+                    names.setdefault(col_info["target_column"].lower(), col_info["target_column"])
+        workload.extend((sql_file.stem, sql, name) for name in names.values())
+    return workload
+
+
+def run(module, workload, repeat):
+    """
+    Returns (seconds, parse_one calls, results) for tracing the whole workload `repeat` times
+    """
+    parse_calls = 0
+    original_parse_one = sqlglot.parse_one
+
+    def counting_parse_one(*args, **kwargs):
+        nonlocal parse_calls
+        parse_calls += 1
+        return original_parse_one(*args, **kwargs)
+
+    sqlglot.parse_one = counting_parse_one
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                results = [module.trace_column_lineage(sql, column) for _, sql, column in workload]
+            elapsed = time.perf_counter() - start
+    finally:
+        sqlglot.parse_one = original_parse_one
+
+    return elapsed, parse_calls // repeat, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark single-pass column tracing')
+    parser.add_argument('--compiled-dir', default=str(BASE_DIR / 'target' / 'compiled'))
+    parser.add_argument('--model', help='Only trace this model (e.g. wrk_multi_channel_sales)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', help='Path to another column_lineage.py to compare against')
+    args = parser.parse_args()
+
+    workload = collect_workload(args.compiled_dir, args.model)
+    models = len({name for name, _, _ in workload})
+    print(f"📊 SINGLE-PASS TRACE BENCHMARK: {len(workload)} columns in {models} model(s), {args.repeat} repeat(s)")
+
+    current_s, current_parses, current_results = run(column_lineage, workload, args.repeat)
+    print(f"{'implementation':<16}{'ms / pass':>12}{'parse_one / pass':>18}")
+    print(f"{'current':<16}{current_s / args.repeat * 1000:>12.1f}{current_parses:>18}")
+
+    if args.baseline:
+        baseline = load_module(args.baseline, "baseline_column_lineage")
+        baseline_s, baseline_parses, baseline_results = run(baseline, workload, args.repeat)
+        print(f"{'baseline':<16}{baseline_s / args.repeat * 1000:>12.1f}{baseline_parses:>18}")
+        print(f"speedup: {baseline_s / max(current_s, 1e-9):.1f}x")
+
+        mismatches = [
+            f"{model}.{column}" for (model, _, column), ours, theirs in zip(workload, current_results, baseline_results)
+            if ours.get("next_columns_to_search") != theirs.get("next_columns_to_search")
+            or ours.get("llm_context") != theirs.get("llm_context")
+        ]
+        if mismatches:
+            print(f"⚠️  {len(mismatches)} column(s) differ from baseline: {', '.join(mismatches[:10])}")
+        else:
+            print("✅ Results identical to baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Synthetic compiled dbt project generator for benchmarking the lineage engine
+
+Writes <output_dir>/compiled/<layer>/<model>.sql plus a matching <output_dir>/manifest.json.
+The DAG has `depth` layers: stg_ models read raw sources, wrk_ models read `fan_in`
+models of the layer below (or a snapshot of them), and the last layer is fct_ marts.
+Every model projects id plus col_0..col_{columns-1}, so any mart column traces all the
+way down to the raw sources.
+
+Model shapes (--shape, "mixed" rotates through all of them):
+    join   explicit projection over a join of the parents, with computed expressions
+    cte    the same, spread across a chain of three CTEs
+    union  UNION ALL of the parents, one branch each
+    star   SELECT * from one parent (wide pass-through chains)
+
+Usage:
+    python benchmarks/synthetic_project.py /tmp/bench_project --models 500 --depth 8 --fan-in 3 --shape mixed
+"""
+import argparse
+import hashlib
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+SHAPES = ('join', 'cte', 'union', 'star')
+DATABASE = 'ph_bench_db'
+RAW_DATABASE = 'raw_bench_db'
+PROJECT = 'bench'
+
+
+def _layer(level: int, depth: int) -> str:
+    if level == 0:
+        return 'staging'
+    if level == depth - 1:
+        return 'marts'
+    return 'work'
+
+
+def _model_name(level: int, depth: int, index: int) -> str:
+    prefix = {'staging': 'stg', 'work': 'wrk', 'marts': 'fct'}[_layer(level, depth)]
+    return f"{prefix}_l{level}_{index:05d}"
+
+
+def _reference(name: str, layer: str) -> str:
+    return f"{DATABASE}.{layer}.{name}"
+
+
+def _expression(column: str, aliases: List[str], position: int) -> str:
+    """
+    A computed expression over the same column of every parent, varied by column position
+    """
+    refs = [f"{alias}.{column}" for alias in aliases]
+    kind = position % 4
+    if kind == 0:
+        return refs[0]
+    if kind == 1:
+        return " + ".join(refs)
+    if kind == 2:
+        return f"coalesce({', '.join(refs)}, 0)"
+    return f"case when {refs[0]} > 0 then {refs[-1]} else 0 end"
+
+
+def _staging_sql(name: str, source: str, columns: int) -> str:
+    column_lines = ",\n    ".join(["id"] + [f"col_{c}" for c in range(columns)])
+    return f"-- Compiled {name} model (staging layer)\nselect\n    {column_lines}\nfrom {source}\nwhere id is not null"
+
+
+def _join_select(parents: List[str], columns: int) -> str:
+    aliases = [f"p{i}" for i in range(len(parents))]
+    projections = [f"{aliases[0]}.id"] + [
+        f"{_expression(f'col_{c}', aliases, c)} as col_{c}" for c in range(columns)
+    ]
+    joins = "\n".join(
+        f"left join {parent} {alias} on {aliases[0]}.id = {alias}.id"
+        for parent, alias in zip(parents[1:], aliases[1:])
+    )
+    sql = "select\n    " + ",\n    ".join(projections) + f"\nfrom {parents[0]} {aliases[0]}"
+    return sql + ("\n" + joins if joins else "")
+
+
+def _cte_sql(name: str, parents: List[str], columns: int) -> str:
+    column_list = ",\n        ".join(["id"] + [f"col_{c}" for c in range(columns)])
+    adjusted = ",\n        ".join(["id"] + [
+        f"col_{c} * 1.1 as col_{c}" if c % 3 == 0 else f"col_{c}" for c in range(columns)
+    ])
+    joined = _join_select(parents, columns).replace("\n", "\n    ")
+    return (
+        f"-- Compiled {name} model (CTE chain)\n"
+        f"with joined as (\n    {joined}\n),\n"
+        f"adjusted as (\n    select\n        {adjusted}\n    from joined\n),\n"
+        f"filtered as (\n    select\n        {column_list}\n    from adjusted\n    where id is not null\n)\n"
+        f"select\n    {column_list.replace(chr(10) + '        ', chr(10) + '    ')}\nfrom filtered"
+    )
+
+
+def _union_sql(name: str, parents: List[str], columns: int) -> str:
+    column_lines = ",\n    ".join(["id"] + [f"col_{c}" for c in range(columns)])
+    branches = [f"select\n    {column_lines}\nfrom {parent}" for parent in parents]
+    return f"-- Compiled {name} model (UNION ALL)\n" + "\n\nunion all\n\n".join(branches)
+
+
+def _model_sql(name: str, shape: str, parents: List[str], columns: int) -> str:
+    if shape == 'star':
+        return f"-- Compiled {name} model (SELECT * pass-through)\nselect *\nfrom {parents[0]}"
+    if shape == 'cte':
+        return _cte_sql(name, parents, columns)
+    if shape == 'union':
+        return _union_sql(name, parents, columns)
+    return f"-- Compiled {name} model (join)\n" + _join_select(parents, columns)
+
+
+def _manifest_node(name: str, schema: str, resource_type: str, depends_on: List[str], sql: str = "") -> Dict:
+    return {
+        "resource_type": resource_type,
+        "name": name,
+        "alias": name,
+        "database": DATABASE.upper(),
+        "schema": schema.upper(),
+        "relation_name": f'"{DATABASE.upper()}"."{schema.upper()}"."{name}"',
+        "depends_on": {"nodes": depends_on, "macros": []},
+        "checksum": {"name": "sha256", "checksum": hashlib.sha256(sql.encode('utf-8')).hexdigest()}
+    }
+
+
+def generate_project(output_dir: str, models: int = 200, depth: int = 6, fan_in: int = 2,
+                     shape: str = 'mixed', columns: int = 20, snapshot_ratio: float = 0.05,
+                     seed: int = 7) -> Dict:
+    """
+    Generate a synthetic compiled project; see the module docstring for its structure
+
+    Returns:
+        Dict with "compiled_dir", "manifest_path", "models" (name -> layer), "marts", "snapshots" and "columns"
+    """
+    if depth < 2:
+        raise ValueError("depth must be at least 2 (staging + marts)")
+    if shape != 'mixed' and shape not in SHAPES:
+        raise ValueError(f"Unknown shape {shape!r}; expected one of {', '.join(SHAPES)} or 'mixed'")
+
+    rng = random.Random(seed)
+    output = Path(output_dir)
+    compiled_dir = output / "compiled"
+
+    # Spread models over the layers, at least one per layer
+    per_level = [max(1, models // depth)] * depth
+    per_level[0] += max(0, models - sum(per_level))
+
+    nodes = {}
+    layers: List[List[str]] = []
+    model_layers = {}
+    snapshot_of = {}
+    model_counter = 0
+
+    for level in range(depth):
+        layer = _layer(level, depth)
+        level_models = []
+        for index in range(per_level[level]):
+            name = _model_name(level, depth, index)
+            if level == 0:
+                source = f"{RAW_DATABASE}.public.src_{index:05d}"
+                sql = _staging_sql(name, source, columns)
+                depends_on = [f"source.{PROJECT}.raw.src_{index:05d}"]
+            else:
+                model_shape = SHAPES[model_counter % len(SHAPES)] if shape == 'mixed' else shape
+                parent_names = rng.sample(layers[-1], min(fan_in, len(layers[-1])))
+                parents = []
+                depends_on = []
+                for parent in parent_names:
+                    if parent in snapshot_of:
+                        parents.append(_reference(snapshot_of[parent], 'snapshots'))
+                        depends_on.append(f"snapshot.{PROJECT}.{snapshot_of[parent]}")
+                    else:
+                        parents.append(_reference(parent, model_layers[parent]))
+                        depends_on.append(f"model.{PROJECT}.{parent}")
+                sql = _model_sql(name, model_shape, parents, columns)
+            model_counter += 1
+
+            model_path = compiled_dir / layer / f"{name}.sql"
+            model_path.parent.mkdir(parents=True, exist_ok=True)
+            model_path.write_text(sql, encoding='utf-8')
+
+            nodes[f"model.{PROJECT}.{name}"] = _manifest_node(name, layer, "model", depends_on, sql)
+            model_layers[name] = layer
+            level_models.append(name)
+
+            # Snapshot some non-mart models; downstream models then read the snapshot instead
+            if 0 < level < depth - 1 and rng.random() < snapshot_ratio:
+                snapshot = f"snp_{name}"
+                snapshot_of[name] = snapshot
+                nodes[f"snapshot.{PROJECT}.{snapshot}"] = _manifest_node(
+                    snapshot, "snapshots", "snapshot", [f"model.{PROJECT}.{name}"]
+                )
+        layers.append(level_models)
+
+    manifest_path = output / "manifest.json"
+    manifest = {
+        "metadata": {"dbt_version": "1.7.0", "adapter_type": "snowflake", "project_name": PROJECT},
+        "nodes": nodes,
+        "sources": {},
+        "macros": {}
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    return {
+        "compiled_dir": str(compiled_dir),
+        "manifest_path": str(manifest_path),
+        "models": model_layers,
+        "marts": layers[-1],
+        "snapshots": sorted(snapshot_of.values()),
+        "columns": ["id"] + [f"col_{c}" for c in range(columns)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic compiled dbt project')
+    parser.add_argument('output_dir')
+    parser.add_argument('--models', type=int, default=200)
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--fan-in', type=int, default=2)
+    parser.add_argument('--shape', default='mixed', choices=SHAPES + ('mixed',))
+    parser.add_argument('--columns', type=int, default=20)
+    parser.add_argument('--snapshot-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    project = generate_project(args.output_dir, args.models, args.depth, args.fan_in, args.shape,
+                               args.columns, args.snapshot_ratio, args.seed)
+    print(f"✅ Generated {len(project['models'])} models ({len(project['marts'])} marts, "
+          f"{len(project['snapshots'])} snapshots) in {project['compiled_dir']}")
+    print(f"📋 Manifest: {project['manifest_path']}")
+
+
+if __name__ == "__main__":
+    main()
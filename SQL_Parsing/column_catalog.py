@@ -0,0 +1,121 @@
+import json
+from pathlib import Path
+from typing import Dict, Optional, Set
+from lineage_logging import get_logger
+
+logger = get_logger("catalog")
+
+# Columns dbt adds to every snapshot table
+DBT_SNAPSHOT_COLUMNS = frozenset({'dbt_scd_id', 'dbt_updated_at', 'dbt_valid_from', 'dbt_valid_to'})
+
+
+def load_catalog_columns(catalog_path: str) -> Dict[str, Set[str]]:
+    """
+    Column names per relation from a dbt catalog.json (`dbt docs generate`)
+
+    Returns:
+        {"database.schema.name" and "name" (lowercase): set of lowercase column names}
+    """
+    with open(catalog_path, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+
+    columns_by_table = {}
+    for section in ('nodes', 'sources'):
+        for entry in catalog.get(section, {}).values():
+            metadata = entry.get('metadata', {})
+            name = (metadata.get('name') or '').lower()
+            if not name:
+                continue
+            columns = {column_name.lower() for column_name in entry.get('columns', {})}
+            full_name = '.'.join(part.lower() for part in (metadata.get('database'), metadata.get('schema'), name) if part)
+            columns_by_table[full_name] = columns
+            columns_by_table.setdefault(name, columns)
+    return columns_by_table
+
+
+class ColumnCatalog:
+    """
+    Known output columns per table, for schema-aware SELECT * expansion.
+
+    Columns come from catalog.json when available; otherwise they are computed from the
+    compiled model itself (its projections, with its own stars expanded recursively) or,
+    for snapshots, from the models they snapshot plus dbt's snapshot columns. Tables
+    whose columns cannot be determined return None, which callers treat as "may have any column".
+    """
+
+    def __init__(self, tracer, catalog_columns: Optional[Dict[str, Set[str]]] = None):
+        self.tracer = tracer
+        self.catalog_columns = catalog_columns or {}
+        self.model_columns: Dict[str, Optional[Set[str]]] = {}
+        self._resolving: Set[str] = set()
+
+    @classmethod
+    def for_tracer(cls, tracer, catalog_path: Optional[str] = None) -> 'ColumnCatalog':
+        """
+        Build a catalog for a tracer, reading catalog.json (default: next to the manifest) if it exists
+        """
+        if catalog_path is None and getattr(tracer, 'manifest_path', None):
+            catalog_path = str(Path(tracer.manifest_path).with_name('catalog.json'))
+
+        catalog_columns = {}
+        if catalog_path and Path(catalog_path).exists():
+            try:
+                catalog_columns = load_catalog_columns(catalog_path)
+                logger.info("📚 Loaded catalog columns for %s relations", len(catalog_columns))
+            except Exception as e:
+                logger.warning("⚠️  Error loading catalog %s: %s", catalog_path, e)
+        return cls(tracer, catalog_columns)
+
+    def clear(self) -> None:
+        """
+        Forget the columns computed from compiled models (catalog.json columns are kept)
+
+        A model's columns can come from its upstream models' through SELECT *, so when any
+        model changes every computed entry is dropped rather than only the changed model's.
+        """
+        self.model_columns.clear()
+
+    def get(self, table_reference: str) -> Optional[Set[str]]:
+        normalized = table_reference.replace('"', '').lower()
+        known = self.catalog_columns.get(normalized)
+        if known is not None:
+            return known
+
+        table_name = self.tracer.extract_table_name_from_full_ref(normalized)
+        if table_name in self.model_columns:
+            return self.model_columns[table_name]
+        if table_name in self._resolving:
+            return None  # Cycle: give up on expansion rather than recursing
+
+        self._resolving.add(table_name)
+        try:
+            columns = self._compute_columns(normalized, table_name)
+        finally:
+            self._resolving.discard(table_name)
+        self.model_columns[table_name] = columns
+        return columns
+
+    def _compute_columns(self, table_reference: str, table_name: str) -> Optional[Set[str]]:
+        try:
+            from column_lineage import resolve_output_columns
+        except ImportError:
+            from paste import resolve_output_columns
+
+        snapshot_dependencies = self.tracer._check_snapshot_dependencies(table_reference)
+        if snapshot_dependencies:
+            columns = set(DBT_SNAPSHOT_COLUMNS)
+            for dep in snapshot_dependencies:
+                dep_columns = self.get(dep['table'])
+                if dep_columns is None:
+                    return None
+                columns |= dep_columns
+            return columns
+
+        model_name = table_name
+        if model_name not in self.tracer.table_to_file_map and f"stg_{model_name}" in self.tracer.table_to_file_map:
+            model_name = f"stg_{model_name}"
+        analysis = self.tracer.get_sql_analysis(model_name) if model_name in self.tracer.table_to_file_map else None
+        if analysis is None:
+            return None  # External source without catalog.json entry
+        return resolve_output_columns(None, self, parsed=analysis["parsed"], base_columns=analysis["columns"],
+                                      dialect=self.tracer.dialect)
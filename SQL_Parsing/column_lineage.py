@@ -1,17 +1,25 @@
 import sqlglot
 from sqlglot import exp
+from lineage_logging import get_logger
 
-def extract_snowflake_columns(sql_query, existing_cte_registry=None):
+logger = get_logger("column_lineage")
+
+DEFAULT_DIALECT = "snowflake"  # sqlglot dialect used when neither callers nor a manifest adapter_type name one
+
+def extract_snowflake_columns(sql_query, existing_cte_registry=None, parsed=None, dialect=DEFAULT_DIALECT):
     """
     Extracts column lineage information from a Snowflake SQL query.
     Returns a list of lists, each describing the output columns for each SELECT.
     FIXED: Now handles SELECT * properly and accepts existing CTE registry
     FIXED: Now properly handles UNION ALL - analyzes ALL SELECT statements
+    NEW: Accepts an already parsed tree (e.g. from the analysis cache) to skip parsing
+    NEW: dialect - any sqlglot dialect name, used for parsing and for rendering expressions
     """
-    parsed = sqlglot.parse_one(sql_query, dialect="snowflake")
+    if parsed is None:
+        parsed = sqlglot.parse_one(sql_query, dialect=dialect)
 
     def expr_to_str(expr):
-        return expr.sql(dialect="snowflake") if expr else None
+        return expr.sql(dialect=dialect) if expr else None
 
     def collect_source_columns(expr):
         sources = set()
@@ -144,12 +152,12 @@ def extract_snowflake_columns(sql_query, existing_cte_registry=None):
     if not final_selects:
         final_selects = all_selects
     
-    print(f"🔍 Found {len(final_selects)} SELECT statements to analyze (including UNION branches)")
+    logger.debug("🔍 Found %s SELECT statements to analyze (including UNION branches)", len(final_selects))
     
     all_columns = []
     
     for idx, select in enumerate(final_selects):
-        print(f"   📊 Analyzing SELECT statement {idx + 1}/{len(final_selects)}")
+        logger.debug("   📊 Analyzing SELECT statement %s/%s", idx + 1, len(final_selects))
         
         select_columns = []
         from_tables = get_from_tables(select, cte_registry)
@@ -208,55 +216,145 @@ def extract_snowflake_columns(sql_query, existing_cte_registry=None):
     return all_columns
 
 
-def trace_column_lineage(sql_query, target_column_name, existing_cte_registry=None):
+def should_stop_tracing(full_table_name, internal_prefixes=['ph_'], cte_registry=None):
+    """Determine if we should STOP tracing (found external source)"""
+
+    # Always continue for CTE references - they need recursive resolution
+    if full_table_name.startswith("CTE:"):
+        return False, "cte_reference"
+
+    # Check if this is actually a CTE name (without CTE: prefix)
+    if cte_registry and full_table_name.lower() in cte_registry:
+        return False, "is_cte_name"
+
+    # Parse the table name
+    parts = full_table_name.split('.')
+
+    if len(parts) >= 3:
+        # Full qualified name: database.schema.table
+        database = parts[0]
+        database_lower = database.lower()
+        starts_with_internal = any(database_lower.startswith(prefix.lower()) for prefix in internal_prefixes)
+
+        if not starts_with_internal:
+            return True, "external_database"  # STOP - external database
+        else:
+            return False, "internal_database"  # CONTINUE - internal database
+
+    elif len(parts) == 2:
+        # schema.table - check if schema indicates external
+        schema = parts[0].lower()
+        if any(schema.startswith(prefix.lower()) for prefix in internal_prefixes):
+            return False, "internal_schema"  # CONTINUE - internal schema
+        else:
+            return True, "external_schema"  # STOP - external schema
+
+    else:
+        # Single name - check if it's a CTE first, then treat as external
+        if cte_registry and full_table_name.lower() in cte_registry:
+            return False, "single_name_is_cte"  # CONTINUE - it's a CTE
+        else:
+            return True, "external_source_table"  # STOP - treat as external
+
+
+def _catalog_columns(column_catalog, table_name):
+    """
+    Known columns of a table from a column catalog (full reference first, then the bare table name), or None
+    """
+    normalized = table_name.replace('"', '').lower()
+    known = column_catalog.get(normalized)
+    if known is None and '.' in normalized:
+        known = column_catalog.get(normalized.split('.')[-1])
+    return known
+
+
+def _source_may_have_column(table_name, column_name, column_catalog, cte_registry, columns_cache, dialect=DEFAULT_DIALECT):
+    """
+    Can SELECT * over table_name produce column_name? Unknown tables are assumed to (conservative)
+    """
+    if not table_name.startswith("CTE:"):
+        known = _catalog_columns(column_catalog, table_name)
+        return known is None or column_name.lower() in known
+    
+    cte_query = cte_registry.get(table_name[4:].lower())
+    if cte_query is None:
+        return True
+    cte_columns = columns_cache.get(id(cte_query))
+    if cte_columns is None:
+        cte_columns = extract_snowflake_columns(None, cte_registry, parsed=cte_query, dialect=dialect)
+        columns_cache[id(cte_query)] = cte_columns
+    for select_columns in cte_columns:
+        for col_info in select_columns:
+            if col_info['type'] == 'star':
+                if any(_source_may_have_column(source[0], column_name, column_catalog, cte_registry, columns_cache, dialect)
+                       for source in col_info['resolved_source_columns']):
+                    return True
+            elif col_info['target_column'].lower() == column_name.lower():
+                return True
+    return False
+
+
+def resolve_output_columns(sql_query, column_catalog=None, parsed=None, base_columns=None, dialect=DEFAULT_DIALECT):
+    """
+    Output column names (lowercase) of a query with SELECT * expanded through column_catalog
+    
+    column_catalog: mapping-like with .get(table) -> set of lowercase column names or None
+    Returns None when a star reads a table whose columns are unknown.
+    """
+    if parsed is None:
+        parsed = sqlglot.parse_one(sql_query, dialect=dialect)
+    cte_registry = {}
+    with_clause = parsed.args.get("with")
+    if with_clause:
+        for cte in with_clause.expressions:
+            cte_registry[cte.alias.lower()] = cte.this
+    if base_columns is None:
+        base_columns = extract_snowflake_columns(sql_query, cte_registry, parsed=parsed, dialect=dialect)
+    column_catalog = column_catalog or {}
+    columns_cache = {id(parsed): base_columns}
+    
+    def star_columns(table_name):
+        if not table_name.startswith("CTE:"):
+            return _catalog_columns(column_catalog, table_name)
+        cte_query = cte_registry.get(table_name[4:].lower())
+        if cte_query is None:
+            return None
+        if id(cte_query) not in columns_cache:
+            columns_cache[id(cte_query)] = extract_snowflake_columns(None, cte_registry, parsed=cte_query, dialect=dialect)
+        return select_columns_of(columns_cache[id(cte_query)])
+    
+    def select_columns_of(query_columns):
+        names = set()
+        for select_columns in query_columns:
+            for col_info in select_columns:
+                if col_info['type'] != 'star':
+                    names.add(col_info['target_column'].lower())
+                    continue
+                for source in col_info['resolved_source_columns']:
+                    expanded = star_columns(source[0])
+                    if expanded is None:
+                        return None
+                    names |= expanded
+        return names
+    
+    return select_columns_of(base_columns)
+
+
+def trace_column_lineage(sql_query, target_column_name, existing_cte_registry=None, parsed=None, base_columns=None, column_catalog=None, dialect=DEFAULT_DIALECT):
     """
     Traces a specific column through all transformations and builds LLM-ready context.
     FIXED: Properly handles aliases, single names, and recursive CTE resolution
     FIXED: Now handles UNION ALL - traces column through ALL SELECT statements
+    NEW: parsed/base_columns let callers reuse a cached tree and column map instead of re-parsing
+    NEW: Works on one parsed tree per file - CTEs are traced by walking their AST nodes
+         instead of rendering them back to SQL and re-parsing
+    NEW: Schema-aware SELECT * - with a column_catalog (mapping-like .get(table) -> set of
+         lowercase column names, or None if unknown) a star only matches tables that have the column
+    NEW: dialect - sqlglot dialect of the SQL (see extract_snowflake_columns)
     """
-    
-    def should_stop_tracing(full_table_name, internal_prefixes=['ph_'], cte_registry=None):
-        """Determine if we should STOP tracing (found external source)"""
-        
-        # Always continue for CTE references - they need recursive resolution
-        if full_table_name.startswith("CTE:"):
-            return False, "cte_reference"
-        
-        # Check if this is actually a CTE name (without CTE: prefix)
-        if cte_registry and full_table_name.lower() in cte_registry:
-            return False, "is_cte_name"
-        
-        # Parse the table name
-        parts = full_table_name.split('.')
-        
-        if len(parts) >= 3:
-            # Full qualified name: database.schema.table
-            database = parts[0]
-            database_lower = database.lower()
-            starts_with_internal = any(database_lower.startswith(prefix.lower()) for prefix in internal_prefixes)
-            
-            if not starts_with_internal:
-                return True, "external_database"  # STOP - external database
-            else:
-                return False, "internal_database"  # CONTINUE - internal database
-                
-        elif len(parts) == 2:
-            # schema.table - check if schema indicates external
-            schema = parts[0].lower()
-            if any(schema.startswith(prefix.lower()) for prefix in internal_prefixes):
-                return False, "internal_schema"  # CONTINUE - internal schema
-            else:
-                return True, "external_schema"  # STOP - external schema
-            
-        else:
-            # Single name - check if it's a CTE first, then treat as external
-            if cte_registry and full_table_name.lower() in cte_registry:
-                return False, "single_name_is_cte"  # CONTINUE - it's a CTE
-            else:
-                return True, "external_source_table"  # STOP - treat as external
-    
     # Parse and build CTE registry first (or use existing one for nested calls)
-    parsed = sqlglot.parse_one(sql_query, dialect="snowflake")
+    if parsed is None:
+        parsed = sqlglot.parse_one(sql_query, dialect=dialect)
     cte_registry = existing_cte_registry or {}
     with_clause = parsed.args.get("with")
     
@@ -267,8 +365,69 @@ def trace_column_lineage(sql_query, target_column_name, existing_cte_registry=No
             cte_query = cte.this
             cte_registry[cte_name.lower()] = cte_query
     
+    columns_cache = {}
+    if base_columns is not None:
+        columns_cache[id(parsed)] = base_columns
+    
+    return _trace_column_in_tree(parsed, target_column_name, cte_registry, columns_cache, column_catalog=column_catalog, dialect=dialect)
+
+
+def trace_table_lineage(sql_query, columns=None, parsed=None, base_columns=None, column_catalog=None, dialect=DEFAULT_DIALECT):
+    """
+    Traces many output columns of one model in a single pass and returns {column: lineage}.
+    Each result has the same shape as trace_column_lineage's.
+    
+    The file is parsed once, every SELECT / UNION branch / CTE body is analysed once,
+    and a CTE column reached from several output columns is traced once and shared,
+    so a wide table costs roughly one traversal instead of one per column.
+    
+    columns: output column names to trace (default: every explicitly projected column;
+             pass "*" to trace SELECT * pass-through)
+    column_catalog, dialect: see trace_column_lineage
+    """
+    if parsed is None:
+        parsed = sqlglot.parse_one(sql_query, dialect=dialect)
+    
+    cte_registry = {}
+    with_clause = parsed.args.get("with")
+    if with_clause:
+        for cte in with_clause.expressions:
+            cte_registry[cte.alias.lower()] = cte.this
+    
+    if base_columns is None:
+        base_columns = extract_snowflake_columns(sql_query, cte_registry, parsed=parsed, dialect=dialect)
+    
+    if columns is None:
+        seen = {}
+        for select_columns in base_columns:
+            for col_info in select_columns:
+                if col_info['type'] != 'star':
+                    seen.setdefault(col_info['target_column'].lower(), col_info['target_column'])
+        columns = list(seen.values())
+    
+    columns_cache = {id(parsed): base_columns}
+    trace_cache = {}
+    return {
+        column: _trace_column_in_tree(parsed, column, cte_registry, columns_cache, trace_cache, column_catalog, dialect)
+        for column in columns
+    }
+
+
+def _trace_column_in_tree(query_node, target_column_name, cte_registry, columns_cache, trace_cache=None, column_catalog=None, dialect=DEFAULT_DIALECT):
+    """
+    Trace one column through a parsed query node (a whole file or a CTE body).
+    columns_cache maps id(node) -> extract_snowflake_columns output, so each CTE body
+    is analysed once per file no matter how many columns or branches reach it.
+    trace_cache maps (id(cte node), column) -> CTE trace, shared across columns of one table.
+    """
+    if trace_cache is None:
+        trace_cache = {}
+    
     # Get basic column analysis for ALL SELECT statements (pass CTE registry for nested CTE detection)
-    base_columns = extract_snowflake_columns(sql_query, cte_registry)
+    base_columns = columns_cache.get(id(query_node))
+    if base_columns is None:
+        base_columns = extract_snowflake_columns(None, cte_registry, parsed=query_node, dialect=dialect)
+        columns_cache[id(query_node)] = base_columns
     
     # Find the target column in ALL SELECT statements (UNION branches)
     target_column_matches = []
@@ -283,12 +442,21 @@ def trace_column_lineage(sql_query, target_column_name, existing_cte_registry=No
             # Also check if target column could come from SELECT *
             elif col_info['type'] == 'star':
                 # For star selections, assume any requested column could be available
+                # (schema-aware mode: only from the star's tables that actually have it)
+                star_sources = col_info['resolved_source_columns']
+                if column_catalog is not None and target_column_name != "*":
+                    star_sources = [
+                        source for source in star_sources
+                        if _source_may_have_column(source[0], target_column_name, column_catalog, cte_registry, columns_cache, dialect)
+                    ]
+                    if not star_sources:
+                        continue
                 target_column_matches.append({
                     'col_info': {
                         'target_column': target_column_name,
                         'expression': f"* (includes {target_column_name})",
                         'type': 'star',
-                        'resolved_source_columns': col_info['resolved_source_columns'],
+                        'resolved_source_columns': star_sources,
                         'select_idx': select_idx,
                         'union_branch': select_idx
                     },
@@ -303,7 +471,7 @@ def trace_column_lineage(sql_query, target_column_name, existing_cte_registry=No
             "full_lineage": {}
         }
     
-    print(f"🔍 Found '{target_column_name}' in {len(target_column_matches)} SELECT statement(s)")
+    logger.debug("🔍 Found '%s' in %s SELECT statement(s)", target_column_name, len(target_column_matches))
     
     # Build LLM context combining all branches
     llm_context_parts = []
@@ -363,10 +531,12 @@ def trace_column_lineage(sql_query, target_column_name, existing_cte_registry=No
                         # Trace through the CTE
                         if cte_name.lower() in cte_registry:
                             cte_query = cte_registry[cte_name.lower()]
-                            cte_sql = cte_query.sql(dialect="snowflake")
                             
-                            # Recursively analyze the CTE with the current CTE registry
-                            cte_trace = trace_column_lineage(cte_sql, column, cte_registry)
+                            # Recursively analyze the CTE's AST node with the current CTE registry
+                            cte_trace = trace_cache.get((id(cte_query), column))
+                            if cte_trace is None:
+                                cte_trace = _trace_column_in_tree(cte_query, column, cte_registry, columns_cache, trace_cache, column_catalog, dialect)
+                                trace_cache[(id(cte_query), column)] = cte_trace
                             if "error" not in cte_trace:
                                 # Add CTE transformation info
                                 all_cte_transformations.append({
@@ -411,10 +581,12 @@ def trace_column_lineage(sql_query, target_column_name, existing_cte_registry=No
                             
                             if cte_name.lower() in cte_registry:
                                 cte_query = cte_registry[cte_name.lower()]
-                                cte_sql = cte_query.sql(dialect="snowflake")
                                 
-                                # Recursively analyze the nested CTE
-                                cte_trace = trace_column_lineage(cte_sql, column, cte_registry)
+                                # Recursively analyze the nested CTE's AST node
+                                cte_trace = trace_cache.get((id(cte_query), column))
+                                if cte_trace is None:
+                                    cte_trace = _trace_column_in_tree(cte_query, column, cte_registry, columns_cache, trace_cache, column_catalog, dialect)
+                                    trace_cache[(id(cte_query), column)] = cte_trace
                                 if "error" not in cte_trace:
                                     # Add CTE transformation info
                                     all_cte_transformations.append({
@@ -1,12 +1,58 @@
 import os
 import json
+import time
+from collections import ChainMap, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Set, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Optional, Tuple
 import sqlglot
 from sqlglot import exp
+from column_lineage import DEFAULT_DIALECT
+from lineage_cache import AnalysisCache, compute_cache_key
+from lineage_graph import ColumnLineageGraph
+from lineage_results import CompactLineage
+from lineage_export import export_graph
+from column_catalog import ColumnCatalog
+from sql_bundle import SqlBundle
+from lineage_dag import LAYER_ORDER, analyze_lineage, classify_layer
+from identifier_scan import IdentifierScan, build_identifier_index, candidate_files, scan_identifiers
+from manifest_loader import load_compact_manifest
+from lineage_stats import LineageStats
+from lineage_logging import configure_console_logging, emit_event, enable_event_log, get_logger, timed_event
+
+STATE_FILE_VERSION = 1
+# dbt adapter_type -> sqlglot dialect, where the names differ
+DBT_ADAPTER_DIALECTS = {"sqlserver": "tsql", "fabric": "tsql", "synapse": "tsql", "spark": "spark", "glue": "spark", "impala": "hive"}
+DEFAULT_PREFETCH_WORKERS = 16  # Concurrent reads in prefetch_sql_files (I/O bound, so threads)
+
+logger = get_logger("tracer")
+
+def sqlglot_dialect(name: str) -> str:
+    """
+    sqlglot dialect for a dialect or dbt adapter name; raises ValueError if sqlglot has no such dialect
+    """
+    dialect = DBT_ADAPTER_DIALECTS.get(name.lower(), name.lower())
+    try:
+        sqlglot.Dialect.get_or_raise(dialect)
+    except ValueError as e:
+        raise ValueError(f"Unknown SQL dialect {name!r}: {e}") from e
+    return dialect
+
+
+def dialect_for_adapter(adapter_type: str) -> str:
+    """
+    sqlglot dialect for a manifest's adapter_type; unknown adapters fall back to DEFAULT_DIALECT
+    """
+    try:
+        return sqlglot_dialect(adapter_type)
+    except ValueError:
+        logger.warning("⚠️  No sqlglot dialect for adapter %s - parsing as %s", adapter_type, DEFAULT_DIALECT)
+        return DEFAULT_DIALECT
+
 
 class DBTLineageTracer:
-    def __init__(self, compiled_sql_directory: str, internal_db_prefixes: List[str] = None, source_definitions_file: Optional[str] = None, manifest_path: Optional[str] = None):
+    def __init__(self, compiled_sql_directory: str, internal_db_prefixes: List[str] = None, source_definitions_file: Optional[str] = None, manifest_path: Optional[str] = None, cache_dir: Optional[str] = None, state_file: Optional[str] = None, schema_aware: bool = False, catalog_path: Optional[str] = None, prefetch_workers: Optional[int] = None, sql_bundle: Optional[str] = None, dialect: Optional[str] = None):
         """
         Initialize the DBT lineage tracer with compiled SQL directory
         
@@ -15,40 +61,167 @@ class DBTLineageTracer:
             internal_db_prefixes: List of database prefixes that indicate internal tables (e.g., ['ph_'])
             source_definitions_file: Path to JSON file containing source column definitions
             manifest_path: Path to DBT manifest.json file (default: target/manifest.json)
+            cache_dir: Optional directory for the persistent parsed-model cache (disabled when None)
+            state_file: Optional JSON file for incremental mode; per-model analysis is persisted there
+                and only models whose files changed since the last run are re-analysed
+            schema_aware: Expand SELECT * against known table columns, so a column is only traced
+                into the starred tables that actually have it (see column_catalog.ColumnCatalog)
+            catalog_path: dbt catalog.json with warehouse columns for schema_aware
+                (default: catalog.json next to the manifest, if present)
+            prefetch_workers: Read every compiled file up front with this many threads
+                (see prefetch_sql_files; disabled when None)
+            sql_bundle: Load compiled SQL from this bundle (see sql_bundle.py) in the prefetch stage
+            dialect: sqlglot dialect of the compiled SQL (default: from the manifest's
+                metadata.adapter_type, else snowflake); parse caches are keyed by it.
+                ValueError if sqlglot does not know it
         """
         self.sql_dir = Path(compiled_sql_directory)
         self.internal_db_prefixes = internal_db_prefixes or ['ph_']
         self.table_to_file_map = {}  # "table_name" -> Path object
-        self.file_cache = {}         # Cache parsed SQL content
+        self.file_cache = {}         # Cache raw SQL content
+        self.analysis_cache = {}     # "table_name" -> {"cache_key", "parsed" (optional), "columns"}
+        self.disk_cache = AnalysisCache(cache_dir) if cache_dir else None
         self.source_definitions = {}  # Source column definitions
         self.manifest_data = {}      # Manifest data storage
+        self.lineage_graph = None    # Project-wide ColumnLineageGraph, built on demand
+        self.manifest_indexes = {}   # Normalized manifest lookups, built by _build_manifest_indexes
+        self.state_file = Path(state_file) if state_file else None
+        self.model_state = {}        # "table_name" -> persisted per-model analysis (incremental mode)
+        self.file_signatures = {}    # "table_name" -> [path, mtime_ns, size] of the file last analysed
+        self.trace_memo = {}         # (table, column) -> shared trace_column_lineage_across_files result
+        self._cycle_cuts = 0         # Dependencies skipped as cycles; results computed across a cut are not memoized
+        self.single_file_traces = {} # (table, column) -> trace_column_lineage result, filled in bulk by trace_table
+        self.identifier_scans = {}   # "table_name" -> IdentifierScan of its compiled SQL (pre-parse filter)
+        self._identifier_index = None  # identifier -> models mentioning it, over every model's scan
+        self._trace_limits = None    # Active max_depth / stop_at_layers / time budget of a bounded trace
+        self._trace_frontier = []    # Columns cut off by those limits during the current trace
+        self.stats = LineageStats()  # Per-stage and per-model counts and timings (see --profile)
+        self.column_catalog = None   # ColumnCatalog for schema-aware SELECT * expansion
+        self.catalog_column_dependencies = {}  # "table_name" -> schema-aware column dependencies (memory only)
         
         # Load source definitions if provided
         if source_definitions_file:
-            self.load_source_definitions(source_definitions_file)
+            with self.stats.stage("source_definitions"):
+                self.load_source_definitions(source_definitions_file)
         
         # Load manifest - default path or provided path
         manifest_file = manifest_path or "target/manifest.json"
-        self._load_manifest(manifest_file)
+        self.manifest_path = manifest_file
+        with self.stats.stage("manifest_load"):
+            self._load_manifest(manifest_file)
+        self.requested_dialect = sqlglot_dialect(dialect) if dialect else None
+        self.dialect = self.requested_dialect or self._detect_dialect()
         
         # Build the file mapping on initialization
-        self.build_file_mapping()
+        with self.stats.stage("file_discovery"):
+            self.build_file_mapping()
+        
+        if prefetch_workers is not None or sql_bundle:
+            self.prefetch_sql_files(prefetch_workers or DEFAULT_PREFETCH_WORKERS, sql_bundle)
+        
+        if self.state_file:
+            with self.stats.stage("state_load"):
+                self._load_state()
+        
+        self.catalog_path = catalog_path
+        if schema_aware:
+            self.column_catalog = ColumnCatalog.for_tracer(self, catalog_path)
+    
+    def reload_manifest(self) -> None:
+        """
+        NEW: Re-read a rewritten manifest and drop everything derived from the old one
+        
+        The dialect is detected again (unless one was requested), incremental state is re-checked
+        against the new checksums, and the column catalog is rebuilt; traces and schema-aware
+        dependencies are forgotten. Rebuild the lineage graph afterwards if one is in use.
+        """
+        self._load_manifest(self.manifest_path)
+        self.dialect = self.requested_dialect or self._detect_dialect()
+        self.trace_memo.clear()
+        self.single_file_traces.clear()
+        self.catalog_column_dependencies.clear()
+        self.model_state = {}
+        if self.state_file:
+            self._load_state()
+        if self.column_catalog is not None:
+            self.column_catalog = ColumnCatalog.for_tracer(self, self.catalog_path)
     
     def _load_manifest(self, manifest_path: str) -> None:
         """
-        Load DBT manifest.json file
+        Load the node fields the tracer needs from a DBT manifest.json file
+        (via the cached compact extract, see manifest_loader.load_compact_manifest; kept in
+        cache_dir when one was given, else next to the manifest)
         """
         try:
-            with open(manifest_path, 'r', encoding='utf-8') as f:
-                self.manifest_data = json.load(f)
-                snapshot_count = len([k for k in self.manifest_data.get('nodes', {}).keys() if k.startswith('snapshot.')])
-                print(f"📚 Loaded DBT manifest with {snapshot_count} snapshots")
+            with timed_event("manifest_loaded", path=str(manifest_path)):
+                self.manifest_data = load_compact_manifest(manifest_path, self.disk_cache.cache_dir if self.disk_cache else None)
+            snapshot_count = len([k for k in self.manifest_data.get('nodes', {}).keys() if k.startswith('snapshot.')])
+            logger.info("📚 Loaded DBT manifest with %s snapshots", snapshot_count)
         except FileNotFoundError:
-            print(f"⚠️  Manifest file not found: {manifest_path}")
+            logger.warning("⚠️  Manifest file not found: %s", manifest_path)
             self.manifest_data = {}
         except Exception as e:
-            print(f"⚠️  Error loading manifest: {e}")
+            logger.warning("⚠️  Error loading manifest: %s", e)
             self.manifest_data = {}
+        
+        self._build_manifest_indexes()
+    
+    def _detect_dialect(self) -> str:
+        """
+        sqlglot dialect for the manifest's adapter_type (DEFAULT_DIALECT without a manifest)
+        """
+        adapter_type = self.manifest_data.get('metadata', {}).get('adapter_type')
+        if not adapter_type:
+            return DEFAULT_DIALECT
+        dialect = dialect_for_adapter(adapter_type)
+        logger.info("🗣️  SQL dialect: %s (adapter %s)", dialect, adapter_type)
+        return dialect
+    
+    def _build_manifest_indexes(self) -> None:
+        """
+        Build normalized lookup indexes over manifest nodes once, so snapshot checks and
+        relation-name resolution are dict lookups instead of scans over every node
+        
+        Each index maps a normalized key to the position of the FIRST matching node in
+        manifest order, which preserves the first-match semantics of the original scans.
+        """
+        relation_by_last_identifier = {}  # last identifier -> clean relation_name (any resource type)
+        snapshot_keys = []                # snapshot node keys in manifest order
+        snapshot_by_relation_suffix = {}  # every dot-suffix of a snapshot relation_name -> position
+        snapshot_by_name = {}             # snapshot name / alias -> position
+        node_key_by_name = {}             # model/snapshot name or alias -> node key
+        
+        for key, node in self.manifest_data.get('nodes', {}).items():
+            relation_name = node.get('relation_name') or ''
+            clean_relation = relation_name.replace('"', '').lower()
+            
+            if relation_name:
+                relation_by_last_identifier.setdefault(clean_relation.split('.')[-1], relation_name.replace('"', ''))
+            
+            for name in (node.get('name', ''), node.get('alias', '')):
+                if name:
+                    node_key_by_name.setdefault(name.lower(), key)
+            
+            if not key.startswith('snapshot.'):
+                continue
+            
+            position = len(snapshot_keys)
+            snapshot_keys.append(key)
+            
+            parts = clean_relation.split('.')
+            for i in range(len(parts)):
+                snapshot_by_relation_suffix.setdefault('.'.join(parts[i:]), position)
+            for name in (node.get('name', ''), node.get('alias', '')):
+                if name:
+                    snapshot_by_name.setdefault(name.lower(), position)
+        
+        self.manifest_indexes = {
+            "relation_by_last_identifier": relation_by_last_identifier,
+            "snapshot_keys": snapshot_keys,
+            "snapshot_by_relation_suffix": snapshot_by_relation_suffix,
+            "snapshot_by_name": snapshot_by_name,
+            "node_key_by_name": node_key_by_name
+        }
     
     def _check_snapshot_dependencies(self, table_name: str) -> List[Dict]:
         """
@@ -60,35 +233,19 @@ class DBTLineageTracer:
         
         nodes = self.manifest_data.get('nodes', {})
         
-        # Find the snapshot node - use GENERIC matching approach
-        snapshot_node = None
-        matching_relation_name = None
-        
-        for key, node in nodes.items():
-            if not key.startswith('snapshot.'):
-                continue
-                
-            # Get the actual relation_name from manifest (this is the SQL reference)
-            relation_name = node.get('relation_name', '')
-            
-            # Clean relation_name (remove quotes, normalize)
-            clean_relation = relation_name.replace('"', '').lower()
-            clean_table_name = table_name.lower()
-            
-            # Check if this snapshot matches our table reference
-            # Support multiple matching strategies:
-            # 1. Full match: database.schema.table == relation_name
-            # 2. Suffix match: table matches the last part of relation_name
-            # 3. Name match: snapshot name/alias matches
-            
-            if (clean_relation == clean_table_name or 
-                clean_relation.endswith(f".{clean_table_name}") or
-                node.get('name', '').lower() == clean_table_name or
-                node.get('alias', '').lower() == clean_table_name):
-                
-                snapshot_node = node
-                matching_relation_name = relation_name
-                break
+        # Find the snapshot node via the manifest indexes. Supported matching strategies:
+        # 1. Full match: database.schema.table == relation_name
+        # 2. Suffix match: table matches the last part(s) of relation_name
+        # 3. Name match: snapshot name/alias matches
+        # The earliest snapshot in manifest order wins, as with a linear scan.
+        clean_table_name = table_name.lower()
+        candidates = [
+            position for position in (
+                self.manifest_indexes["snapshot_by_relation_suffix"].get(clean_table_name),
+                self.manifest_indexes["snapshot_by_name"].get(clean_table_name)
+            ) if position is not None
+        ]
+        snapshot_node = nodes[self.manifest_indexes["snapshot_keys"][min(candidates)]] if candidates else None
         
         if not snapshot_node:
             return []
@@ -160,26 +317,11 @@ class DBTLineageTracer:
         if not self.manifest_data:
             return None
             
-        nodes = self.manifest_data.get('nodes', {})
         clean_table_ref = table_reference.replace('"', '').lower()
         
-        # Search through all nodes to find matching relation_name
-        for key, node in nodes.items():
-            relation_name = node.get('relation_name', '')
-            if not relation_name:
-                continue
-                
-            clean_relation = relation_name.replace('"', '').lower()
-            
-            # Multiple matching strategies
-            if (clean_relation == clean_table_ref or
-                clean_relation.endswith(f".{clean_table_ref}") or
-                clean_table_ref.endswith(f".{clean_relation}") or
-                clean_relation.split('.')[-1] == clean_table_ref.split('.')[-1]):
-                
-                return relation_name.replace('"', '')  # Return clean relation name
-        
-        return None
+        # Matching strategies (full match, suffix match either way, same last identifier) all
+        # imply "same last identifier", so one index lookup finds the first matching node
+        return self.manifest_indexes["relation_by_last_identifier"].get(clean_table_ref.split('.')[-1])
     
     def load_source_definitions(self, source_definitions_file: str) -> None:
         """
@@ -189,13 +331,13 @@ class DBTLineageTracer:
             with open(source_definitions_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
                 self.source_definitions = data.get('source_definitions', {})
-                print(f"📚 Loaded source definitions for {len(self.source_definitions)} tables")
+                logger.info("📚 Loaded source definitions for %s tables", len(self.source_definitions))
         except FileNotFoundError:
-            print(f"⚠️  Source definitions file not found: {source_definitions_file}")
+            logger.warning("⚠️  Source definitions file not found: %s", source_definitions_file)
         except json.JSONDecodeError as e:
-            print(f"⚠️  Error parsing source definitions JSON: {e}")
+            logger.warning("⚠️  Error parsing source definitions JSON: %s", e)
         except Exception as e:
-            print(f"⚠️  Error loading source definitions: {e}")
+            logger.warning("⚠️  Error loading source definitions: %s", e)
     
     def get_source_definition(self, table_name: str, column_name: str) -> Optional[Dict]:
         """
@@ -211,7 +353,7 @@ class DBTLineageTracer:
         """
         Walk the compiled SQL directory and build table name -> file path mapping
         """
-        print(f"Scanning directory: {self.sql_dir}")
+        logger.info("Scanning directory: %s", self.sql_dir)
         
         if not self.sql_dir.exists():
             raise FileNotFoundError(f"Directory does not exist: {self.sql_dir}")
@@ -222,7 +364,7 @@ class DBTLineageTracer:
             self.table_to_file_map[table_name] = sql_file
             file_count += 1
             
-        print(f"Found {file_count} SQL files")
+        logger.info("Found %s SQL files", file_count)
         return self.table_to_file_map
     
     def extract_table_name_from_full_ref(self, full_table_name: str) -> str:
@@ -279,45 +421,604 @@ class DBTLineageTracer:
             with open(file_path, 'r', encoding='utf-8') as f:
                 sql_content = f.read()
                 self.file_cache[table_name] = sql_content
+                self.file_signatures[table_name] = self._file_signature(file_path)
                 return sql_content
         except Exception as e:
-            print(f"Error reading file {file_path}: {e}")
+            logger.warning("Error reading file %s: %s", file_path, e)
+            return None
+    
+    def prefetch_sql_files(self, workers: int = DEFAULT_PREFETCH_WORKERS, bundle_path: Optional[str] = None,
+                           table_names: Optional[List[str]] = None) -> int:
+        """
+        NEW: Prefetch stage - read every compiled file not yet in file_cache before tracing
+        
+        Tracing otherwise opens files one at a time as the recursion reaches them, which
+        serialises per-file latency on network filesystems. Here the reads run on a bounded
+        thread pool; with bundle_path, files present in the bundle are taken from its mmap
+        instead (trusted as a snapshot of the directory, so build it right after compiling).
+        
+        Args:
+            workers: maximum concurrent reads
+            bundle_path: optional bundle written by sql_bundle.write_bundle for this directory
+            table_names: only these models (default: every mapped model)
+        
+        Returns:
+            Number of files loaded
+        """
+        if table_names is None:
+            table_names = self.table_to_file_map
+        pending = {
+            table_name: self.table_to_file_map[table_name] for table_name in table_names
+            if table_name in self.table_to_file_map and table_name not in self.file_cache
+        }
+        loaded = 0
+        
+        with self.stats.stage("prefetch"), timed_event("sql_prefetched", files=len(pending), workers=workers) as event:
+            if bundle_path and pending:
+                with SqlBundle(bundle_path) as bundle:
+                    for table_name, file_path in list(pending.items()):
+                        relative_path = file_path.relative_to(self.sql_dir).as_posix()
+                        sql_content = bundle.read(relative_path)
+                        if sql_content is None:
+                            continue
+                        mtime_ns, size = bundle.signature(relative_path)
+                        self.file_cache[table_name] = sql_content
+                        self.file_signatures[table_name] = [str(file_path), mtime_ns, size]
+                        del pending[table_name]
+                        loaded += 1
+                event["from_bundle"] = loaded
+            
+            if pending:
+                with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+                    results = executor.map(_read_sql_file, pending.values())
+                    for table_name, (sql_content, signature) in zip(pending, results):
+                        if sql_content is None:
+                            continue
+                        self.file_cache[table_name] = sql_content
+                        self.file_signatures[table_name] = signature
+                        loaded += 1
+            event["loaded"] = loaded
+        
+        self.stats.count("prefetched_files", loaded)
+        logger.info("📥 Prefetched %s SQL files", loaded)
+        return loaded
+    
+    def _file_signature(self, file_path: Path) -> List:
+        stat = file_path.stat()
+        return [str(file_path), stat.st_mtime_ns, stat.st_size]
+    
+    def _manifest_checksum(self, table_name: str) -> Optional[str]:
+        """
+        dbt's per-node checksum for a model, if the manifest carries one
+        """
+        node_key = self.manifest_indexes.get("node_key_by_name", {}).get(table_name.lower())
+        if not node_key:
+            return None
+        return self.manifest_data['nodes'][node_key].get('checksum', {}).get('checksum')
+    
+    def _load_state(self) -> None:
+        """
+        Load the incremental state file and keep entries for models that have not changed
+        
+        A model is unchanged when its file path, mtime and size match the stored signature and
+        its manifest checksum is the same; if only the mtime moved, the content hash decides.
+        """
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            logger.info("♻️  No incremental state yet: %s", self.state_file)
+            return
+        except Exception as e:
+            logger.warning("⚠️  Ignoring unreadable state file %s: %s", self.state_file, e)
+            return
+        
+        # The salt is the cache key of empty SQL, i.e. it changes with the sqlglot version/dialect
+        if state.get("version") != STATE_FILE_VERSION or state.get("analysis_salt") != compute_cache_key("", self.dialect):
+            logger.info("♻️  State file %s is from another tracer/sqlglot version - re-analysing everything", self.state_file)
+            return
+        
+        unchanged = []
+        for table_name, stored in state.get("models", {}).items():
+            file_path = self.table_to_file_map.get(table_name)
+            if file_path is None or stored.get("manifest_checksum") != self._manifest_checksum(table_name):
+                continue
+            
+            signature = self._file_signature(file_path)
+            if signature != stored["signature"]:
+                sql_content = self.load_sql_file(table_name)
+                if sql_content is None or compute_cache_key(sql_content, self.dialect) != stored["cache_key"]:
+                    continue
+                stored["signature"] = signature
+            
+            stored["column_dependencies"] = {
+                column: {
+                    "branch_expressions": {int(branch): tuple(expr) for branch, expr in info["branch_expressions"].items()},
+                    "dependencies": info["dependencies"]
+                }
+                for column, info in stored["column_dependencies"].items()
+            }
+            self.model_state[table_name] = stored
+            self.file_signatures[table_name] = stored["signature"]
+            unchanged.append(table_name)
+        
+        changed = len(self.table_to_file_map) - len(unchanged)
+        logger.info("♻️  Incremental state: %s unchanged, %s new or changed model(s)", len(unchanged), changed)
+    
+    def save_state(self) -> None:
+        """
+        Persist per-model analysis (path, mtime, size, content hash, output columns and
+        column dependencies) so the next run only re-analyses changed models
+        """
+        if not self.state_file:
+            return
+        
+        models = {}
+        for table_name in self.table_to_file_map:
+            stored = self.model_state.get(table_name)
+            analysis = self.analysis_cache.get(table_name)
+            if analysis and "column_dependencies" in analysis and (not stored or stored["cache_key"] != analysis["cache_key"]):
+                stored = {
+                    "signature": self.file_signatures.get(table_name) or self._file_signature(self.table_to_file_map[table_name]),
+                    "cache_key": analysis["cache_key"],
+                    "manifest_checksum": self._manifest_checksum(table_name),
+                    "columns": list(analysis["column_dependencies"].keys()),
+                    "column_dependencies": analysis["column_dependencies"]
+                }
+                self.model_state[table_name] = stored
+            if stored:
+                models[table_name] = stored
+        
+        state = {"version": STATE_FILE_VERSION, "analysis_salt": compute_cache_key("", self.dialect), "models": models}
+        tmp_path = self.state_file.with_suffix(".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            tmp_path.replace(self.state_file)
+        except OSError as e:
+            logger.warning("⚠️  Could not write state file %s: %s", self.state_file, e)
+    
+    def refresh_changed_models(self) -> Dict[str, List[str]]:
+        """
+        Re-scan the compiled directory and re-analyse only models whose files changed
+        
+        If a lineage graph exists, edges of changed/removed models are replaced in place; when
+        models were added or removed, all edges are re-resolved from the stored per-model
+        dependencies (no re-parsing), since other models' references may now resolve differently.
+        
+        Returns:
+            {"changed": [...], "added": [...], "removed": [...]}
+        """
+        previous_tables = set(self.table_to_file_map)
+        self.table_to_file_map = {}
+        self.build_file_mapping()
+        current_tables = set(self.table_to_file_map)
+        
+        added = sorted(current_tables - previous_tables)
+        removed = sorted(previous_tables - current_tables)
+        changed = sorted(
+            table_name for table_name in current_tables & previous_tables
+            if self.file_signatures.get(table_name) != self._file_signature(self.table_to_file_map[table_name])
+        )
+        
+        if changed or added or removed:
+            self.trace_memo.clear()
+            self.single_file_traces.clear()
+            self._identifier_index = None
+            self.catalog_column_dependencies.clear()
+            if self.column_catalog is not None:
+                self.column_catalog.clear()
+        
+        for table_name in changed + added + removed:
+            self.file_cache.pop(table_name, None)
+            self.model_state.pop(table_name, None)
+            self.file_signatures.pop(table_name, None)
+            self.identifier_scans.pop(table_name, None)
+            if table_name in removed:
+                self.analysis_cache.pop(table_name, None)
+        
+        if self.lineage_graph is not None and (changed or added or removed):
+            # Schema-aware edges of unchanged models can depend on a changed model's columns
+            if added or removed or self.column_catalog is not None:
+                self.build_project_lineage_graph()
+            else:
+                for table_name in changed:
+                    self.lineage_graph.remove_table_edges(table_name)
+                    self._add_model_to_graph(self.lineage_graph, table_name)
+                self.save_state()
+        
+        if changed or added or removed:
+            logger.info("♻️  Refreshed: %s changed, %s added, %s removed", len(changed), len(added), len(removed))
+        return {"changed": changed, "added": added, "removed": removed}
+    
+    def get_identifier_scan(self, table_name: str) -> Optional[IdentifierScan]:
+        """
+        NEW: Identifiers and star usage of a model's compiled SQL (see identifier_scan.py), scanned once without parsing
+        """
+        scan = self.identifier_scans.get(table_name)
+        if scan is None:
+            sql_content = self.load_sql_file(table_name)
+            if sql_content is None:
+                return None
+            with self.stats.stage("identifier_scan"):
+                scan = scan_identifiers(sql_content)
+            self.identifier_scans[table_name] = scan
+        return scan
+    
+    def models_referencing(self, table: str, column: str) -> Set[str]:
+        """
+        NEW: Models that may read table.column - they name the table and either name the column or select a star
+        
+        Answered from an inverted index over every model's identifier scan, so no model is parsed.
+        Models are also matched by the name without its stg_ prefix, which
+        _resolve_graph_dependency falls back to stg_ models from.
+        """
+        if self._identifier_index is None:
+            scans = {table_name: self.get_identifier_scan(table_name) for table_name in self.table_to_file_map}
+            self._identifier_index = build_identifier_index({name: scan for name, scan in scans.items() if scan is not None})
+        
+        table_name = self.extract_table_name_from_full_ref(table)
+        table_names = {table_name, table_name[len('stg_'):]} if table_name.startswith('stg_') else {table_name}
+        return candidate_files(self.identifier_scans, self._identifier_index, table_names, column)
+    
+    def upstream_models(self, table: str) -> Set[str]:
+        """
+        NEW: Compiled models a trace of table may visit, from identifier scans alone (no parsing)
+        
+        Starting at the table's model, every identifier that names a model (directly, through the
+        stg_ fallback, or as a snapshot of models) is followed. Names can be mentioned without
+        being read, so this is a superset of the models the trace opens.
+        """
+        def models_named(name: str) -> List[str]:
+            if name in self.table_to_file_map:
+                return [name]
+            if f"stg_{name}" in self.table_to_file_map:
+                return [f"stg_{name}"]
+            return [
+                dep_name for dep in self._check_snapshot_dependencies(name)
+                for dep_name in models_named(self.extract_table_name_from_full_ref(dep["table"]))
+            ]
+        
+        queue = deque(models_named(self.extract_table_name_from_full_ref(table)))
+        models = set(queue)
+        while queue:
+            scan = self.get_identifier_scan(queue.popleft())
+            for identifier in sorted(scan.identifiers) if scan else []:
+                for model in models_named(identifier):
+                    if model not in models:
+                        models.add(model)
+                        queue.append(model)
+        return models
+    
+    def get_sql_analysis(self, table_name: str, need_tree: bool = True) -> Optional[Dict]:
+        """
+        Return the parsed tree and column map for a model, parsing at most once per content hash
+        
+        Lookup order: in-memory cache, then the on-disk cache (if cache_dir was given),
+        then a fresh sqlglot parse whose result is written back to both caches.
+        Entries from parallel analysis (analyze_all_models with jobs > 1) come back from the
+        workers without their tree; it is parsed here on first use.
+        
+        Args:
+            need_tree: set False when only "columns"/"column_dependencies" are needed, so a
+                cached entry without its tree is returned as is
+        
+        Returns:
+            Dict with "cache_key", "parsed" (unless need_tree is False) and "columns"
+            (extract_snowflake_columns output), or None
+        """
+        sql_content = self.load_sql_file(table_name)
+        if sql_content is None:
             return None
+        
+        cache_key = compute_cache_key(sql_content, self.dialect)
+        cached = self.analysis_cache.get(table_name)
+        if cached and cached["cache_key"] == cache_key and ("parsed" in cached or not need_tree):
+            self.stats.record_model(table_name, "memory_hits")
+            return cached
+        
+        with timed_event("model_analyzed", table=table_name, source="disk_cache") as event:
+            entry = None
+            if cached and cached["cache_key"] == cache_key:
+                entry = {k: v for k, v in cached.items() if k != "cache_key"}
+                event["source"] = "memory"
+            elif self.disk_cache:
+                with self.stats.stage("disk_cache_read"):
+                    entry = self.disk_cache.get(cache_key)
+                self.stats.record_model(table_name, "disk_hits" if entry is not None else "disk_misses")
+            
+            if entry is not None and "parsed" not in entry and need_tree:
+                event["source"] = "parse"
+                start = time.perf_counter()
+                with self.stats.stage("parse"):
+                    entry = dict(entry, parsed=sqlglot.parse_one(sql_content, dialect=self.dialect))
+                self.stats.record_model(table_name, "parses")
+                self.stats.record_model(table_name, "parse_seconds", time.perf_counter() - start)
+                if self.disk_cache:
+                    self.disk_cache.put(cache_key, entry)
+            elif entry is None:
+                event["source"] = "parse"
+                start = time.perf_counter()
+                with self.stats.stage("parse"):
+                    entry = analyze_compiled_model(sql_content, dialect=self.dialect)
+                self.stats.record_model(table_name, "parses")
+                self.stats.record_model(table_name, "parse_seconds", time.perf_counter() - start)
+                if self.disk_cache:
+                    self.disk_cache.put(cache_key, entry)
+        
+        entry = dict(entry, cache_key=cache_key)
+        self.analysis_cache[table_name] = entry
+        return entry
+    
+    def get_column_dependencies(self, table_name: str) -> Optional[Dict[str, Dict]]:
+        """
+        Single-file dependencies of every output column of a model (see extract_column_dependencies),
+        computed once and stored alongside the parsed tree in the analysis caches
+        (or taken from the incremental state file when the model is unchanged)
+        
+        In schema-aware mode stars are expanded through the column catalog, which makes a model's
+        dependencies depend on other models' columns too; those are only kept in memory.
+        """
+        if self.column_catalog is not None:
+            column_dependencies = self.catalog_column_dependencies.get(table_name)
+            if column_dependencies is None:
+                analysis = self.get_sql_analysis(table_name)
+                if analysis is None:
+                    return None
+                with self.stats.stage("column_dependencies"):
+                    column_dependencies = extract_column_dependencies(
+                        self.load_sql_file(table_name), analysis["parsed"], analysis["columns"], self.dialect, self.column_catalog
+                    )
+                self.catalog_column_dependencies[table_name] = column_dependencies
+            return column_dependencies
+        
+        if table_name in self.model_state:
+            self.stats.record_model(table_name, "state_hits")
+            return self.model_state[table_name]["column_dependencies"]
+        
+        analysis = self.get_sql_analysis(table_name, need_tree=False)
+        if analysis is None:
+            return None
+        
+        if "column_dependencies" not in analysis:
+            analysis = self.get_sql_analysis(table_name)
+            start = time.perf_counter()
+            with timed_event("column_dependencies_extracted", table=table_name), self.stats.stage("column_dependencies"):
+                analysis["column_dependencies"] = extract_column_dependencies(
+                    self.load_sql_file(table_name), analysis["parsed"], analysis["columns"], self.dialect
+                )
+            self.stats.record_model(table_name, "dependency_seconds", time.perf_counter() - start)
+            if self.disk_cache:
+                self.disk_cache.put(analysis["cache_key"], {k: v for k, v in analysis.items() if k != "cache_key"})
+        return analysis["column_dependencies"]
+    
+    def analyze_all_models(self, jobs: Optional[int] = None, include_column_dependencies: bool = True,
+                           table_names: Optional[Set[str]] = None, keep_trees: bool = False) -> int:
+        """
+        Bulk pre-analysis stage: parse and extract columns for every compiled model up front
+        
+        Models already present in the in-memory or on-disk cache are skipped; the rest are
+        fanned out over a ProcessPoolExecutor when jobs > 1 (jobs=0 uses every CPU) and the
+        results are merged into the tracer's caches.
+        
+        Args:
+            table_names: only analyse these models (default: every mapped model)
+            keep_trees: have workers send parsed trees back too, for models that are about to be
+                traced (by default only columns and dependencies come back, see _analyze_model_task)
+        
+        Returns:
+            Number of models that had to be analysed
+        """
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
+        if table_names is None:
+            table_names = self.table_to_file_map
+        table_names = [table_name for table_name in table_names if table_name in self.table_to_file_map]
+        
+        self.prefetch_sql_files(table_names=[
+            table_name for table_name in table_names
+            if not (include_column_dependencies and table_name in self.model_state)
+        ])
+        
+        pending = []
+        for table_name in sorted(table_names):
+            if include_column_dependencies and table_name in self.model_state:
+                continue
+            sql_content = self.load_sql_file(table_name)
+            if sql_content is None:
+                continue
+            
+            cache_key = compute_cache_key(sql_content, self.dialect)
+            cached = self.analysis_cache.get(table_name)
+            if cached and cached["cache_key"] == cache_key and ("parsed" in cached or not keep_trees):
+                self.stats.record_model(table_name, "memory_hits")
+                continue
+            
+            entry = None
+            if self.disk_cache:
+                with self.stats.stage("disk_cache_read"):
+                    entry = self.disk_cache.get(cache_key)
+            if entry is not None and (not include_column_dependencies or "column_dependencies" in entry) and ("parsed" in entry or not keep_trees):
+                self.stats.record_model(table_name, "disk_hits")
+                self.analysis_cache[table_name] = dict(entry, cache_key=cache_key)
+                continue
+            if self.disk_cache:
+                self.stats.record_model(table_name, "disk_misses")
+            
+            pending.append((table_name, cache_key, sql_content))
+        
+        if not pending:
+            return 0
+        
+        logger.info("⚙️  Analysing %s models with %s worker(s)", len(pending), jobs or 1)
+        tasks = [(table_name, sql_content, include_column_dependencies, self.dialect) for table_name, _, sql_content in pending]
+        cache_keys = {table_name: cache_key for table_name, cache_key, _ in pending}
+        
+        if jobs and jobs > 1 and len(pending) > 1:
+            chunksize = max(1, len(tasks) // (jobs * 4))
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(partial(_analyze_model_task, keep_tree=keep_trees), tasks, chunksize=chunksize))
+        else:
+            results = [_analyze_model_task(task, keep_tree=True) for task in tasks]
+        
+        for table_name, entry, seconds in results:
+            # Worker time covers parsing plus (optionally) column dependency extraction
+            self.stats.add_stage_time("parse", seconds)
+            self.stats.record_model(table_name, "parses")
+            self.stats.record_model(table_name, "parse_seconds", seconds)
+            emit_event("model_analyzed", table=table_name, source="parse", seconds=seconds,
+                       include_column_dependencies=include_column_dependencies, ok=entry is not None)
+            if entry is None:
+                continue
+            cache_key = cache_keys[table_name]
+            if self.disk_cache:
+                self.disk_cache.put(cache_key, entry)
+            self.analysis_cache[table_name] = dict(entry, cache_key=cache_key)
+        
+        return len(pending)
     
-    def trace_column_lineage_across_files(self, presentation_table: str, target_column: str, visited: Optional[Set[str]] = None, show_cte_messages: bool = True) -> Dict:
+    def trace_column_lineage_across_files(self, presentation_table: str, target_column: str, visited: Optional[Set[str]] = None, show_cte_messages: bool = True,
+                                          max_depth: Optional[int] = None, stop_at_layers: Optional[List[str]] = None, time_budget_ms: Optional[float] = None) -> Dict:
         """
         FIXED: Properly bridges between SQL references, manifest data, and back to SQL
         FIXED: Now properly tracks resolved table names for accurate DAG visualization
         FIXED: Implements staging boundary logic - stops tracing at staging models
+        NEW: Memoizes results per (table, column) so diamond-shaped DAGs share one subtree
+        NEW: Bounded tracing for interactive use - stop after max_depth table hops, at tables in
+             stop_at_layers (layer names such as "staging"/"snapshot", or name prefixes such as "wrk_"),
+             or once time_budget_ms has elapsed. Cut-off columns come back as "truncated" frontier
+             nodes (with "expand": {"table", "column"} to trace them later) and the top-level result
+             gets "truncated": True plus the "frontier" list.
+        
+        `visited` holds the current recursion path only, so real cycles are still detected.
+        A result is memoized only if no dependency was skipped as a cycle while computing it,
+        since such a result depends on the path it was reached from. Bounded traces neither read
+        nor fill trace_memo; they share subtrees through a memo of their own, so the limits are
+        always applied whatever was traced before.
         """
         if visited is None:
+            if max_depth is not None or stop_at_layers or time_budget_ms is not None:
+                return self._trace_with_limits(presentation_table, target_column, show_cte_messages,
+                                               max_depth, stop_at_layers, time_budget_ms)
             visited = set()
             
         visit_key = f"{presentation_table}.{target_column}"
         if visit_key in visited:
+            self._cycle_cuts += 1
             return {"error": f"Circular reference detected: {visit_key}"}
-            
+        
+        memo_key = (self.extract_table_name_from_full_ref(presentation_table).lower(), target_column.lower())
+        # A bounded trace only shares subtrees reached at the same depth under the same limits
+        memo = self.trace_memo if self._trace_limits is None else self._trace_limits["memo"]
+        if self._trace_limits is not None and self._trace_limits["max_depth"] is not None:
+            memo_key += (len(visited),)
+        if memo_key in memo:
+            self.stats.count("trace_memo_hits")
+            emit_event("column_traced", table=memo_key[0], column=memo_key[1], depth=len(visited), memoized=True, seconds=0.0)
+            return memo[memo_key]
+        
+        if self._trace_limits is not None and visited:
+            truncated_reason = self._truncation_reason(presentation_table, len(visited))
+            if truncated_reason:
+                return self._truncated_frontier(presentation_table, target_column, truncated_reason)
+        
+        cycle_cuts_before = self._cycle_cuts
         visited.add(visit_key)
+        try:
+            with timed_event("column_traced", table=memo_key[0], column=memo_key[1], depth=len(visited) - 1, memoized=False), \
+                    self.stats.stage("cross_file_trace"):
+                result = self._trace_column_lineage_uncached(presentation_table, target_column, visited, show_cte_messages)
+        finally:
+            visited.discard(visit_key)
+        
+        if self._cycle_cuts == cycle_cuts_before and "error" not in result:
+            memo[memo_key] = result
+        return result
+    
+    def _trace_with_limits(self, presentation_table: str, target_column: str, show_cte_messages: bool,
+                           max_depth: Optional[int], stop_at_layers: Optional[List[str]], time_budget_ms: Optional[float]) -> Dict:
+        """
+        Top-level bounded trace (see trace_column_lineage_across_files)
+        """
+        stop_layers, stop_prefixes = set(), []
+        for layer in stop_at_layers or []:
+            layer = layer.lower()
+            if layer in LAYER_ORDER:
+                stop_layers.add(layer)
+            else:
+                stop_prefixes.append(layer)
+        deadline = time.perf_counter() + time_budget_ms / 1000 if time_budget_ms is not None else None
         
-        print(f"\n🔍 Tracing column '{target_column}' in table '{presentation_table}'")
+        self._trace_limits = {"max_depth": max_depth, "stop_layers": stop_layers, "stop_prefixes": tuple(stop_prefixes), "deadline": deadline,
+                             "memo": {}}
+        self._trace_frontier = []
+        try:
+            result = self.trace_column_lineage_across_files(presentation_table, target_column, set(), show_cte_messages)
+            frontier = self._trace_frontier
+        finally:
+            self._trace_limits = None
+            self._trace_frontier = []
+        
+        if frontier:
+            # The bounded memo is dropped with the trace, so the top-level dict is ours to annotate
+            result = dict(result, truncated=True, frontier=frontier)
+            logger.info("⏸️  Trace truncated at %s column(s)", len(frontier))
+        return result
+    
+    def _truncation_reason(self, table: str, depth: int) -> Optional[str]:
+        """
+        Why the active trace limits stop at table (depth hops from the traced column), or None to keep going
+        """
+        limits = self._trace_limits
+        if limits["deadline"] is not None and time.perf_counter() > limits["deadline"]:
+            return "time_budget"
+        if limits["max_depth"] is not None and depth > limits["max_depth"]:
+            return "max_depth"
+        if limits["stop_layers"] or limits["stop_prefixes"]:
+            table_name = self.extract_table_name_from_full_ref(table).lower()
+            if table_name.startswith(limits["stop_prefixes"]):
+                return "stop_at_layer"
+            step_type = "SNAPSHOT" if self._check_snapshot_dependencies(table) else "TRANSFORMATION"
+            if classify_layer(table_name, step_type) in limits["stop_layers"]:
+                return "stop_at_layer"
+        return None
+    
+    def _truncated_frontier(self, table: str, column: str, reason: str) -> Dict:
+        table_name = self.extract_table_name_from_full_ref(table)
+        self._trace_frontier.append({"table": table_name, "column": column, "reason": reason})
+        self.stats.count("truncated_traces")
+        return {
+            "table": table_name,
+            "column": column,
+            "type": "truncated",
+            "reason": reason,
+            "expand": {"table": table_name, "column": column},
+            "sql_file": str(self.table_to_file_map.get(table_name, "Unknown"))
+        }
+    
+    def _trace_column_lineage_uncached(self, presentation_table: str, target_column: str, visited: Set[str], show_cte_messages: bool) -> Dict:
+        """
+        One step of trace_column_lineage_across_files: analyse this table and recurse into its dependencies
+        """
+        logger.info("\n🔍 Tracing column '%s' in table '%s'", target_column, presentation_table)
         
         # STEP 1: Check if this is a snapshot using the ACTUAL table reference
         # The presentation_table might be a full SQL reference like "database.schema.table"
         snapshot_dependencies = self._check_snapshot_dependencies(presentation_table)
         
         if snapshot_dependencies:
-            print(f"📸 Found snapshot with {len(snapshot_dependencies)} source dependencies")
+            logger.info("📸 Found snapshot with %s source dependencies", len(snapshot_dependencies))
             upstream_lineage = []
             
             for i, dep in enumerate(snapshot_dependencies, 1):
                 dep_table = dep['table']  # This is now the ACTUAL relation_name from manifest
-                print(f"   📋 Snapshot dependency {i}: {dep_table}")
+                logger.info("   📋 Snapshot dependency %s: %s", i, dep_table)
                 
                 # Check if this dependency is a source (external) table
                 is_source, reason = self.is_source_table(dep_table)
                 
                 if is_source:
-                    print(f"   ✅ Found external source: {dep_table} ({reason})")
+                    logger.info("   ✅ Found external source: %s (%s)", dep_table, reason)
                     upstream_lineage.append({
                         "dependency": dep,
                         "upstream_trace": {
@@ -335,13 +1036,13 @@ class DBTLineageTracer:
                     dep_visit_key = f"{dep_table}.{target_column}"
                     
                     if dep_visit_key not in visited:
-                        print(f"   ⬆️  Tracing upstream: {dep_table} -> {dep_table_name}")
+                        logger.info("   ⬆️  Tracing upstream: %s -> %s", dep_table, dep_table_name)
                         try:
                             # FIXED: Pass the table name for file lookup, but preserve full reference in results
                             upstream_trace = self.trace_column_lineage_across_files(
                                 dep_table_name, 
                                 target_column, 
-                                visited.copy(),
+                                visited,
                                 show_cte_messages=False
                             )
                             upstream_lineage.append({
@@ -349,9 +1050,10 @@ class DBTLineageTracer:
                                 "upstream_trace": upstream_trace
                             })
                         except Exception as e:
-                            print(f"❌ Error tracing {dep_table}: {e}")
+                            logger.error("❌ Error tracing %s: %s", dep_table, e)
                     else:
-                        print(f"   🔄 Already visited: {dep_table}")
+                        logger.info("   🔄 Already visited: %s", dep_table)
+                        self._cycle_cuts += 1
             
             return {
                 "table": presentation_table,
@@ -375,13 +1077,13 @@ class DBTLineageTracer:
             stg_pattern = f"stg_{sql_table_name}"
             sql_content = self.load_sql_file(stg_pattern)
             if sql_content:
-                print(f"🔄 Resolved {sql_table_name} → {stg_pattern}")
+                logger.info("🔄 Resolved %s → %s", sql_table_name, stg_pattern)
                 resolved_table_name = stg_pattern  # Track that we resolved it
                 sql_table_name = stg_pattern  # Update the table name for downstream processing
         
         if not sql_content:
             # If still no file found, treat as source
-            print(f"✅ Found source table: {presentation_table} (missing_file)")
+            logger.info("✅ Found source table: %s (missing_file)", presentation_table)
             return {
                 "table": presentation_table,
                 "column": target_column,
@@ -391,38 +1093,33 @@ class DBTLineageTracer:
             }
         
         try:
-            # Import the fixed column lineage function
-            try:
-                from column_lineage import trace_column_lineage
-            except ImportError:
-                from paste import trace_column_lineage
-            
-            # Trace the column within this single file
-            single_file_trace = trace_column_lineage(sql_content, target_column)
+            # Trace the column within this single file, reusing the cached parse and column map
+            single_file_trace = self._single_file_trace(sql_table_name, target_column, sql_content)
             
             if "error" in single_file_trace:
-                print(f"❌ Error in single file trace: {single_file_trace['error']}")
+                logger.error("❌ Error in single file trace: %s", single_file_trace['error'])
                 return single_file_trace
                 
             dependencies = single_file_trace.get('next_columns_to_search', [])
             cte_transformations = single_file_trace.get('cte_transformations', [])
+            self.stats.count("cte_transformations", len(cte_transformations))
             
             # Show CTE transformations info
             if cte_transformations and show_cte_messages:
-                print(f"🔄 Found {len(cte_transformations)} intra-file CTE transformations in {sql_table_name}")
+                logger.info("🔄 Found %s intra-file CTE transformations in %s", len(cte_transformations), sql_table_name)
                 for cte_info in cte_transformations:
                     cte_column = cte_info.get('column', cte_info.get('columns', 'unknown'))
-                    print(f"   └─ CTE '{cte_info['cte_name']}' transforms {cte_column}")
+                    logger.info("   └─ CTE '%s' transforms %s", cte_info['cte_name'], cte_column)
             
             upstream_lineage = []
-            print(f"📊 Found {len(dependencies)} external dependencies")
+            logger.info("📊 Found %s external dependencies", len(dependencies))
             
             # CRITICAL FIX: Use resolved name to determine current layer
             current_table_name = resolved_table_name if resolved_table_name else sql_table_name
             is_staging_model = current_table_name.startswith('stg_')
             
             if is_staging_model:
-                print(f"🏁 STAGING BOUNDARY: {current_table_name} is a staging model - treating all dependencies as sources")
+                logger.info("🏁 STAGING BOUNDARY: %s is a staging model - treating all dependencies as sources", current_table_name)
             
             # STEP 3: Process dependencies - handle both snapshot and regular dependencies
             for dep in dependencies:
@@ -430,11 +1127,11 @@ class DBTLineageTracer:
                     dep_table = dep.get('table', 'unknown_table')
                     dep_column = dep.get('column', 'unknown_column')
                     
-                    print(f"   📋 Processing dependency: {dep_table}.{dep_column}")
+                    logger.info("   📋 Processing dependency: %s.%s", dep_table, dep_column)
                     
                     # NEW STAGING BOUNDARY LOGIC: If we're in a staging model, treat all dependencies as sources
                     if is_staging_model:
-                        print(f"   🏁 Staging boundary: treating {dep_table}.{dep_column} as ultimate source")
+                        logger.info("   🏁 Staging boundary: treating %s.%s as ultimate source", dep_table, dep_column)
                         upstream_lineage.append({
                             "dependency": dep,
                             "upstream_trace": {
@@ -455,12 +1152,12 @@ class DBTLineageTracer:
                     resolved_relation_name = self._resolve_table_to_relation_name(dep_table)
                     
                     if resolved_relation_name:
-                        print(f"   🔍 Resolved via manifest: {dep_table} -> {resolved_relation_name}")
+                        logger.info("   🔍 Resolved via manifest: %s -> %s", dep_table, resolved_relation_name)
                         # Check if the resolved name is a snapshot
                         resolved_snapshot_deps = self._check_snapshot_dependencies(resolved_relation_name)
                         
                         if resolved_snapshot_deps:
-                            print(f"   📸 Resolved dependency is a snapshot!")
+                            logger.info("   📸 Resolved dependency is a snapshot!")
                             # Recursively trace through the snapshot
                             resolved_table_name_dep = self.extract_table_name_from_full_ref(resolved_relation_name)
                             dep_visit_key = f"{resolved_relation_name}.{dep_column}"
@@ -469,7 +1166,7 @@ class DBTLineageTracer:
                                 upstream_trace = self.trace_column_lineage_across_files(
                                     resolved_table_name_dep,
                                     dep_column,
-                                    visited.copy(),
+                                    visited,
                                     show_cte_messages=False
                                 )
                                 upstream_lineage.append({
@@ -480,14 +1177,15 @@ class DBTLineageTracer:
                                     "resolved_reference": resolved_relation_name
                                 })
                             else:
-                                print(f"   🔄 Already visited resolved: {resolved_relation_name}")
+                                logger.info("   🔄 Already visited resolved: %s", resolved_relation_name)
+                                self._cycle_cuts += 1
                             continue
                     
                     # If not resolved via manifest, proceed with original logic
                     is_source, reason = self.is_source_table(dep_table)
                     
                     if is_source:
-                        print(f"   ✅ Found source: {dep_table}.{dep_column} ({reason})")
+                        logger.info("   ✅ Found source: %s.%s (%s)", dep_table, dep_column, reason)
                         upstream_lineage.append({
                             "dependency": dep,
                             "upstream_trace": {
@@ -499,7 +1197,7 @@ class DBTLineageTracer:
                             }
                         })
                     elif reason == "potential_cte":
-                        print(f"   🔄 CTE reference: {dep_table}.{dep_column}")
+                        logger.info("   🔄 CTE reference: %s.%s", dep_table, dep_column)
                         upstream_lineage.append({
                             "dependency": dep,
                             "upstream_trace": {
@@ -516,12 +1214,12 @@ class DBTLineageTracer:
                         dep_visit_key = f"{dep_table}.{dep_column}"
                         
                         if dep_visit_key not in visited:
-                            print(f"   ⬆️  Tracing upstream: {dep_table}.{dep_column}")  
+                            logger.info("   ⬆️  Tracing upstream: %s.%s", dep_table, dep_column)
                             try:
                                 upstream_trace = self.trace_column_lineage_across_files(
                                     dep_table_name,
                                     dep_column,
-                                    visited.copy(),
+                                    visited,
                                     show_cte_messages=False
                                 )
                                 upstream_lineage.append({
@@ -529,7 +1227,7 @@ class DBTLineageTracer:
                                     "upstream_trace": upstream_trace
                                 })
                             except Exception as e:
-                                print(f"❌ Error tracing {dep_table_name}.{dep_column}: {e}")
+                                logger.error("❌ Error tracing %s.%s: %s", dep_table_name, dep_column, e)
                                 upstream_lineage.append({
                                     "dependency": dep,
                                     "upstream_trace": {
@@ -541,10 +1239,11 @@ class DBTLineageTracer:
                                     }
                                 })
                         else:
-                            print(f"   🔄 Already visited: {dep_table}.{dep_column}")
+                            logger.info("   🔄 Already visited: %s.%s", dep_table, dep_column)
+                            self._cycle_cuts += 1
                             
                 except Exception as e:
-                    print(f"❌ Error processing dependency {dep}: {e}")
+                    logger.error("❌ Error processing dependency %s: %s", dep, e)
                     continue
             
             # CRITICAL FIX: Use the resolved table name for accurate layer classification
@@ -565,62 +1264,590 @@ class DBTLineageTracer:
             }
             
         except Exception as e:
-            print(f"❌ Error tracing column in {presentation_table}: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("❌ Error tracing column in %s: %s", presentation_table, e)
+            logger.debug("Traceback for %s", presentation_table, exc_info=True)
             return {"error": f"Error tracing column in {presentation_table}: {str(e)}"}
-
-
-def get_upstream_tables(lineage_result):
-    """
-    Extract table dependencies from lineage result to understand actual data flow relationships
-    """
-    dependencies = {}
     
-    def walk_lineage(result, current_table=None):
-        if not isinstance(result, dict):
-            return
+    def _single_file_trace(self, sql_table_name: str, target_column: str, sql_content: str) -> Dict:
+        """
+        trace_column_lineage of one column within its model's file, taken from trace_table's batch when available
+        """
+        try:
+            from column_lineage import trace_column_lineage
+        except ImportError:
+            from paste import trace_column_lineage
+        
+        single_file_trace = self.single_file_traces.get((sql_table_name, target_column.lower()))
+        if single_file_trace is not None:
+            self.stats.count("batched_single_file_traces")
+            return single_file_trace
+        
+        scan = self.get_identifier_scan(sql_table_name)
+        if scan is not None and not scan.may_reference(target_column):
+            # Neither named nor selectable through a star: the parse could only report it missing
+            self.stats.count("prescan_skipped_traces")
+            return {
+                "error": f"Column '{target_column}' not found in any SELECT statement",
+                "llm_context": f"The column '{target_column}' is not mentioned in {sql_table_name}, which selects no *.",
+                "next_columns_to_search": [],
+                "full_lineage": {}
+            }
+        
+        analysis = self.get_sql_analysis(sql_table_name)
+        with self.stats.stage("single_file_trace"):
+            return trace_column_lineage(
+                sql_content,
+                target_column,
+                parsed=analysis["parsed"],
+                base_columns=analysis["columns"],
+                column_catalog=self.column_catalog,
+                dialect=self.dialect
+            )
+    
+    def get_upstream_column_edges(self, table: str, column: str) -> List[Dict]:
+        """
+        NEW: Direct upstream edges of one column, analysing only that column's own model
+        
+        Dependencies are resolved with the same rules as the project graph (staging boundary,
+        snapshots, sources, stg_ fallback), and each edge carries the expression of the UNION
+        branch it comes from; snapshots pass the column through from every model they snapshot.
+        Unchanged models are answered from the incremental state file, when there is one.
+        
+        Returns:
+            [{"table", "column", "upstream_table", "upstream_column", "upstream_kind", "reason",
+              "expression", "transformation_type"}]; empty for sources and unparseable models
+        """
+        table_name = self.extract_table_name_from_full_ref(table)
+        edges = []
+        
+        snapshot_dependencies = self._check_snapshot_dependencies(table)
+        if snapshot_dependencies:
+            for dep in snapshot_dependencies:
+                resolved = self._resolve_graph_dependency(dep["table"], table_name)
+                if resolved:
+                    edges.append(self._column_edge(table_name, column, resolved, column, None, "snapshot"))
+            return edges
+        
+        if table_name not in self.table_to_file_map and f"stg_{table_name}" in self.table_to_file_map:
+            table_name = f"stg_{table_name}"
+        sql_content = self.load_sql_file(table_name)
+        if not sql_content:
+            return edges
+        
+        # Explicitly projected columns come from the model's stored dependencies (incremental state,
+        # or computed once for the whole model); columns reached through a star are traced on their own
+        column_info = next((info for name, info in (self.get_column_dependencies(table_name) or {}).items()
+                            if name.lower() == column.lower() and name != "*"), None)
+        if column_info is not None:
+            dependencies, expressions = column_info["dependencies"], column_info["branch_expressions"]
+        else:
+            single_file_trace = self._single_file_trace(table_name, column, sql_content)
+            if "error" in single_file_trace:
+                logger.error("❌ Error in single file trace: %s", single_file_trace['error'])
+                return edges
+            dependencies = single_file_trace.get("next_columns_to_search", [])
+            expressions = branch_expressions(self.get_sql_analysis(table_name, need_tree=False)["columns"], column)
+        
+        for dep in dependencies:
+            resolved = self._resolve_graph_dependency(dep.get("table", ""), table_name)
+            if resolved:
+                expression, transformation_type = expressions.get(dep.get("union_branch"), ("*", "star"))
+                edges.append(self._column_edge(table_name, column, resolved, dep["column"], expression, transformation_type))
+        return edges
+    
+    @staticmethod
+    def _column_edge(table: str, column: str, resolved: Tuple[str, str, str], upstream_column: str,
+                     expression: Optional[str], transformation_type: str) -> Dict:
+        upstream_table, upstream_kind, reason = resolved
+        return {
+            "table": table.lower(),
+            "column": column.lower(),
+            "upstream_table": upstream_table.replace('"', '').lower(),
+            "upstream_column": upstream_column.lower(),
+            "upstream_kind": upstream_kind,
+            "reason": reason,
+            "expression": expression,
+            "transformation_type": transformation_type
+        }
+    
+    def iter_lineage_edges(self, table: str, column: str, max_depth: Optional[int] = None,
+                           on_edge: Optional[Callable[[Dict], Optional[bool]]] = None) -> Iterator[Dict]:
+        """
+        NEW: Lazily yield the upstream lineage edges of table.column, breadth-first
+        
+        Each model is analysed only when the walk reaches it, so consumers can render the
+        first hops right away and stop early (break out of the loop) without paying for
+        the rest of the upstream tree. Every column is expanded once. Once the walk is exhausted,
+        the models it analysed are written to the incremental state file (if any).
+        
+        Args:
+            max_depth: do not expand columns more than this many hops upstream
+            on_edge: called with each edge before it is yielded; returning False keeps the
+                walk from expanding that edge's upstream column
+        
+        Yields:
+            get_upstream_column_edges dicts plus "depth" (1 for the column's direct inputs)
+        """
+        start = (self.extract_table_name_from_full_ref(table).lower(), column.lower())
+        expanded = {start}
+        queue = deque([(table, column, 1)])
+        
+        while queue:
+            current_table, current_column, depth = queue.popleft()
+            with self.stats.stage("edge_iteration"):
+                edges = self.get_upstream_column_edges(current_table, current_column)
             
-        table = result.get('table', '').split('.')[-1]
-        if not table or table == 'unknown':
+            for edge in edges:
+                edge["depth"] = depth
+                expand = on_edge(edge) if on_edge else None
+                self.stats.count("lineage_edges_yielded")
+                yield edge
+                
+                node = (edge["upstream_table"], edge["upstream_column"])
+                if expand is False or edge["upstream_kind"] == "source" or node in expanded:
+                    continue
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                expanded.add(node)
+                queue.append((edge["upstream_table"], edge["upstream_column"], depth + 1))
+        
+        with self.stats.stage("state_save"):
+            self.save_state()
+    
+    def render_single_file_trace(self, table: str, column: str) -> Optional[Dict]:
+        """
+        Re-run the within-file trace of table.column from the cached parse
+        (how CompactLineage renders context text on demand)
+        """
+        try:
+            from column_lineage import trace_column_lineage
+        except ImportError:
+            from paste import trace_column_lineage
+        
+        table_name = self.extract_table_name_from_full_ref(table)
+        analysis = self.get_sql_analysis(table_name)
+        if analysis is None:
+            return None
+        return trace_column_lineage(
+            self.load_sql_file(table_name),
+            column,
+            parsed=analysis["parsed"],
+            base_columns=analysis["columns"],
+            column_catalog=self.column_catalog,
+            dialect=self.dialect
+        )
+    
+    def trace_column_lineage_compact(self, presentation_table: str, target_column: str) -> CompactLineage:
+        """
+        NEW: trace_column_lineage_across_files as a CompactLineage (interned __slots__ nodes,
+        context text rendered lazily); call .to_dict() for the usual nested dict shape
+        
+        Subtrees already in trace_memo are reused, but the nested dicts built here go to a scratch
+        memo layered over it and are released once they have been converted.
+        """
+        shared_memo = self.trace_memo
+        self.trace_memo = ChainMap({}, shared_memo)
+        try:
+            result = self.trace_column_lineage_across_files(presentation_table, target_column)
+        finally:
+            self.trace_memo = shared_memo
+        return CompactLineage.from_result(result, renderer=self.render_single_file_trace)
+    
+    def trace_table(self, table: str, columns: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        NEW: Trace every output column of a model across files, analysing the model's own SQL once
+        
+        All requested columns are resolved in a single trace_table_lineage pass over the
+        model's SELECTs, UNION branches and CTEs; the upstream hops then share trace_memo.
+        
+        Args:
+            table: model name or full table reference
+            columns: output columns to trace (default: every explicitly projected column)
+        
+        Returns:
+            {column: trace_column_lineage_across_files result}
+        """
+        try:
+            from column_lineage import trace_table_lineage
+        except ImportError:
+            from paste import trace_table_lineage
+        
+        sql_table_name = self.extract_table_name_from_full_ref(table)
+        sql_content = self.load_sql_file(sql_table_name)
+        if not sql_content:
+            sql_content = self.load_sql_file(f"stg_{sql_table_name}")
+            if sql_content:
+                sql_table_name = f"stg_{sql_table_name}"
+        
+        if sql_content and not self._check_snapshot_dependencies(table):
+            analysis = self.get_sql_analysis(sql_table_name)
+            with self.stats.stage("table_trace"):
+                table_traces = trace_table_lineage(
+                    sql_content,
+                    columns,
+                    parsed=analysis["parsed"],
+                    base_columns=analysis["columns"],
+                    column_catalog=self.column_catalog,
+                    dialect=self.dialect
+                )
+            for column, single_file_trace in table_traces.items():
+                self.single_file_traces[(sql_table_name, column.lower())] = single_file_trace
+            columns = list(table_traces)
+        
+        return {
+            column: self.trace_column_lineage_across_files(table, column)
+            for column in (columns or [])
+        }
+    
+    def _resolve_graph_dependency(self, dep_table: str, current_table: str) -> Optional[Tuple[str, str, str]]:
+        """
+        Resolve a dependency reference to its lineage graph table, mirroring the rules
+        used by trace_column_lineage_across_files (staging boundary, snapshots, sources, stg_ fallback)
+        
+        Returns:
+            (graph table name, kind, reason) or None for unqualified/CTE references
+        """
+        if not dep_table:
+            return None
+        
+        if current_table.startswith('stg_'):
+            return dep_table, "source", "staging_boundary"
+        
+        resolved_relation_name = self._resolve_table_to_relation_name(dep_table)
+        if resolved_relation_name and self._check_snapshot_dependencies(resolved_relation_name):
+            return self.extract_table_name_from_full_ref(resolved_relation_name), "snapshot", "resolved_via_manifest"
+        
+        is_source, reason = self.is_source_table(dep_table)
+        if is_source:
+            return dep_table, "source", reason
+        if reason == "potential_cte":
+            return None
+        
+        table_name = self.extract_table_name_from_full_ref(dep_table)
+        if table_name not in self.table_to_file_map and f"stg_{table_name}" in self.table_to_file_map:
+            table_name = f"stg_{table_name}"
+        return table_name, "model", reason
+    
+    def _add_model_to_graph(self, graph: ColumnLineageGraph, table_name: str) -> None:
+        """
+        Add an edge for every projected column dependency of one compiled model
+        """
+        column_dependencies = self.get_column_dependencies(table_name)
+        if column_dependencies is None:
             return
+        graph.add_table(table_name, "model")
+        
+        for column, column_info in column_dependencies.items():
+            for dep in column_info["dependencies"]:
+                resolved = self._resolve_graph_dependency(dep.get("table", ""), table_name)
+                if not resolved:
+                    continue
+                upstream_table, upstream_kind, reason = resolved
+                expression, transformation_type = column_info["branch_expressions"].get(dep.get("union_branch"), ("*", "star"))
+                
+                graph.add_edge(
+                    table_name, column, upstream_table, dep["column"],
+                    expression=expression,
+                    transformation_type=transformation_type,
+                    upstream_kind=upstream_kind,
+                    level=dep.get("level"),
+                    reason=reason,
+                    via_cte=dep.get("cte_intermediate"),
+                    union_branch=dep.get("union_branch")
+                )
+    
+    def _add_snapshots_to_graph(self, graph: ColumnLineageGraph) -> None:
+        """
+        Add pass-through ("*") edges from each manifest snapshot to the models it snapshots
+        """
+        for key, node in self.manifest_data.get('nodes', {}).items():
+            if not key.startswith('snapshot.'):
+                continue
             
-        if table not in dependencies:
-            dependencies[table] = set()
+            relation_name = (node.get('relation_name') or node.get('name', '')).replace('"', '')
+            snapshot_table = self.extract_table_name_from_full_ref(relation_name)
+            graph.add_table(snapshot_table, "snapshot")
             
-        # Handle different lineage structures
-        upstream_lineage = result.get('upstream_lineage', [])
-        
-        for upstream in upstream_lineage:
-            if isinstance(upstream, dict):
-                # Handle dependency structure
-                dependency = upstream.get('dependency', {})
-                upstream_trace = upstream.get('upstream_trace', {})
-                
-                # Get upstream table from dependency or trace
-                upstream_table = None
-                if dependency and dependency.get('table'):
-                    upstream_table = dependency.get('table', '').split('.')[-1]
-                elif upstream_trace and upstream_trace.get('table'):
-                    upstream_table = upstream_trace.get('table', '').split('.')[-1]
-                
-                # Only add non-source dependencies
-                if upstream_table and upstream_table != 'unknown':
-                    # Check if this is a source table
-                    if upstream_trace.get('type') not in ['source', 'error']:
-                        dependencies[table].add(upstream_table)
-                
-                # Recursively process upstream
-                if upstream_trace and isinstance(upstream_trace, dict):
-                    walk_lineage(upstream_trace)
+            for dep in self._check_snapshot_dependencies(relation_name):
+                resolved = self._resolve_graph_dependency(dep["table"], snapshot_table)
+                if not resolved:
+                    continue
+                upstream_table, upstream_kind, reason = resolved
+                graph.add_edge(
+                    snapshot_table, "*", upstream_table, "*",
+                    expression=None,
+                    transformation_type="snapshot",
+                    table_kind="snapshot",
+                    upstream_kind=upstream_kind,
+                    level=dep.get("level"),
+                    reason=reason
+                )
+    
+    def new_lineage_graph(self) -> ColumnLineageGraph:
+        """
+        Empty lineage graph; in schema-aware mode its star pass-through follows the column catalog
+        """
+        return ColumnLineageGraph(self._known_columns if self.column_catalog is not None else None)
+    
+    def _known_columns(self, table: str) -> Optional[Set[str]]:
+        known = self.column_catalog.get(table)
+        if known is None and '.' in table:
+            known = self.column_catalog.get(self.extract_table_name_from_full_ref(table))
+        return known
+    
+    def build_project_lineage_graph(self, jobs: Optional[int] = None) -> ColumnLineageGraph:
+        """
+        Analyse every compiled model once and build the project-wide column lineage graph
+        
+        After this, upstream lookups for any column are traversals over an in-memory
+        index (see ColumnLineageGraph) instead of repeated SQL analysis.
+        
+        Args:
+            jobs: Worker processes for the bulk analysis stage (see analyze_all_models)
+        """
+        logger.info("🕸️  Building project lineage graph for %s models", len(self.table_to_file_map))
+        start = time.perf_counter()
+        # Schema-aware dependencies are extracted here against the catalog, so workers send trees instead
+        analysed = self.analyze_all_models(jobs, include_column_dependencies=self.column_catalog is None,
+                                           keep_trees=self.column_catalog is not None)
+        graph = self.new_lineage_graph()
+        
+        with self.stats.stage("graph_build"):
+            for table_name in sorted(self.table_to_file_map):
+                try:
+                    self._add_model_to_graph(graph, table_name)
+                except Exception as e:
+                    logger.error("❌ Error analysing %s for lineage graph: %s", table_name, e)
+            
+            self._add_snapshots_to_graph(graph)
+        with self.stats.stage("state_save"):
+            self.save_state()
+        
+        summary = graph.summary()
+        logger.info("✅ Lineage graph: %s tables, %s columns, %s edges", summary['tables'], summary['columns'], summary['edges'])
+        emit_event("graph_built", models=len(self.table_to_file_map), analysed=analysed,
+                   seconds=round(time.perf_counter() - start, 6), **summary)
+        self.lineage_graph = graph
+        return graph
+    
+    def get_lineage_graph(self, jobs: Optional[int] = None) -> ColumnLineageGraph:
+        """
+        Return the project lineage graph, building it on first use
+        """
+        if self.lineage_graph is None:
+            self.build_project_lineage_graph(jobs)
+        return self.lineage_graph
+    
+    def export_lineage_graph(self, path: str, output_format: Optional[str] = None, jobs: Optional[int] = None) -> Dict[str, int]:
+        """
+        Export the project lineage graph plus source definitions to SQLite or Parquet (see lineage_export)
+        
+        Returns:
+            Row count per exported table
+        """
+        graph = self.get_lineage_graph(jobs)
+        with self.stats.stage("export"):
+            counts = export_graph(graph, path, output_format, self.source_definitions)
+        logger.info("💾 Exported lineage graph to %s: %s edges, %s columns", path, counts["lineage_edges"], counts["lineage_columns"])
+        return counts
+    
+    def get_upstream_columns(self, table: str, column: str, max_depth: Optional[int] = None) -> List[Dict]:
+        """
+        Every upstream column of table.column, answered from the precomputed lineage graph
+        """
+        return self.get_lineage_graph().trace_upstream(table, column, max_depth)
+    
+    def get_downstream_columns(self, table: str, column: str, max_depth: Optional[int] = None) -> List[Dict]:
+        """
+        Every downstream column computed from table.column, answered from the reverse index
+        """
+        return self.get_lineage_graph().trace_downstream(table, column, max_depth)
+    
+    def trace_column_impact(self, table: str, column: str) -> Dict:
+        """
+        Impact analysis: which downstream columns break if table.column changes
+        
+        Uses the precomputed graph's reverse index, so it costs one walk over the affected
+        columns rather than tracing every presentation column upstream.
+        NEW: Without a project graph, only models the identifier pre-scan cannot rule out are
+        analysed (see _impact_subgraph), instead of building the graph for every model.
+        
+        Returns:
+            Dict with every impacted column (with its path), the impacted tables and the
+            end-of-chain columns that nothing else reads (typically mart/presentation columns)
+        """
+        graph = self.lineage_graph if self.lineage_graph is not None else self._impact_subgraph([(table, column)])
+        impacted_columns = graph.trace_downstream(table, column)
+        
+        impacted_tables = {}
+        for node in impacted_columns:
+            impacted_tables.setdefault(node["table"], []).append(node["column"])
+        
+        terminal_columns = [
+            node for node in impacted_columns
+            if node["column"] != "*" and not graph.get_downstream_edges(node["table"], node["column"])
+        ]
+        
+        return {
+            "changed_column": f"{graph.resolve_table(table)}.{column.lower()}",
+            "impacted_column_count": len(impacted_columns),
+            "impacted_columns": impacted_columns,
+            "impacted_tables": {name: sorted(columns) for name, columns in sorted(impacted_tables.items())},
+            "terminal_columns": terminal_columns
+        }
+    
+    def _impact_subgraph(self, columns: Iterable[Tuple[str, str]]) -> ColumnLineageGraph:
+        """
+        Lineage graph holding every downstream edge of the given (table, column) pairs, analysing only candidate models
+        
+        Walks downstream from the changed columns; at each impacted column, the models that may
+        read it (models_referencing) are added to the graph, and their edges give the next
+        impacted columns. Snapshot pass-through edges come from the manifest and are always added.
+        The impacted columns are those the full project graph gives; where several equally short
+        paths reach a column, the path reported may differ.
+        """
+        graph = self.new_lineage_graph()
+        self._add_snapshots_to_graph(graph)
+        starts = []
+        for table, column in columns:
+            table_name = self.extract_table_name_from_full_ref(table)
+            if table_name in self.table_to_file_map:
+                graph.add_table(table_name, "model")
+            starts.append((graph.resolve_table(table), column.lower()))
+        
+        analysed = set()
+        seen = set(starts)
+        queue = deque(sorted(seen))
+        with self.stats.stage("impact_subgraph"):
+            while queue:
+                current_table, current_column = queue.popleft()
+                for model in sorted(self.models_referencing(current_table, current_column) - analysed):
+                    analysed.add(model)
+                    self._add_model_to_graph(graph, model)
+                for edge in graph.get_downstream_edges(current_table, current_column):
+                    node = (edge["table"], edge["column"])
+                    if node not in seen:
+                        seen.add(node)
+                        queue.append(node)
+        
+        with self.stats.stage("state_save"):
+            self.save_state()
+        
+        self.stats.count("prescan_skipped_models", len(self.table_to_file_map) - len(analysed))
+        logger.info("🔎 Impact pre-scan: analysed %s of %s models", len(analysed), len(self.table_to_file_map))
+        return graph
+
+
+def branch_expressions(columns, column: str) -> Dict[int, Tuple[str, str]]:
+    """
+    (expression, type) of an output column in each UNION branch (1-based, as in dependencies' "union_branch")
+    """
+    expressions = {}
+    for select_idx, select_columns in enumerate(columns):
+        for col_info in select_columns:
+            if col_info["target_column"].lower() == column.lower():
+                expressions[select_idx + 1] = (col_info["expression"], col_info["type"])
+    return expressions
+
+
+def extract_column_dependencies(sql_content: str, parsed, columns, dialect: str = DEFAULT_DIALECT, column_catalog=None) -> Dict[str, Dict]:
+    """
+    Trace every output column of a model within its own file
+    (with column_catalog, stars only lead to the tables that have the column; see trace_column_lineage)
+    
+    Returns:
+        {column: {"branch_expressions": {union_branch: (expression, type)}, "dependencies": next_columns_to_search}}
+        where "*" stands for SELECT * pass-through
+    """
+    try:
+        from column_lineage import trace_table_lineage
+    except ImportError:
+        from paste import trace_table_lineage
+    
+    column_names = {}
+    for select_columns in columns:
+        for col_info in select_columns:
+            name = "*" if col_info["type"] == "star" else col_info["target_column"]
+            column_names.setdefault(name.lower(), name)
+    
+    table_traces = trace_table_lineage(sql_content, list(column_names.values()), parsed=parsed, base_columns=columns,
+                                       column_catalog=column_catalog, dialect=dialect)
+    
+    column_dependencies = {}
+    for column, single_file_trace in table_traces.items():
+        if "error" in single_file_trace:
+            continue
+        
+        column_dependencies[column] = {
+            "branch_expressions": branch_expressions(columns, column),
+            "dependencies": single_file_trace.get("next_columns_to_search", [])
+        }
     
-    walk_lineage(lineage_result)
+    return column_dependencies
+
+
+def analyze_compiled_model(sql_content: str, include_column_dependencies: bool = False, dialect: str = DEFAULT_DIALECT) -> Dict:
+    """
+    Parse one compiled model and extract its column map (plus per-column dependencies if requested)
     
-    # Convert sets to lists and sort
-    for table in dependencies:
-        dependencies[table] = sorted(list(dependencies[table]))
+    Kept at module level so it can run inside ProcessPoolExecutor workers.
+    """
+    try:
+        from column_lineage import extract_snowflake_columns
+    except ImportError:
+        from paste import extract_snowflake_columns
     
-    return dependencies
+    parsed = sqlglot.parse_one(sql_content, dialect=dialect)
+    entry = {
+        "parsed": parsed,
+        "columns": extract_snowflake_columns(sql_content, parsed=parsed, dialect=dialect)
+    }
+    if include_column_dependencies:
+        entry["column_dependencies"] = extract_column_dependencies(sql_content, parsed, entry["columns"], dialect)
+    return entry
+
+
+def _read_sql_file(file_path: Path) -> Tuple[Optional[str], Optional[List]]:
+    """
+    Prefetch worker: (content, file signature) of one compiled file, or (None, None) if unreadable
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            sql_content = f.read()
+        stat = file_path.stat()
+        return sql_content, [str(file_path), stat.st_mtime_ns, stat.st_size]
+    except Exception as e:
+        logger.warning("Error reading file %s: %s", file_path, e)
+        return None, None
+
+
+def _analyze_model_task(task: Tuple[str, str, bool, str], keep_tree: bool = False) -> Tuple[str, Optional[Dict], float]:
+    """
+    ProcessPoolExecutor entry point: (table_name, sql_content, include_column_dependencies, dialect) -> (table_name, entry, seconds)
+    
+    The analysis time is measured here and reported by the parent, so worker processes never write events.
+    The parsed tree is dropped unless keep_tree (in-process runs, or models about to be traced):
+    for a whole-project analysis, pickling every tree back costs more than re-parsing the few
+    models that are later traced (see get_sql_analysis).
+    """
+    table_name, sql_content, include_column_dependencies, dialect = task
+    start = time.perf_counter()
+    try:
+        entry = analyze_compiled_model(sql_content, include_column_dependencies, dialect)
+        if not keep_tree:
+            del entry["parsed"]
+    except Exception as e:
+        logger.error("❌ Error analysing %s: %s", table_name, e)
+        entry = None
+    return table_name, entry, round(time.perf_counter() - start, 6)
+
+
+def get_upstream_tables(lineage_result):
+    """
+    Extract table dependencies from lineage result to understand actual data flow relationships
+    (non-source upstream tables per table, from the shared lineage_dag analysis)
+    """
+    return {table: sorted(deps) for table, deps in analyze_lineage(lineage_result).model_dependencies.items()}
 
 
 def format_table_with_upstream(table_name, dependencies):
@@ -648,6 +1875,10 @@ def print_lineage_results(result: Dict, level: int = 0, seen_paths: Optional[Set
             seen_paths.add(source_path)
             print(f"{indent}🔚 SOURCE: {result['table']}.{result['column']} ({result['reason']})")
         return
+    
+    if result.get("type") == "truncated":
+        print(f"{indent}⏸️  NOT TRACED: {result['table']}.{result['column']} ({result['reason']})")
+        return
         
     table_path = f"{result['table']}.{result['column']}"
     if table_path in seen_paths:
@@ -680,17 +1911,49 @@ def print_lineage_results(result: Dict, level: int = 0, seen_paths: Optional[Set
                 print(f"{indent}    ❌ {upstream_trace.get('error', 'Unknown error')}")
 
 
-def build_comprehensive_technical_context(tracer, presentation_table: str, target_column: str):
+def print_impact_results(impact: Dict) -> None:
+    """
+    Pretty print a trace_column_impact result, one downstream path per terminal column
+    """
+    print(f"\n💥 IMPACT ANALYSIS: {impact['changed_column']}")
+    print("="*60)
+    print(f"Impacted columns: {impact['impacted_column_count']} across {len(impact['impacted_tables'])} table(s)")
+    
+    for table, columns in impact["impacted_tables"].items():
+        print(f"  📁 {table}: {', '.join(columns)}")
+    
+    if impact["terminal_columns"]:
+        print("\nEND-OF-CHAIN COLUMNS (nothing downstream reads them):")
+        for node in impact["terminal_columns"]:
+            print(f"  🎯 {node['table']}.{node['column']}")
+            print(f"      └─ {' → '.join(node['path'])}")
+    else:
+        print("\nNo downstream columns depend on this column")
+
+
+def print_profile(stats: LineageStats, output_format: str = "table") -> None:
+    """
+    Print a tracer's profile (see LineageStats) as a sorted table or as JSON
+    """
+    if output_format == "json":
+        print(json.dumps(stats.to_dict(), indent=2))
+    else:
+        print("\n" + stats.report())
+
+
+def build_comprehensive_technical_context(tracer, presentation_table: str, target_column: str, trace_options: Optional[Dict] = None):
     """
     Build comprehensive technical context for LLM consumption
     Supports: documentation generation, issue investigation, development planning
+    NEW: trace_options (max_depth, stop_at_layers, time_budget_ms) bound the trace; columns it did
+         not expand become TRUNCATED steps and are listed in summary["truncated_frontier"]
     """
-    print("="*80)
-    print("BUILDING COMPREHENSIVE TECHNICAL CONTEXT")
-    print("="*80)
+    logger.info("="*80)
+    logger.info("BUILDING COMPREHENSIVE TECHNICAL CONTEXT")
+    logger.info("="*80)
     
     # Get the lineage structure
-    lineage_result = tracer.trace_column_lineage_across_files(presentation_table, target_column)
+    lineage_result = tracer.trace_column_lineage_across_files(presentation_table, target_column, **(trace_options or {}))
     
     if "error" in lineage_result:
         return lineage_result
@@ -796,6 +2059,21 @@ def build_comprehensive_technical_context(tracer, presentation_table: str, targe
                 step_context["sql_expression"] = "; ".join(sql_expressions)
             
             return step_context
+        elif result.get("type") == "truncated":
+            return {
+                "step": step_number,
+                "step_type": "TRUNCATED",
+                "table": result.get('table', 'unknown'),
+                "column": result.get('column', 'unknown'),
+                "sql_file": result.get('sql_file', 'Unknown'),
+                "truncated_reason": result.get('reason', 'unknown'),
+                "transformation_type": f"not traced: {result.get('reason', 'unknown')}",
+                "transformation_details": f"Trace stopped here ({result.get('reason', 'unknown')}); upstream lineage not expanded",
+                "data_scope": "Unknown - upstream not traced",
+                "control_flow": "Not analysed",
+                "data_quality_impact": "Not assessed beyond this point",
+                "business_impact": "Not assessed beyond this point"
+            }
         elif result.get("type") == "error":
             return {
                 "step": step_number,
@@ -877,7 +2155,7 @@ def build_comprehensive_technical_context(tracer, presentation_table: str, targe
         
         # Validate input
         if not isinstance(result, dict):
-            print(f"Warning: Expected dict but got {type(result)}: {result}")
+            logger.warning("⚠️  Expected dict but got %s: %s", type(result), result)
             return [{
                 "step": step_num,
                 "step_type": "ERROR",
@@ -904,12 +2182,12 @@ def build_comprehensive_technical_context(tracer, presentation_table: str, targe
                 for upstream in upstream_lineage:
                     try:
                         if not isinstance(upstream, dict):
-                            print(f"Warning: Upstream entry is not a dict: {upstream}")
+                            logger.warning("⚠️  Upstream entry is not a dict: %s", upstream)
                             continue
                             
                         upstream_trace = upstream.get("upstream_trace", {})
                         if not isinstance(upstream_trace, dict):
-                            print(f"Warning: upstream_trace is not a dict: {upstream_trace}")
+                            logger.warning("⚠️  upstream_trace is not a dict: %s", upstream_trace)
                             continue
                             
                         # Safe access with defaults
@@ -981,6 +2259,7 @@ def build_comprehensive_technical_context(tracer, presentation_table: str, targe
         "aggregation_points": len(aggregation_steps),
         "error_count": len(error_steps),
         "ultimate_sources": list(all_ultimate_sources),
+        "truncated_frontier": [f"{node['table']}.{node['column']}" for node in lineage_result.get("frontier", [])],
         "complexity_assessment": "HIGH" if (high_complexity_steps or cte_consolidated_steps) else ("MEDIUM" if len(transformation_steps) > 3 else "LOW"),
         "development_risk_level": "HIGH" if len(high_complexity_steps) > 1 or cte_consolidated_steps else ("MEDIUM" if aggregation_steps else "LOW")
     }
@@ -992,6 +2271,7 @@ def build_comprehensive_technical_context(tracer, presentation_table: str, targe
         "transformation_chain": transformation_steps,
         "snapshot_steps": snapshot_steps,
         "error_steps": error_steps,
+        "truncated_steps": [ctx for ctx in all_step_contexts if ctx.get("step_type") == "TRUNCATED"],
         "lineage_structure": lineage_result
     }
 
@@ -1001,6 +2281,7 @@ def build_enhanced_visual_dag(technical_context, include_source_definitions=Fals
     Build architectural DAG showing actual data flow layers with CORRECT ORDER and PARALLEL FLOWS
     FIXED: Uses dependency relationships to determine proper flow, shows parallel tables within layers
     FIXED: Now uses topological sorting within layers and shows intra-layer dependencies
+    NEW: Layers, dependencies and per-layer order come from lineage_dag.analyze_lineage (computed once per result)
     """
     if "error" in technical_context:
         return "Error building enhanced DAG"
@@ -1012,135 +2293,13 @@ def build_enhanced_visual_dag(technical_context, include_source_definitions=Fals
     dag_lines.append("🎯 ENHANCED COLUMN LINEAGE FLOW:")
     dag_lines.append("="*60)
     
-    # Build a complete table registry from all steps
-    all_tables = {}
-    for step in steps:
-        table = step.get('table', 'unknown')
-        step_type = step.get('step_type', 'unknown')
-        
-        if table not in all_tables:
-            all_tables[table] = {
-                'step_info': step,
-                'layer': None,
-                'dependencies': set()
-            }
-        
-        # Classify by type and naming convention
-        if step_type == "SOURCE":
-            all_tables[table]['layer'] = 'source'
-        elif step_type == "SNAPSHOT":
-            all_tables[table]['layer'] = 'snapshot'
-        elif table.startswith('stg_'):
-            all_tables[table]['layer'] = 'staging'
-        elif table.startswith('wrk_'):
-            all_tables[table]['layer'] = 'work'
-        elif table.startswith('dim_') or table.startswith('fct_'):
-            all_tables[table]['layer'] = 'mart'
-        else:
-            all_tables[table]['layer'] = 'other'
-    
-    # Extract dependencies from lineage structure
-    def extract_all_dependencies(result):
-        """Recursively extract all table->table dependencies"""
-        deps = {}
-        
-        def walk_dependencies(node, current_table=None):
-            if not isinstance(node, dict):
-                return
-                
-            table = node.get('table', '').split('.')[-1]  # Get table name only
-            if table and table != 'unknown':
-                if table not in deps:
-                    deps[table] = set()
-                
-                upstream_lineage = node.get('upstream_lineage', [])
-                for upstream in upstream_lineage:
-                    if isinstance(upstream, dict):
-                        upstream_trace = upstream.get('upstream_trace', {})
-                        if upstream_trace and isinstance(upstream_trace, dict):
-                            upstream_table = upstream_trace.get('table', '').split('.')[-1]
-                            if upstream_table and upstream_table != 'unknown':
-                                # Add ALL dependencies, including sources for complete picture
-                                deps[table].add(upstream_table)
-                            
-                            # Recursively process upstream
-                            walk_dependencies(upstream_trace)
-        
-        walk_dependencies(result)
-        return deps
-    
-    table_dependencies = extract_all_dependencies(lineage_result)
-    
-    # Update all_tables with extracted dependencies
-    for table, deps in table_dependencies.items():
-        if table in all_tables:
-            all_tables[table]['dependencies'] = deps
-    
-    # Group tables by layer
-    layers = {
-        'source': [],
-        'staging': [],
-        'work': [],
-        'other': [],
-        'snapshot': [],
-        'mart': []
-    }
-    
-    for table, info in all_tables.items():
-        layer = info['layer']
-        if layer in layers:
-            layers[layer].append(table)
-    
-    def topological_sort_within_layer(tables, layer_name):
-        """
-        Topologically sort tables within a layer based on their dependencies
-        Returns sorted list with intra-layer dependencies identified
-        """
-        if not tables:
-            return []
-        
-        # Get dependencies within this layer only
-        layer_tables = set(tables)
-        intra_layer_deps = {}
-        
-        for table in tables:
-            table_deps = table_dependencies.get(table, set())
-            # Only include dependencies that are also in this layer
-            intra_deps = table_deps.intersection(layer_tables)
-            intra_layer_deps[table] = intra_deps
-        
-        # Topological sort using Kahn's algorithm
-        # Calculate in-degrees (number of dependencies within layer)
-        in_degree = {table: len(intra_layer_deps[table]) for table in tables}
-        
-        # Start with tables that have no dependencies within the layer
-        queue = [table for table in tables if in_degree[table] == 0]
-        sorted_tables = []
-        
-        while queue:
-            # Sort the queue to ensure consistent ordering
-            queue.sort()
-            current = queue.pop(0)
-            sorted_tables.append(current)
-            
-            # For each table that depends on current, reduce its in-degree
-            for table in tables:
-                if current in intra_layer_deps[table]:
-                    in_degree[table] -= 1
-                    if in_degree[table] == 0:
-                        queue.append(table)
-        
-        # If we couldn't sort all tables, there might be cycles
-        if len(sorted_tables) != len(tables):
-            # Add remaining tables (potential cycles)
-            remaining = set(tables) - set(sorted_tables)
-            sorted_tables.extend(sorted(remaining))
-            print(f"⚠️  Potential circular dependencies in {layer_name} layer: {remaining}")
-        
-        return sorted_tables, intra_layer_deps
+    # Table registry, layers and dependencies come from the shared (cached) DAG analysis
+    dag = analyze_lineage(lineage_result)
+    table_dependencies = dag.dependencies
+    all_tables, layers = dag.layers(steps)
     
     # Layer display configuration
-    layer_order = ['source', 'staging', 'work', 'other', 'snapshot', 'mart']
+    layer_order = LAYER_ORDER
     layer_config = {
         'source': {'name': '📦 ULTIMATE DATA SOURCES', 'emoji': '📍'},
         'staging': {'name': '📝 STAGING LAYER', 'emoji': '📝'},
@@ -1179,7 +2338,7 @@ def build_enhanced_visual_dag(technical_context, include_source_definitions=Fals
         
         elif layer_key == 'snapshot':
             # Special handling for snapshots - topological sort
-            sorted_tables, intra_deps = topological_sort_within_layer(layer_tables, layer_key)
+            sorted_tables, intra_deps = dag.order_within(layer_tables, layer_key)
             dag_lines.append(f"{layer_config_item['name']}:")
             
             for table in sorted_tables:
@@ -1204,7 +2363,7 @@ def build_enhanced_visual_dag(technical_context, include_source_definitions=Fals
         
         else:
             # Regular transformation layers - use topological sorting
-            sorted_tables, intra_deps = topological_sort_within_layer(layer_tables, layer_key)
+            sorted_tables, intra_deps = dag.order_within(layer_tables, layer_key)
             dag_lines.append(f"{layer_config_item['name']}:")
             
             for table in sorted_tables:
@@ -1285,26 +2444,32 @@ def build_enhanced_visual_dag(technical_context, include_source_definitions=Fals
         for error in error_steps:
             dag_lines.append(f"    ❌ {error.get('table', 'unknown')}.{error.get('column', 'unknown')}: {error.get('error', 'Unknown error')}")
     
+    truncated_steps = [s for s in steps if s.get("step_type") == "TRUNCATED"]
+    if truncated_steps:
+        dag_lines.append("")
+        dag_lines.append("⏸️  TRACE TRUNCATED - NOT EXPANDED:")
+        for step in truncated_steps:
+            dag_lines.append(f"    ⏸️  {step.get('table', 'unknown')}.{step.get('column', 'unknown')} ({step.get('truncated_reason', 'unknown')})")
+    
     return "\n".join(dag_lines)
 
 
-def format_context_for_llm(technical_context, include_source_definitions=False, tracer=None):
+LLM_CHARS_PER_TOKEN = 4  # Rough token estimate used by the token_budget mode
+
+# Order in which steps keep their full detail when a token budget is tight
+LLM_STEP_PRIORITY = ("ERROR", "TRUNCATED", "SOURCE", "CTE_CONSOLIDATED", "HIGH_COMPLEXITY", "SNAPSHOT", "AGGREGATION", "TRANSFORMATION")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + LLM_CHARS_PER_TOKEN - 1) // LLM_CHARS_PER_TOKEN
+
+
+def _format_llm_summary(technical_context) -> str:
     """
-    Format the technical context in an LLM-friendly way for different use cases
+    Executive summary, ultimate sources and the header of the step analysis
     """
-    if "error" in technical_context:
-        return f"ERROR: {technical_context['error']}"
-    
     summary = technical_context["summary"]
-    steps = technical_context["detailed_steps"]
-    
-    # Build comprehensive LLM context
-    llm_context = []
-    
-    # Visual DAG at the top
-    visual_dag = build_enhanced_visual_dag(technical_context, include_source_definitions, tracer)
-    llm_context.append(visual_dag)
-    llm_context.append("")
+    llm_context = [""]
     
     # Executive Summary
     llm_context.append("=" * 80)
@@ -1317,8 +2482,18 @@ def format_context_for_llm(technical_context, include_source_definitions=False,
     llm_context.append(f"SOURCE TABLES: {summary['source_tables_count']}")
     llm_context.append(f"AGGREGATION POINTS: {summary['aggregation_points']}")
     
+    # Depth and critical path reuse the DAG analysis already computed for the visual DAG
+    dag = analyze_lineage(technical_context["lineage_structure"])
+    root_table = technical_context["lineage_structure"].get('table', '').split('.')[-1]
+    critical_path = dag.critical_path(root_table)
+    if len(critical_path) > 1:
+        llm_context.append(f"LINEAGE DEPTH: {dag.depth[root_table]} table hop(s)")
+        llm_context.append(f"CRITICAL PATH: {' → '.join(critical_path)}")
+    
     if summary.get('error_count', 0) > 0:
         llm_context.append(f"⚠️  ERRORS ENCOUNTERED: {summary['error_count']}")
+    if summary.get('truncated_frontier'):
+        llm_context.append(f"⏸️  TRACE TRUNCATED: {len(summary['truncated_frontier'])} column(s) not expanded: {', '.join(summary['truncated_frontier'])}")
     
     llm_context.append("")
     
@@ -1335,75 +2510,233 @@ def format_context_for_llm(technical_context, include_source_definitions=False,
     # Detailed Transformation Chain
     llm_context.append("DETAILED TRANSFORMATION ANALYSIS:")
     llm_context.append("-" * 50)
+    return "\n".join(llm_context)
+
+
+def _format_llm_step(step) -> str:
+    """
+    Full detail of one technical-context step
+    """
+    llm_context = []
+    step_type = step.get("step_type", "UNKNOWN")
+    step_num = step.get("step", "?")
     
-    for step in steps:
-        step_type = step.get("step_type", "UNKNOWN")
-        step_num = step.get("step", "?")
-        
-        if step_type == "SOURCE":
-            llm_context.append(f"\nSTEP {step_num}: SOURCE TABLE")
-            llm_context.append(f"  Table: {step.get('table', 'unknown')}")
-            llm_context.append(f"  Column: {step.get('column', 'unknown')}")
-            llm_context.append(f"  Source Type: {step.get('source_reason', 'unknown')}")
-        elif step_type == "SNAPSHOT":
-            llm_context.append(f"\nSTEP {step_num}: SNAPSHOT TABLE")
-            llm_context.append(f"  Table: {step.get('table', 'unknown')}")
-            llm_context.append(f"  Column: {step.get('column', 'unknown')}")
-            llm_context.append(f"  Type: DBT Snapshot with SCD Type 2 logic")
-            llm_context.append(f"  Data Scope: {step.get('data_scope', 'Historical data preservation')}")
-        elif step_type == "CTE_CONSOLIDATED":
-            llm_context.append(f"\nSTEP {step_num}: CTE AGGREGATION")
-            llm_context.append(f"  CTE Name: {step.get('cte_name', 'unknown')}")
-            llm_context.append(f"  Table: {step.get('table', 'unknown')}")
-            llm_context.append(f"  Columns Aggregated: {', '.join(step.get('consolidated_columns', []))}")
-            llm_context.append(f"  SQL File: {step.get('sql_file', 'Unknown')}")
-            llm_context.append(f"  Transformation Details: {step.get('transformation_details', 'Unknown')}")
-            llm_context.append(f"  Data Scope: {step.get('data_scope', 'Unknown')}")
-            llm_context.append(f"  Control Flow: {step.get('control_flow', 'Unknown')}")
-            llm_context.append(f"  Complexity Level: {step.get('complexity_level', 'Unknown')}")
-            llm_context.append(f"  Performance Impact: {step.get('performance_impact', 'Unknown')}")
-            llm_context.append(f"  Business Impact: {step.get('business_impact', 'Unknown')}")
+    if step_type == "SOURCE":
+        llm_context.append(f"\nSTEP {step_num}: SOURCE TABLE")
+        llm_context.append(f"  Table: {step.get('table', 'unknown')}")
+        llm_context.append(f"  Column: {step.get('column', 'unknown')}")
+        llm_context.append(f"  Source Type: {step.get('source_reason', 'unknown')}")
+    elif step_type == "SNAPSHOT":
+        llm_context.append(f"\nSTEP {step_num}: SNAPSHOT TABLE")
+        llm_context.append(f"  Table: {step.get('table', 'unknown')}")
+        llm_context.append(f"  Column: {step.get('column', 'unknown')}")
+        llm_context.append(f"  Type: DBT Snapshot with SCD Type 2 logic")
+        llm_context.append(f"  Data Scope: {step.get('data_scope', 'Historical data preservation')}")
+    elif step_type == "CTE_CONSOLIDATED":
+        llm_context.append(f"\nSTEP {step_num}: CTE AGGREGATION")
+        llm_context.append(f"  CTE Name: {step.get('cte_name', 'unknown')}")
+        llm_context.append(f"  Table: {step.get('table', 'unknown')}")
+        llm_context.append(f"  Columns Aggregated: {', '.join(step.get('consolidated_columns', []))}")
+        llm_context.append(f"  SQL File: {step.get('sql_file', 'Unknown')}")
+        llm_context.append(f"  Transformation Details: {step.get('transformation_details', 'Unknown')}")
+        llm_context.append(f"  Data Scope: {step.get('data_scope', 'Unknown')}")
+        llm_context.append(f"  Control Flow: {step.get('control_flow', 'Unknown')}")
+        llm_context.append(f"  Complexity Level: {step.get('complexity_level', 'Unknown')}")
+        llm_context.append(f"  Performance Impact: {step.get('performance_impact', 'Unknown')}")
+        llm_context.append(f"  Business Impact: {step.get('business_impact', 'Unknown')}")
+        
+        # Show individual SQL expressions for each aggregated column
+        if step.get("cte_sql_expressions"):
+            llm_context.append(f"  CTE Aggregation Details:")
+            for expr in step["cte_sql_expressions"]:
+                llm_context.append(f"    • {expr}")
+        elif step.get("sql_expression"):
+            llm_context.append(f"  SQL Expression: {step['sql_expression']}")
             
-            # Show individual SQL expressions for each aggregated column
-            if step.get("cte_sql_expressions"):
-                llm_context.append(f"  CTE Aggregation Details:")
-                for expr in step["cte_sql_expressions"]:
-                    llm_context.append(f"    • {expr}")
-            elif step.get("sql_expression"):
-                llm_context.append(f"  SQL Expression: {step['sql_expression']}")
-                
-        elif step_type == "ERROR":
-            llm_context.append(f"\nSTEP {step_num}: ERROR")
-            llm_context.append(f"  Table: {step.get('table', 'unknown')}")
-            llm_context.append(f"  Column: {step.get('column', 'unknown')}")
-            llm_context.append(f"  Error: {step.get('error', 'Unknown error')}")
-        else:
-            llm_context.append(f"\nSTEP {step_num}: TRANSFORMATION")
-            llm_context.append(f"  Table: {step.get('table', 'unknown')}")
-            llm_context.append(f"  Column: {step.get('column', 'unknown')}")
-            llm_context.append(f"  SQL File: {step.get('sql_file', 'Unknown')}")
-            
-            if step.get("has_cte_logic"):
-                llm_context.append(f"  CTE Logic: {step.get('cte_summary', 'Contains CTE transformations')}")
-            
-            if step.get("sql_expression"):
-                llm_context.append(f"  SQL Expression: {step['sql_expression']}")
-            if step.get("transformation_type"):
-                llm_context.append(f"  Transformation Type: {step['transformation_type']}")
+    elif step_type == "TRUNCATED":
+        llm_context.append(f"\nSTEP {step_num}: NOT TRACED (TRUNCATED)")
+        llm_context.append(f"  Table: {step.get('table', 'unknown')}")
+        llm_context.append(f"  Column: {step.get('column', 'unknown')}")
+        llm_context.append(f"  Reason: {step.get('truncated_reason', 'unknown')}")
+        llm_context.append(f"  Upstream lineage of this column was not expanded")
             
-            llm_context.append(f"  Complexity Level: {step.get('complexity_level', 'Unknown')}")
-            llm_context.append(f"  Data Scope: {step.get('data_scope_change', 'Unknown')}")
-    
+    elif step_type == "ERROR":
+        llm_context.append(f"\nSTEP {step_num}: ERROR")
+        llm_context.append(f"  Table: {step.get('table', 'unknown')}")
+        llm_context.append(f"  Column: {step.get('column', 'unknown')}")
+        llm_context.append(f"  Error: {step.get('error', 'Unknown error')}")
+    else:
+        llm_context.append(f"\nSTEP {step_num}: TRANSFORMATION")
+        llm_context.append(f"  Table: {step.get('table', 'unknown')}")
+        llm_context.append(f"  Column: {step.get('column', 'unknown')}")
+        llm_context.append(f"  SQL File: {step.get('sql_file', 'Unknown')}")
+        
+        if step.get("has_cte_logic"):
+            llm_context.append(f"  CTE Logic: {step.get('cte_summary', 'Contains CTE transformations')}")
+        
+        if step.get("sql_expression"):
+            llm_context.append(f"  SQL Expression: {step['sql_expression']}")
+        if step.get("transformation_type"):
+            llm_context.append(f"  Transformation Type: {step['transformation_type']}")
+        
+        llm_context.append(f"  Complexity Level: {step.get('complexity_level', 'Unknown')}")
+        llm_context.append(f"  Data Scope: {step.get('data_scope_change', 'Unknown')}")
     return "\n".join(llm_context)
 
 
-def quick_lineage_summary(compiled_sql_directory: str, presentation_table: str, target_column: str, internal_db_prefixes: List[str] = None, source_definitions_file: Optional[str] = None, manifest_path: Optional[str] = None):
+def _format_llm_step_brief(step) -> str:
+    detail = step.get("transformation_type") or step.get("source_reason") or step.get("error") or ""
+    detail = f" ({detail})" if detail else ""
+    return f"\nSTEP {step.get('step', '?')}: {step.get('step_type', 'UNKNOWN')} {step.get('table', 'unknown')}.{step.get('column', 'unknown')}{detail}"
+
+
+def _llm_step_priority(step) -> int:
+    step_type = step.get("step_type", "UNKNOWN")
+    if step_type == "TRANSFORMATION":
+        if "HIGH" in step.get("complexity_level", ""):
+            step_type = "HIGH_COMPLEXITY"
+        elif step.get("transformation_type") == "aggregated":
+            step_type = "AGGREGATION"
+    return LLM_STEP_PRIORITY.index(step_type) if step_type in LLM_STEP_PRIORITY else len(LLM_STEP_PRIORITY)
+
+
+def summarize_steps_for_llm(steps: List[Dict]) -> List[Dict]:
+    """
+    Drop steps repeated through duplicated lineage paths and collapse CTE aggregations
+    of the same CTE into one step (keeping the first step number)
+    """
+    summarized = []
+    seen = set()
+    cte_steps = {}
+    for step in steps:
+        if step.get("step_type") == "CTE_CONSOLIDATED":
+            cte_key = (step.get("table"), step.get("cte_name"))
+            merged = cte_steps.get(cte_key)
+            if merged is not None:
+                for column in step.get("consolidated_columns", []):
+                    if column not in merged["consolidated_columns"]:
+                        merged["consolidated_columns"].append(column)
+                for expression in step.get("cte_sql_expressions", []):
+                    if expression not in merged["cte_sql_expressions"]:
+                        merged["cte_sql_expressions"].append(expression)
+                continue
+            merged = dict(step, consolidated_columns=list(step.get("consolidated_columns", [])),
+                          cte_sql_expressions=list(step.get("cte_sql_expressions", [])))
+            cte_steps[cte_key] = merged
+            summarized.append(merged)
+            continue
+        
+        key = (step.get("step_type"), step.get("table"), step.get("column"), step.get("error"))
+        if key in seen:
+            continue
+        seen.add(key)
+        summarized.append(step)
+    return summarized
+
+
+def _condensed_note(token_budget: int, collapsed: int, shortened: int, omitted: int) -> str:
+    return (f"\n[Condensed to ~{token_budget} tokens: {collapsed} duplicate step(s) merged, "
+            f"{shortened} step(s) shortened, {omitted} step(s) omitted]")
+
+
+def iter_context_for_llm(technical_context, include_source_definitions=False, tracer=None, token_budget: Optional[int] = None):
+    """
+    NEW: Generator form of format_context_for_llm - yields the context section by section
+    (visual DAG, summary, then one block per step) so callers can stream it
+    
+    Args:
+        token_budget: approximate size limit in tokens (LLM_CHARS_PER_TOKEN characters each).
+            Steps are de-duplicated and CTE aggregations collapsed, then the visual DAG is
+            shortened if it would take over a third of the budget, and steps keep their full
+            detail in LLM_STEP_PRIORITY order while they fit; the rest get one line each or
+            are counted in a closing note. The summary is always included.
+    """
+    if "error" in technical_context:
+        yield f"ERROR: {technical_context['error']}"
+        return
+    
+    steps = technical_context["detailed_steps"]
+    
+    if token_budget is None:
+        # Visual DAG at the top
+        yield build_enhanced_visual_dag(technical_context, include_source_definitions, tracer)
+        yield _format_llm_summary(technical_context)
+        for step in steps:
+            yield _format_llm_step(step)
+        return
+    
+    summary_section = _format_llm_summary(technical_context)
+    # Reserve room for the closing note (sized for the largest counts) and the section separators
+    largest = len(steps)
+    remaining = token_budget - estimate_tokens(summary_section) - estimate_tokens(_condensed_note(token_budget, largest, largest, largest)) - 2
+    
+    visual_dag = build_enhanced_visual_dag(technical_context, include_source_definitions, tracer)
+    if estimate_tokens(visual_dag) > remaining // 3 and include_source_definitions:
+        visual_dag = build_enhanced_visual_dag(technical_context, False, tracer)
+    if estimate_tokens(visual_dag) > remaining // 3:
+        lineage_result = technical_context["lineage_structure"]
+        root_table = lineage_result.get('table', '').split('.')[-1]
+        visual_dag = "🎯 COLUMN LINEAGE FLOW (condensed): " + " → ".join(analyze_lineage(lineage_result).critical_path(root_table) or [root_table])
+    remaining -= estimate_tokens(visual_dag)
+    
+    steps = summarize_steps_for_llm(steps)
+    full_steps = set()
+    brief_steps = set()
+    by_priority = sorted(range(len(steps)), key=lambda index: (_llm_step_priority(steps[index]), index))
+    for index in by_priority:
+        cost = estimate_tokens(_format_llm_step(steps[index])) + 1
+        if cost <= remaining:
+            full_steps.add(index)
+            remaining -= cost
+    for index in by_priority:
+        if index not in full_steps:
+            cost = estimate_tokens(_format_llm_step_brief(steps[index])) + 1
+            if cost <= remaining:
+                brief_steps.add(index)
+                remaining -= cost
+    
+    yield visual_dag
+    yield summary_section
+    for index, step in enumerate(steps):
+        if index in full_steps:
+            yield _format_llm_step(step)
+        elif index in brief_steps:
+            yield _format_llm_step_brief(step)
+    
+    omitted = len(steps) - len(full_steps) - len(brief_steps)
+    collapsed = len(technical_context["detailed_steps"]) - len(steps)
+    if omitted or brief_steps or collapsed:
+        yield _condensed_note(token_budget, collapsed, len(brief_steps), omitted)
+
+
+def format_context_for_llm(technical_context, include_source_definitions=False, tracer=None, token_budget: Optional[int] = None):
+    """
+    Format the technical context in an LLM-friendly way for different use cases
+    NEW: token_budget condenses the context to roughly that many tokens (see iter_context_for_llm)
+    """
+    return "\n".join(iter_context_for_llm(technical_context, include_source_definitions, tracer, token_budget))
+
+
+def quick_lineage_summary(compiled_sql_directory: str, presentation_table: str, target_column: str, internal_db_prefixes: List[str] = None, source_definitions_file: Optional[str] = None, manifest_path: Optional[str] = None, cache_dir: Optional[str] = None, jobs: Optional[int] = None, schema_aware: bool = False, catalog_path: Optional[str] = None,
+                          prefetch_workers: Optional[int] = None, sql_bundle: Optional[str] = None, dialect: Optional[str] = None,
+                          trace_options: Optional[Dict] = None, tracer: Optional['DBTLineageTracer'] = None):
     """
     Quick summary for development planning
+    
+    Args:
+        tracer: reuse this tracer instead of building one from the directory/manifest/cache options
     """
     try:
-        tracer = DBTLineageTracer(compiled_sql_directory, internal_db_prefixes, source_definitions_file, manifest_path)
-        technical_context = build_comprehensive_technical_context(tracer, presentation_table, target_column)
+        if tracer is None:
+            tracer = DBTLineageTracer(compiled_sql_directory, internal_db_prefixes, source_definitions_file, manifest_path, cache_dir,
+                                      schema_aware=schema_aware, catalog_path=catalog_path,
+                                      prefetch_workers=prefetch_workers, sql_bundle=sql_bundle, dialect=dialect)
+        if jobs is not None:
+            # Parse the models this trace may visit in parallel, keeping their trees for the trace
+            tracer.analyze_all_models(jobs, include_column_dependencies=False,
+                                      table_names=tracer.upstream_models(presentation_table), keep_trees=True)
+        with tracer.stats.stage("technical_context"):
+            technical_context = build_comprehensive_technical_context(tracer, presentation_table, target_column, trace_options)
         
         if "error" in technical_context:
             print(f"❌ Error: {technical_context['error']}")
@@ -1422,6 +2755,8 @@ def quick_lineage_summary(compiled_sql_directory: str, presentation_table: str,
         
         if summary.get('error_count', 0) > 0:
             print(f"⚠️  Errors encountered: {summary['error_count']}")
+        if summary.get('truncated_frontier'):
+            print(f"⏸️  Trace truncated, not expanded: {', '.join(summary['truncated_frontier'])}")
         
         return technical_context, tracer
         
@@ -1435,6 +2770,7 @@ def quick_lineage_summary(compiled_sql_directory: str, presentation_table: str,
 # Example usage
 if __name__ == "__main__":
     import argparse
+    import sys
     
     parser = argparse.ArgumentParser(description='DBT Multi-File Column Lineage Tracer')
     parser.add_argument('table', help='Name of the presentation table to analyze')
@@ -1449,8 +2785,59 @@ if __name__ == "__main__":
                         help='Path to JSON file containing source column definitions')
     parser.add_argument('--manifest', type=str, 
                         help='Path to DBT manifest.json file (default: target/manifest.json)')
+    parser.add_argument('--cache-dir', type=str,
+                        help='Directory for the persistent parsed-model cache (e.g. .lineage_cache)')
+    parser.add_argument('--state-file', type=str,
+                        help='Incremental mode: persist per-model analysis here and only re-analyse changed models '
+                             '(with --graph, --export, --impact or --edges; a full trace needs every visited model parsed)')
+    parser.add_argument('--jobs', '-j', type=int,
+                        help='Worker processes for parsing (0 = all CPUs): every model with --graph, --export or --impact --full-graph, '
+                             'otherwise only the models the trace may visit')
+    parser.add_argument('--graph', action='store_true',
+                        help='Build the whole-project lineage graph and list upstream columns from it')
+    parser.add_argument('--edges', action='store_true',
+                        help='Stream upstream lineage edges breadth-first as they are discovered (honours --max-depth)')
+    parser.add_argument('--impact', action='store_true',
+                        help='Downstream impact analysis: list every column that depends on TABLE.COLUMN')
+    parser.add_argument('--full-graph', action='store_true',
+                        help='--impact: build the whole-project graph (with --jobs workers) instead of analysing only the models an identifier pre-scan cannot rule out')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Detail of tracer status lines (default: INFO; DEBUG adds per-SELECT analysis)')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help='Only show warnings and errors from the tracer (same as --log-level WARNING)')
+    parser.add_argument('--event-log', type=str,
+                        help='Append structured JSON-lines events (per-model timings, traces) to this file')
+    parser.add_argument('--export', type=str,
+                        help='Export the whole-project column lineage graph to a SQLite file (.db/.sqlite) or a Parquet directory')
+    parser.add_argument('--export-format', choices=['sqlite', 'parquet'],
+                        help='Format for --export (default: from the path suffix)')
+    parser.add_argument('--schema-aware', action='store_true',
+                        help='Expand SELECT * against known columns (catalog.json or the upstream models) so columns only trace into tables that have them')
+    parser.add_argument('--catalog', type=str,
+                        help='dbt catalog.json for --schema-aware (default: catalog.json next to the manifest)')
+    parser.add_argument('--prefetch', nargs='?', type=int, const=DEFAULT_PREFETCH_WORKERS, metavar='THREADS',
+                        help=f'Read all compiled SQL concurrently before tracing (default threads: {DEFAULT_PREFETCH_WORKERS})')
+    parser.add_argument('--sql-bundle', type=str,
+                        help='Load compiled SQL from a bundle made by sql_bundle.py (one mmap instead of per-file reads)')
+    parser.add_argument('--token-budget', type=int,
+                        help='Condense the --verbose LLM context to roughly this many tokens')
+    parser.add_argument('--dialect', type=str,
+                        help='sqlglot dialect of the compiled SQL (default: from the manifest adapter_type, else snowflake)')
+    parser.add_argument('--max-depth', type=int,
+                        help='Stop tracing after this many table hops upstream of the column')
+    parser.add_argument('--stop-at', nargs='+', metavar='LAYER',
+                        help='Do not expand tables in these layers (source, staging, work, other, snapshot, mart) or with these name prefixes (e.g. stg_)')
+    parser.add_argument('--time-budget-ms', type=float,
+                        help='Stop expanding the trace once this many milliseconds have elapsed')
+    parser.add_argument('--profile', nargs='?', const='table', choices=['table', 'json'],
+                        help='Print per-stage and per-model timings at the end (as a sorted table, or JSON)')
     
     args = parser.parse_args()
+    if args.state_file and not (args.graph or args.export or args.impact or args.edges):
+        parser.error('--state-file needs --graph, --export, --impact or --edges')
+    configure_console_logging('WARNING' if args.quiet else args.log_level)
+    if args.event_log:
+        enable_event_log(args.event_log)
     
     print("🔧 DBT COLUMN LINEAGE TRACER")
     print("="*50)
@@ -1462,8 +2849,50 @@ if __name__ == "__main__":
         print(f"📚 Source Definitions: {args.source_definitions}")
     if args.manifest:
         print(f"📋 Manifest File: {args.manifest}")
+    if args.cache_dir:
+        print(f"💾 Analysis Cache: {args.cache_dir}")
     
     try:
+        # One tracer, configured from every option, serves whichever mode runs
+        tracer = DBTLineageTracer(args.compiled_dir, args.internal_prefixes, args.source_definitions, args.manifest, args.cache_dir, args.state_file,
+                                  schema_aware=args.schema_aware or bool(args.catalog), catalog_path=args.catalog,
+                                  prefetch_workers=args.prefetch, sql_bundle=args.sql_bundle, dialect=args.dialect)
+        
+        if args.impact:
+            if args.full_graph:
+                tracer.get_lineage_graph(args.jobs)  # Otherwise only pre-scan candidates are analysed
+            print_impact_results(tracer.trace_column_impact(args.table, args.column))
+            if args.profile:
+                print_profile(tracer.stats, args.profile)
+            sys.exit(0)
+        
+        if args.export:
+            counts = tracer.export_lineage_graph(args.export, args.export_format, args.jobs)
+            print(f"\n💾 EXPORTED LINEAGE TO {args.export}:")
+            for table_name, count in counts.items():
+                print(f"  {table_name}: {count} rows")
+            if args.profile:
+                print_profile(tracer.stats, args.profile)
+            sys.exit(0)
+        
+        if args.graph:
+            tracer.get_lineage_graph(args.jobs)
+            upstream_columns = tracer.get_upstream_columns(args.table, args.column)
+            print(f"\n🕸️  UPSTREAM COLUMNS FROM PROJECT GRAPH ({len(upstream_columns)}):")
+            for node in upstream_columns:
+                print(f"  {'  ' * (node['depth'] - 1)}⬆️  {node['table']}.{node['column']} [{node['kind']}] via {node['transformation_type']}")
+            if args.profile:
+                print_profile(tracer.stats, args.profile)
+            sys.exit(0)
+        
+        if args.edges:
+            print("\n🌊 UPSTREAM LINEAGE EDGES (breadth-first):")
+            for edge in tracer.iter_lineage_edges(args.table, args.column, args.max_depth):
+                print(f"  {'  ' * (edge['depth'] - 1)}⬆️  {edge['table']}.{edge['column']} ← {edge['upstream_table']}.{edge['upstream_column']} [{edge['upstream_kind']}] via {edge['transformation_type']}", flush=True)
+            if args.profile:
+                print_profile(tracer.stats, args.profile)
+            sys.exit(0)
+        
         # Always show quick summary
         print("\n" + "="*80)
         print("🚀 QUICK LINEAGE SUMMARY:")
@@ -1471,9 +2900,9 @@ if __name__ == "__main__":
             args.compiled_dir, 
             args.table, 
             args.column, 
-            args.internal_prefixes, 
-            args.source_definitions,
-            args.manifest
+            jobs=args.jobs,
+            trace_options={"max_depth": args.max_depth, "stop_at_layers": args.stop_at, "time_budget_ms": args.time_budget_ms},
+            tracer=tracer
         )
         
         # Show detailed analysis if verbose flag is used
@@ -1482,13 +2911,18 @@ if __name__ == "__main__":
             print("🤖 COMPREHENSIVE TECHNICAL ANALYSIS:")
             
             include_source_defs = bool(args.source_definitions)
-            llm_ready_context = format_context_for_llm(quick_result, include_source_defs, tracer_instance)
-            print(llm_ready_context)
+            with tracer_instance.stats.stage("llm_format"):
+                # Streamed section by section rather than built as one string
+                for section in iter_context_for_llm(quick_result, include_source_defs, tracer_instance, args.token_budget):
+                    print(section)
             print("\n✅ Detailed column lineage analysis complete!")
         elif args.verbose:
             print("\n❌ Cannot show detailed analysis due to errors in lineage tracing")
         else:
             print("\n💡 Use --verbose flag for detailed LLM-ready technical context")
+        
+        if args.profile and tracer_instance:
+            print_profile(tracer_instance.stats, args.profile)
             
     except Exception as e:
         print(f"❌ Error during analysis: {e}")
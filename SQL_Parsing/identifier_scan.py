@@ -0,0 +1,90 @@
+"""
+Cheap lexical pre-scan of compiled SQL, run before any sqlglot parse
+
+A model can only reference a column it mentions by name, or pull it in through a
+star (SELECT * / alias.*). scan_identifiers reduces a file to its set of identifiers
+and a star flag with a few regexes, so callers can rule out models that cannot
+contain a column without parsing them. The scan errs on the side of "may reference":
+identifiers in comments count, and anything that looks like a star projection sets
+has_star, so a skipped model is always one the parser would have found nothing in.
+"""
+import re
+from typing import Dict, FrozenSet, Iterable, Set
+
+# Comments and single-quoted string literals (including '' escapes) hold no identifiers
+_COMMENT_OR_STRING = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:[^'\\]|\\.|'')*'", re.DOTALL)
+_IDENTIFIER = re.compile(r'"((?:[^"]|"")+)"|`([^`]+)`|\b([A-Za-z_][A-Za-z0-9_$]*)')
+# Any * is a possible star projection (SELECT TOP 10 *, DISTINCT ON (a) *, t.*, ...) unless it is
+# clearly COUNT(*) or a multiplication: an operand on the left and an operand that is not a
+# keyword that can follow a star (FROM, EXCLUDE, ...) on the right
+_STAR_ARGUMENT = re.compile(r"\(\s*\*\s*\)")
+_MULTIPLICATION = re.compile(
+    r"[\w$\"`\])]\s*\*(?=\s*(?!(?:from|exclude|except|replace|rename|ilike|into)\b)[\w\"`(\[:@])",
+    re.IGNORECASE
+)
+
+
+def normalize_identifier(name: str) -> str:
+    return name.replace('"', '').replace('`', '').lower()
+
+
+class IdentifierScan:
+    """
+    Identifiers (lowercase, unquoted) mentioned by one SQL file, and whether it selects a star
+    """
+
+    __slots__ = ("identifiers", "has_star")
+
+    def __init__(self, identifiers: FrozenSet[str], has_star: bool):
+        self.identifiers = identifiers
+        self.has_star = has_star
+
+    def mentions(self, name: str) -> bool:
+        return normalize_identifier(name) in self.identifiers
+
+    def may_reference(self, column: str) -> bool:
+        """
+        False only if the file cannot reference the column: it neither names it nor selects a star
+        """
+        return self.has_star or column == "*" or self.mentions(column)
+
+
+def scan_identifiers(sql: str) -> IdentifierScan:
+    code = _COMMENT_OR_STRING.sub(" ", sql)
+    identifiers = set()
+    for match in _IDENTIFIER.finditer(code):
+        quoted, backticked, bare = match.groups()
+        identifiers.add((quoted.replace('""', '"') if quoted else backticked or bare).lower())
+    return IdentifierScan(frozenset(identifiers), _has_star(code))
+
+
+def _has_star(code: str) -> bool:
+    """
+    Whether any * in comment/string-free SQL may be a star projection (false positives are safe)
+    """
+    stars = code.count("*")
+    if not stars:
+        return False
+    return stars > len(_STAR_ARGUMENT.findall(code)) + len(_MULTIPLICATION.findall(code))
+
+
+def build_identifier_index(scans: Dict[str, IdentifierScan]) -> Dict[str, Set[str]]:
+    """
+    Inverted index of a set of scans: identifier -> names of the files mentioning it
+    """
+    index: Dict[str, Set[str]] = {}
+    for name, scan in scans.items():
+        for identifier in scan.identifiers:
+            index.setdefault(identifier, set()).add(name)
+    return index
+
+
+def candidate_files(scans: Dict[str, IdentifierScan], index: Dict[str, Set[str]],
+                    table_names: Iterable[str], column: str) -> Set[str]:
+    """
+    Files that mention one of table_names and may reference column (by name or through a star)
+    """
+    mentioning_table = set()
+    for table_name in table_names:
+        mentioning_table |= index.get(normalize_identifier(table_name), set())
+    return {name for name in mentioning_table if scans[name].may_reference(column)}
@@ -0,0 +1,82 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+import sqlglot
+from column_lineage import DEFAULT_DIALECT
+from lineage_logging import get_logger
+
+logger = get_logger("cache")
+
+
+def compute_cache_key(sql_content: str, dialect: str = DEFAULT_DIALECT) -> str:
+    """
+    Build the cache key for a compiled model: SHA-256 of the SQL text, salted
+    with the sqlglot version and dialect so upgrades never load stale trees
+    """
+    digest = hashlib.sha256()
+    digest.update(f"sqlglot={sqlglot.__version__};dialect={dialect};".encode("utf-8"))
+    digest.update(sql_content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    On-disk cache of parsed and pre-analysed compiled models.
+
+    Each entry is a pickled dict holding the parsed sqlglot tree (absent for
+    entries analysed by parallel workers) and the output of
+    extract_snowflake_columns for that tree, stored as
+    <cache_dir>/<key[:2]>/<key>.pkl. Entries are content-addressed, so an
+    unchanged model is never parsed twice and a changed one simply misses.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.pkl"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Return the cached analysis for key, or None on a miss or unreadable entry
+        """
+        entry_path = self._entry_path(key)
+        if not entry_path.exists():
+            self.misses += 1
+            return None
+
+        try:
+            with open(entry_path, 'rb') as f:
+                entry = pickle.load(f)
+            self.hits += 1
+            return entry
+        except Exception as e:
+            logger.warning("⚠️  Discarding unreadable cache entry %s: %s", entry_path.name, e)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, entry: Dict) -> None:
+        """
+        Store an analysis entry; write to a temp file first so readers never see partial pickles
+        
+        Each write gets its own temp file, so concurrent writers (worker processes, or several
+        runs sharing a cache_dir) never interleave; the last complete entry wins.
+        """
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=entry_path.parent, prefix=f"{key}.", suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry_path)
+        except Exception as e:
+            logger.warning("⚠️  Could not write cache entry %s: %s", entry_path.name, e)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,231 @@
+"""
+Table-level DAG analysis of one lineage result, computed once and shared by the renderers
+
+A trace_column_lineage_across_files result is walked a single time (iteratively, and
+memoized subtrees shared by diamond DAGs are visited once) into table -> upstream
+table sets. Topological order, depth, critical path, layer grouping and per-layer
+ordering are then derived lazily and cached on the LineageDag, and analyze_lineage
+caches the LineageDag per result object, so build_enhanced_visual_dag,
+format_context_for_llm and get_upstream_tables reuse one analysis.
+"""
+import heapq
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from lineage_logging import get_logger
+
+logger = get_logger("dag")
+
+# Display order of layers, upstream first
+LAYER_ORDER = ('source', 'staging', 'work', 'other', 'snapshot', 'mart')
+
+# Number of lineage results whose analysis is kept by analyze_lineage
+ANALYSIS_CACHE_SIZE = 64
+
+_analysis_cache: "OrderedDict[int, Tuple[Dict, LineageDag]]" = OrderedDict()
+
+
+def classify_layer(table: str, step_type: str) -> str:
+    """
+    Layer of a table from its step type and dbt naming convention
+    """
+    if step_type == "SOURCE":
+        return 'source'
+    if step_type == "SNAPSHOT":
+        return 'snapshot'
+    if table.startswith('stg_'):
+        return 'staging'
+    if table.startswith('wrk_'):
+        return 'work'
+    if table.startswith('dim_') or table.startswith('fct_'):
+        return 'mart'
+    return 'other'
+
+
+def _short_name(table: Optional[str]) -> str:
+    return (table or '').split('.')[-1]
+
+
+class LineageDag:
+    """
+    Table dependencies of one lineage result
+
+    Attributes:
+        dependencies: table -> every upstream table (sources included), as traced
+        model_dependencies: table -> upstream non-source tables, as referenced in SQL
+            (dependency table name, falling back to the traced table)
+    """
+
+    def __init__(self, dependencies: Dict[str, Set[str]], model_dependencies: Dict[str, Set[str]]):
+        self.dependencies = dependencies
+        self.model_dependencies = model_dependencies
+        self._topological_order: Optional[List[str]] = None
+        self._depth: Optional[Dict[str, int]] = None
+        self._deepest_upstream: Dict[str, str] = {}
+        self._layer_orders: Dict[FrozenSet[str], Tuple[List[str], Dict[str, Set[str]]]] = {}
+        self._layers: Dict[int, Tuple[List[Dict], Dict, Dict[str, List[str]]]] = {}
+
+    @classmethod
+    def from_lineage_result(cls, lineage_result: Dict) -> 'LineageDag':
+        dependencies: Dict[str, Set[str]] = {}
+        model_dependencies: Dict[str, Set[str]] = {}
+        seen = set()
+        stack = [lineage_result]
+
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, dict) or id(node) in seen:
+                continue
+            seen.add(id(node))
+
+            table = _short_name(node.get('table'))
+            if not table or table == 'unknown':
+                continue
+            table_deps = dependencies.setdefault(table, set())
+            table_model_deps = model_dependencies.setdefault(table, set())
+
+            for upstream in node.get('upstream_lineage', []):
+                if not isinstance(upstream, dict):
+                    continue
+                dependency = upstream.get('dependency') or {}
+                upstream_trace = upstream.get('upstream_trace') or {}
+                if not isinstance(upstream_trace, dict):
+                    continue
+
+                traced_table = _short_name(upstream_trace.get('table'))
+                if traced_table and traced_table != 'unknown':
+                    table_deps.add(traced_table)
+
+                referenced_table = _short_name(dependency.get('table')) or traced_table
+                if referenced_table and referenced_table != 'unknown' and upstream_trace.get('type') not in ('source', 'error'):
+                    table_model_deps.add(referenced_table)
+
+                stack.append(upstream_trace)
+
+        return cls(dependencies, model_dependencies)
+
+    @property
+    def topological_order(self) -> List[str]:
+        """
+        Every table, upstream before downstream (ties alphabetical); tables on cycles come last
+        """
+        if self._topological_order is None:
+            self._topological_order = self._kahn(self.dependencies, "lineage")
+        return self._topological_order
+
+    @property
+    def depth(self) -> Dict[str, int]:
+        """
+        Longest upstream chain per table (0 for tables with no upstream)
+        """
+        if self._depth is None:
+            depth = {}
+            for table in self.topological_order:
+                upstream = [dep for dep in self.dependencies.get(table, ()) if dep in depth]
+                if upstream:
+                    deepest = max(sorted(upstream), key=lambda dep: depth[dep])
+                    depth[table] = depth[deepest] + 1
+                    self._deepest_upstream[table] = deepest
+                else:
+                    depth[table] = 0
+            self._depth = depth
+        return self._depth
+
+    def critical_path(self, table: str) -> List[str]:
+        """
+        Longest upstream chain ending at table, source first
+        """
+        depth = self.depth
+        if table not in depth:
+            return []
+        path = [table]
+        while path[-1] in self._deepest_upstream:
+            path.append(self._deepest_upstream[path[-1]])
+        return list(reversed(path))
+
+    def order_within(self, tables: Iterable[str], layer_name: str = "layer") -> Tuple[List[str], Dict[str, Set[str]]]:
+        """
+        Topologically sort a group of tables by their dependencies on each other
+
+        Returns:
+            (sorted tables, table -> upstream tables within the group)
+        """
+        key = frozenset(tables)
+        if key not in self._layer_orders:
+            intra_deps = {table: self.dependencies.get(table, set()) & key for table in key}
+            self._layer_orders[key] = (self._kahn(intra_deps, layer_name), intra_deps)
+        return self._layer_orders[key]
+
+    def layers(self, steps: List[Dict]) -> Tuple[Dict[str, Dict], Dict[str, List[str]]]:
+        """
+        Table registry and layer grouping of the technical-context steps
+
+        Returns:
+            ({table: {"step_info", "layer", "dependencies"}}, {layer: [tables in step order]})
+        """
+        cached = self._layers.get(id(steps))
+        if cached is None or cached[0] is not steps:
+            all_tables = {}
+            for step in steps:
+                table = step.get('table', 'unknown')
+                if table not in all_tables:
+                    all_tables[table] = {'step_info': step, 'layer': None, 'dependencies': set()}
+                all_tables[table]['layer'] = classify_layer(table, step.get('step_type', 'unknown'))
+
+            for table, info in all_tables.items():
+                if table in self.dependencies:
+                    info['dependencies'] = self.dependencies[table]
+
+            grouped = {layer: [] for layer in LAYER_ORDER}
+            for table, info in all_tables.items():
+                grouped[info['layer']].append(table)
+            cached = (steps, all_tables, grouped)
+            self._layers[id(steps)] = cached
+        return cached[1], cached[2]
+
+    @staticmethod
+    def _kahn(dependencies: Dict[str, Set[str]], graph_name: str) -> List[str]:
+        """
+        Kahn's algorithm with a heap, so the smallest available table is always emitted next
+        """
+        tables = set(dependencies)
+        downstream: Dict[str, List[str]] = {table: [] for table in tables}
+        in_degree = {}
+        for table in tables:
+            upstream = dependencies[table] & tables
+            in_degree[table] = len(upstream)
+            for dep in upstream:
+                downstream[dep].append(table)
+
+        queue = [table for table, degree in in_degree.items() if degree == 0]
+        heapq.heapify(queue)
+        ordered = []
+        while queue:
+            current = heapq.heappop(queue)
+            ordered.append(current)
+            for table in downstream[current]:
+                in_degree[table] -= 1
+                if in_degree[table] == 0:
+                    heapq.heappush(queue, table)
+
+        if len(ordered) != len(tables):
+            remaining = tables - set(ordered)
+            ordered.extend(sorted(remaining))
+            logger.warning("⚠️  Potential circular dependencies in %s layer: %s", graph_name, remaining)
+        return ordered
+
+
+def analyze_lineage(lineage_result: Dict) -> LineageDag:
+    """
+    Cached LineageDag for a lineage result object (results are shared via the tracer's trace_memo)
+    """
+    cached = _analysis_cache.get(id(lineage_result))
+    if cached is not None and cached[0] is lineage_result:
+        _analysis_cache.move_to_end(id(lineage_result))
+        return cached[1]
+
+    dag = LineageDag.from_lineage_result(lineage_result)
+    _analysis_cache[id(lineage_result)] = (lineage_result, dag)
+    if len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+        _analysis_cache.popitem(last=False)
+    return dag
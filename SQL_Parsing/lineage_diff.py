@@ -0,0 +1,261 @@
+"""
+Column lineage diff between two versions of a dbt project (e.g. main vs a PR branch)
+
+Only models whose compiled SQL differs (by content checksum) are analysed on the base
+side, plus unchanged models that reference an added or removed model (their references
+may resolve differently); those are analysed once and shared by both tracers. The report
+lists added, removed and changed column edges and every downstream column affected by
+those edges, found by walking the head project downstream from them (only the models the
+identifier pre-scan cannot rule out are analysed).
+
+Usage:
+    python lineage_diff.py --base-compiled-dir main/target/compiled --base-manifest main/target/manifest.json \\
+        --head-compiled-dir target/compiled --head-manifest target/manifest.json --output lineage_diff.json
+"""
+import argparse
+import json
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dbt_lineage_tracer import DBTLineageTracer
+from lineage_cache import compute_cache_key
+from lineage_graph import ColumnLineageGraph
+from lineage_logging import configure_console_logging, get_logger, timed_event
+
+logger = get_logger("diff")
+
+EdgeKey = Tuple[str, str, str, str]
+
+
+def model_checksums(tracer: DBTLineageTracer) -> Dict[str, str]:
+    """
+    Content checksum of every compiled model (the analysis cache key, so it includes the dialect)
+
+    dbt's manifest checksum only covers the raw model file, so macro or var changes that
+    alter the compiled SQL would be missed; the compiled text is what lineage is built from.
+    """
+    checksums = {}
+    for table_name in tracer.table_to_file_map:
+        sql_content = tracer.load_sql_file(table_name)
+        if sql_content is not None:
+            checksums[table_name] = compute_cache_key(sql_content, tracer.dialect)
+    return checksums
+
+
+def classify_models(base: DBTLineageTracer, head: DBTLineageTracer) -> Dict[str, List[str]]:
+    """
+    {"added", "removed", "changed", "unchanged"} model names between two tracers
+    """
+    base_checksums = model_checksums(base)
+    head_checksums = model_checksums(head)
+    return {
+        "added": sorted(set(head_checksums) - set(base_checksums)),
+        "removed": sorted(set(base_checksums) - set(head_checksums)),
+        "changed": sorted(
+            table_name for table_name in set(base_checksums) & set(head_checksums)
+            if base_checksums[table_name] != head_checksums[table_name]
+        ),
+        "unchanged": sorted(
+            table_name for table_name in set(base_checksums) & set(head_checksums)
+            if base_checksums[table_name] == head_checksums[table_name]
+        ),
+    }
+
+
+def share_unchanged_analyses(source: DBTLineageTracer, target: DBTLineageTracer, table_names: Iterable[str]) -> int:
+    """
+    Copy already computed analyses of unchanged models from one tracer to the other
+
+    Entries are keyed by content checksum, so they are only shared when both sides use the same dialect.
+    """
+    if source.dialect != target.dialect:
+        return 0
+    shared = 0
+    for table_name in table_names:
+        if table_name in source.analysis_cache and table_name not in target.analysis_cache:
+            target.analysis_cache[table_name] = source.analysis_cache[table_name]
+            shared += 1
+        if table_name in source.model_state and table_name not in target.model_state:
+            target.model_state[table_name] = source.model_state[table_name]
+    return shared
+
+
+def relinked_models(tracer: DBTLineageTracer, unchanged: List[str], added_or_removed: List[str]) -> List[str]:
+    """
+    Unchanged models that reference an added or removed model, whose edges may now resolve differently
+    """
+    if not added_or_removed:
+        return []
+    renamed = set(added_or_removed)
+    relinked = []
+    for table_name in unchanged:
+        for column_info in (tracer.get_column_dependencies(table_name) or {}).values():
+            referenced = {tracer.extract_table_name_from_full_ref(dep.get("table", "")).lower() for dep in column_info["dependencies"]}
+            if referenced & renamed or {f"stg_{name}" for name in referenced} & renamed:
+                relinked.append(table_name)
+                break
+    return relinked
+
+
+def analyse_models(tracer: DBTLineageTracer, table_names: Iterable[str], jobs: Optional[int] = None) -> int:
+    """
+    Analyse the given models up front (in parallel with jobs > 1), as the graph build would
+    """
+    schema_aware = tracer.column_catalog is not None
+    return tracer.analyze_all_models(jobs, include_column_dependencies=not schema_aware,
+                                     table_names=set(table_names), keep_trees=schema_aware)
+
+
+def model_edges(tracer: DBTLineageTracer, table_names: Iterable[str], graph: Optional[ColumnLineageGraph] = None) -> Dict[EdgeKey, Tuple]:
+    """
+    Column edges of the given models (plus every manifest snapshot's pass-through edges)
+
+    Returns:
+        {(table, column, upstream_table, upstream_column): sorted (expression, transformation_type) pairs}
+    """
+    if graph is None:
+        graph = tracer.new_lineage_graph()
+        for table_name in sorted(table_names):
+            try:
+                tracer._add_model_to_graph(graph, table_name)
+            except Exception as e:
+                logger.error("❌ Error analysing %s for lineage diff: %s", table_name, e)
+        tracer._add_snapshots_to_graph(graph)
+        table_names = set(graph.table_kinds)
+    else:
+        table_names = set(table_names) | {table for table, kind in graph.table_kinds.items() if kind == "snapshot"}
+
+    edges: Dict[EdgeKey, Set] = {}
+    for (table, column), upstream in graph.upstream_edges.items():
+        if table not in table_names:
+            continue
+        for edge in upstream:
+            key = (table, column, edge["table"], edge["column"])
+            edges.setdefault(key, set()).add((edge.get("expression") or "", edge.get("transformation_type") or ""))
+    return {key: tuple(sorted(values)) for key, values in edges.items()}
+
+
+def _edge_record(key: EdgeKey, versions: Tuple) -> Dict:
+    table, column, upstream_table, upstream_column = key
+    return {
+        "table": table,
+        "column": column,
+        "upstream_table": upstream_table,
+        "upstream_column": upstream_column,
+        "expressions": [{"expression": expression, "transformation_type": transformation_type}
+                        for expression, transformation_type in versions]
+    }
+
+
+def diff_lineage(base: DBTLineageTracer, head: DBTLineageTracer, include_impact: bool = True, jobs: Optional[int] = None) -> Dict:
+    """
+    Column lineage changes from base to head
+
+    Args:
+        include_impact: also report downstream columns of every changed edge, from the head
+            project graph if it is already built, otherwise from the downstream subgraph of the
+            changed columns (see DBTLineageTracer._impact_subgraph)
+        jobs: worker processes for analysing the touched models on each side (see analyze_all_models)
+
+    Returns:
+        {"models": {...}, "edges": {"added", "removed", "changed"}, "impacted_columns": {...}, "summary": {...}}
+    """
+    with timed_event("lineage_diffed") as event:
+        models = classify_models(base, head)
+        touched = models["changed"] + models["added"] + models["removed"]
+        relinked = relinked_models(head, models["unchanged"], models["added"] + models["removed"])
+        share_unchanged_analyses(head, base, relinked)
+
+        analyse_models(base, models["changed"] + models["removed"], jobs)
+        analyse_models(head, models["changed"] + models["added"], jobs)
+        base_edges = model_edges(base, models["changed"] + models["removed"] + relinked)
+        head_edges = model_edges(head, models["changed"] + models["added"] + relinked, head.lineage_graph)
+
+        added = sorted(set(head_edges) - set(base_edges))
+        removed = sorted(set(base_edges) - set(head_edges))
+        changed = sorted(key for key in set(base_edges) & set(head_edges) if base_edges[key] != head_edges[key])
+
+        impacted_columns = {}
+        if include_impact:
+            changed_columns = sorted({key[:2] for key in added + removed + changed})
+            head_graph = head.lineage_graph if head.lineage_graph is not None else head._impact_subgraph(changed_columns)
+            for table, column in changed_columns:
+                downstream = head_graph.trace_downstream(table, column)
+                if downstream:
+                    impacted_columns[f"{table}.{column}"] = sorted({f"{node['table']}.{node['column']}" for node in downstream})
+
+        summary = {
+            "models_added": len(models["added"]),
+            "models_removed": len(models["removed"]),
+            "models_changed": len(models["changed"]),
+            "models_unchanged": len(models["unchanged"]),
+            "edges_added": len(added),
+            "edges_removed": len(removed),
+            "edges_changed": len(changed),
+            "impacted_columns": len({column for columns in impacted_columns.values() for column in columns}),
+        }
+        event.update(summary)
+
+    logger.info("🔀 Lineage diff: %s model(s) touched, %s edge(s) added, %s removed, %s changed",
+                len(touched), len(added), len(removed), len(changed))
+    return {
+        "models": {name: tables for name, tables in models.items() if name != "unchanged"},
+        "edges": {
+            "added": [_edge_record(key, head_edges[key]) for key in added],
+            "removed": [_edge_record(key, base_edges[key]) for key in removed],
+            "changed": [
+                dict(_edge_record(key, head_edges[key]), before=_edge_record(key, base_edges[key])["expressions"])
+                for key in changed
+            ],
+        },
+        "impacted_columns": impacted_columns,
+        "summary": summary,
+    }
+
+
+def print_diff_report(diff: Dict) -> None:
+    summary = diff["summary"]
+    print(f"\n🔀 LINEAGE DIFF: {summary['models_changed']} changed, {summary['models_added']} added, "
+          f"{summary['models_removed']} removed model(s) ({summary['models_unchanged']} unchanged)")
+    for name, symbol in (("added", "➕"), ("removed", "➖"), ("changed", "✏️ ")):
+        edges = diff["edges"][name]
+        if not edges:
+            continue
+        print(f"\n{symbol} {name.upper()} EDGES ({len(edges)}):")
+        for edge in edges:
+            print(f"  {edge['table']}.{edge['column']} ← {edge['upstream_table']}.{edge['upstream_column']}")
+    if diff["impacted_columns"]:
+        print(f"\n💥 DOWNSTREAM IMPACT ({summary['impacted_columns']} column(s)):")
+        for column, impacted in diff["impacted_columns"].items():
+            print(f"  {column} → {', '.join(impacted)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Column lineage diff between two compiled dbt projects')
+    parser.add_argument('--base-compiled-dir', required=True, help='Compiled SQL directory of the base (e.g. main)')
+    parser.add_argument('--base-manifest', required=True, help='manifest.json of the base')
+    parser.add_argument('--head-compiled-dir', default='target/compiled', help='Compiled SQL directory of the head (default: target/compiled)')
+    parser.add_argument('--head-manifest', default='target/manifest.json', help='manifest.json of the head (default: target/manifest.json)')
+    parser.add_argument('--internal-prefixes', nargs='+', default=['ph_'],
+                        help='Database prefixes for internal tables (default: ph_)')
+    parser.add_argument('--cache-dir', type=str,
+                        help='Persistent parsed-model cache shared by both sides (e.g. .lineage_cache)')
+    parser.add_argument('--dialect', type=str,
+                        help='sqlglot dialect of the compiled SQL (default: from each manifest adapter_type)')
+    parser.add_argument('--jobs', '-j', type=int, help='Worker processes for analysing the touched models (0 = all CPUs)')
+    parser.add_argument('--no-impact', action='store_true', help='Only diff edges; skip the downstream impact walk')
+    parser.add_argument('--output', '-o', type=str, help='Also write the diff as JSON to this file')
+    parser.add_argument('--log-level', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+
+    args = parser.parse_args()
+    configure_console_logging(args.log_level)
+
+    base_tracer = DBTLineageTracer(args.base_compiled_dir, args.internal_prefixes, manifest_path=args.base_manifest,
+                                   cache_dir=args.cache_dir, dialect=args.dialect)
+    head_tracer = DBTLineageTracer(args.head_compiled_dir, args.internal_prefixes, manifest_path=args.head_manifest,
+                                   cache_dir=args.cache_dir, dialect=args.dialect)
+    lineage_diff = diff_lineage(base_tracer, head_tracer, include_impact=not args.no_impact, jobs=args.jobs)
+    print_diff_report(lineage_diff)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(lineage_diff, f, indent=2)
+        print(f"\n💾 Diff written to {args.output}")
@@ -0,0 +1,166 @@
+"""
+Export a project ColumnLineageGraph to queryable files: a SQLite database or Parquet files
+
+Both exports hold the same tables:
+    lineage_tables      (table_name, kind)
+    lineage_columns     (table_name, column_name, kind)
+    lineage_edges       (table_name, column_name, upstream_table, upstream_column, expression,
+                         transformation_type, level, reason, via_cte, union_branch)
+    source_definitions  (table_name, column_name, description, data_type, definition_json)
+    lineage_metadata    (key, value)
+
+Names are lowercase and unquoted, as in the graph. Column "*" stands for SELECT * /
+snapshot pass-through. SQLite gets indexes on (table_name, column_name) for both edge
+directions, so impact questions are a recursive CTE away, e.g.
+
+    WITH RECURSIVE impacted(table_name, column_name) AS (
+        SELECT 'stg_orders', 'order_amount'
+        UNION
+        SELECT e.table_name, e.column_name FROM lineage_edges e
+        JOIN impacted i ON e.upstream_table = i.table_name AND e.upstream_column = i.column_name
+    )
+    SELECT * FROM impacted;
+
+Parquet export needs pyarrow (the files can also be queried directly with DuckDB).
+"""
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import sqlglot
+
+from lineage_graph import ColumnLineageGraph, _normalize
+
+try:
+    import pyarrow  # Optional: only needed for Parquet export
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EDGE_DETAIL_FIELDS = ('level', 'reason', 'via_cte', 'union_branch')
+
+TABLE_COLUMNS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "lineage_tables": (("table_name", "TEXT"), ("kind", "TEXT")),
+    "lineage_columns": (("table_name", "TEXT"), ("column_name", "TEXT"), ("kind", "TEXT")),
+    "lineage_edges": (
+        ("table_name", "TEXT"), ("column_name", "TEXT"), ("upstream_table", "TEXT"), ("upstream_column", "TEXT"),
+        ("expression", "TEXT"), ("transformation_type", "TEXT"), ("level", "TEXT"), ("reason", "TEXT"),
+        ("via_cte", "TEXT"), ("union_branch", "INTEGER")
+    ),
+    "source_definitions": (
+        ("table_name", "TEXT"), ("column_name", "TEXT"), ("description", "TEXT"), ("data_type", "TEXT"),
+        ("definition_json", "TEXT")
+    ),
+    "lineage_metadata": (("key", "TEXT"), ("value", "TEXT")),
+}
+
+SQLITE_INDEXES = (
+    "CREATE UNIQUE INDEX idx_lineage_tables ON lineage_tables (table_name)",
+    "CREATE UNIQUE INDEX idx_lineage_columns ON lineage_columns (table_name, column_name)",
+    "CREATE INDEX idx_lineage_edges_downstream ON lineage_edges (table_name, column_name)",
+    "CREATE INDEX idx_lineage_edges_upstream ON lineage_edges (upstream_table, upstream_column)",
+    "CREATE UNIQUE INDEX idx_source_definitions ON source_definitions (table_name, column_name)",
+)
+
+
+def graph_rows(graph: ColumnLineageGraph, source_definitions: Optional[Dict] = None) -> Dict[str, List[Tuple]]:
+    """
+    Rows for every export table, in TABLE_COLUMNS order
+    """
+    rows = {
+        "lineage_tables": sorted(graph.table_kinds.items()),
+        "lineage_columns": sorted(
+            (table, column, graph.table_kinds.get(table, "unknown"))
+            for table, columns in graph.table_columns.items() for column in columns
+        ),
+        "lineage_edges": [],
+        "source_definitions": [],
+    }
+
+    for (table, column), edges in sorted(graph.upstream_edges.items()):
+        for edge in edges:
+            rows["lineage_edges"].append(
+                (table, column, edge["table"], edge["column"], edge.get("expression"), edge.get("transformation_type"))
+                + tuple(edge.get(field) for field in EDGE_DETAIL_FIELDS)
+            )
+
+    for table, columns in sorted((source_definitions or {}).items()):
+        for column, definition in sorted(columns.items()):
+            definition = definition if isinstance(definition, dict) else {"description": definition}
+            rows["source_definitions"].append((
+                _normalize(table), _normalize(column), definition.get("description"), definition.get("data_type"),
+                json.dumps(definition, sort_keys=True)
+            ))
+
+    summary = graph.summary()
+    rows["lineage_metadata"] = [
+        ("exported_at", time.strftime("%Y-%m-%dT%H:%M:%S")),
+        ("sqlglot_version", sqlglot.__version__),
+        ("tables", str(summary["tables"])),
+        ("columns", str(summary["columns"])),
+        ("edges", str(summary["edges"])),
+    ]
+    return rows
+
+
+def export_graph_to_sqlite(graph: ColumnLineageGraph, database_path: str, source_definitions: Optional[Dict] = None) -> Dict[str, int]:
+    """
+    Write the graph to a SQLite database, replacing any earlier export tables in it
+
+    Returns:
+        Row count per table
+    """
+    rows = graph_rows(graph, source_definitions)
+    connection = sqlite3.connect(database_path)
+    try:
+        with connection:
+            for table, columns in TABLE_COLUMNS.items():
+                connection.execute(f"DROP TABLE IF EXISTS {table}")
+                connection.execute(f"CREATE TABLE {table} ({', '.join(f'{name} {sql_type}' for name, sql_type in columns)})")
+                placeholders = ", ".join("?" for _ in columns)
+                connection.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows[table])
+            for index_sql in SQLITE_INDEXES:
+                connection.execute(index_sql)
+    finally:
+        connection.close()
+    return {table: len(table_rows) for table, table_rows in rows.items()}
+
+
+def export_graph_to_parquet(graph: ColumnLineageGraph, output_dir: str, source_definitions: Optional[Dict] = None) -> Dict[str, int]:
+    """
+    Write one <table>.parquet file per export table into output_dir
+
+    Raises:
+        ImportError: if pyarrow is not installed
+
+    Returns:
+        Row count per table
+    """
+    if pyarrow is None:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow); SQLite export has no extra dependencies")
+
+    rows = graph_rows(graph, source_definitions)
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+    for table, columns in TABLE_COLUMNS.items():
+        arrow_type = {"TEXT": pyarrow.string(), "INTEGER": pyarrow.int64()}
+        schema = pyarrow.schema([(name, arrow_type[sql_type]) for name, sql_type in columns])
+        data = {name: [row[i] for row in rows[table]] for i, (name, _) in enumerate(columns)}
+        pyarrow.parquet.write_table(pyarrow.table(data, schema=schema), str(output / f"{table}.parquet"))
+    return {table: len(table_rows) for table, table_rows in rows.items()}
+
+
+def export_graph(graph: ColumnLineageGraph, path: str, output_format: Optional[str] = None,
+                 source_definitions: Optional[Dict] = None) -> Dict[str, int]:
+    """
+    Export to SQLite or Parquet; without output_format, .db/.sqlite/.sqlite3 paths mean SQLite and anything else a Parquet directory
+    """
+    if output_format is None:
+        output_format = "sqlite" if Path(path).suffix.lower() in (".db", ".sqlite", ".sqlite3") else "parquet"
+    if output_format == "sqlite":
+        return export_graph_to_sqlite(graph, path, source_definitions)
+    if output_format == "parquet":
+        return export_graph_to_parquet(graph, path, source_definitions)
+    raise ValueError(f"Unknown export format: {output_format}")
@@ -0,0 +1,218 @@
+from collections import deque
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+def _normalize(name: str) -> str:
+    """Identifiers are compared case-insensitively and without quotes, like Snowflake does"""
+    return name.replace('"', '').lower()
+
+
+class ColumnLineageGraph:
+    """
+    Project-wide column-level lineage index.
+
+    Nodes are (table, column) pairs: models are keyed by their model name
+    (e.g. "stg_orders"), sources by their full reference
+    (e.g. "raw_ecommerce_db.public.orders"). Each edge points from a column to
+    one of the upstream columns it is computed from and carries the SQL
+    expression and transformation type of the projection.
+
+    A column of "*" represents SELECT * / snapshot pass-through: a column not
+    projected explicitly by a table is inherited through that table's "*" edges.
+
+    Every edge is also stored in a reverse index (downstream_edges) so impact
+    analysis ("what breaks if this column changes?") is a walk in the other direction.
+
+    known_columns (table -> set of lowercase columns, or None if unknown) makes star
+    inheritance schema-aware: a column is only inherited from starred tables that have it.
+    """
+
+    def __init__(self, known_columns: Optional[Callable[[str], Optional[Set[str]]]] = None):
+        self.upstream_edges: Dict[Tuple[str, str], List[Dict]] = {}
+        self.downstream_edges: Dict[Tuple[str, str], List[Dict]] = {}
+        self.table_columns: Dict[str, Set[str]] = {}
+        self.table_kinds: Dict[str, str] = {}
+        self.known_columns = known_columns
+
+    def add_table(self, table: str, kind: str) -> None:
+        """
+        Register a table and its kind ("model", "snapshot" or "source")
+        """
+        table = _normalize(table)
+        self.table_columns.setdefault(table, set())
+        # A table first seen as someone's upstream gets its real kind once it is analysed
+        if self.table_kinds.get(table) in (None, "source"):
+            self.table_kinds[table] = kind
+
+    def add_edge(self, table: str, column: str, upstream_table: str, upstream_column: str,
+                 expression: Optional[str] = None, transformation_type: str = "unknown",
+                 table_kind: str = "model", upstream_kind: str = "model", **details) -> None:
+        """
+        Record that table.column is derived from upstream_table.upstream_column
+        """
+        node = (_normalize(table), _normalize(column))
+        upstream_node = (_normalize(upstream_table), _normalize(upstream_column))
+
+        self.add_table(node[0], table_kind)
+        self.add_table(upstream_node[0], upstream_kind)
+        self.table_columns[node[0]].add(node[1])
+        self.table_columns[upstream_node[0]].add(upstream_node[1])
+
+        edges = self.upstream_edges.setdefault(node, [])
+        edge = {
+            "table": upstream_node[0],
+            "column": upstream_node[1],
+            "expression": expression,
+            "transformation_type": transformation_type,
+            **details
+        }
+        if edge not in edges:
+            edges.append(edge)
+            self.downstream_edges.setdefault(upstream_node, []).append(dict(edge, table=node[0], column=node[1]))
+
+    def remove_table_edges(self, table: str) -> None:
+        """
+        Drop every upstream edge of a table (and the matching reverse-index entries) so it can be re-added
+        """
+        table = _normalize(table)
+        for node in [node for node in self.upstream_edges if node[0] == table]:
+            for edge in self.upstream_edges.pop(node):
+                upstream_node = (edge["table"], edge["column"])
+                remaining = [
+                    downstream for downstream in self.downstream_edges.get(upstream_node, [])
+                    if (downstream["table"], downstream["column"]) != node
+                ]
+                if remaining:
+                    self.downstream_edges[upstream_node] = remaining
+                else:
+                    self.downstream_edges.pop(upstream_node, None)
+
+    def resolve_table(self, table: str) -> str:
+        """
+        Map a full table reference onto the graph's key for it (model name or full source name)
+        """
+        table = _normalize(table)
+        if table in self.table_kinds:
+            return table
+        short_name = table.split('.')[-1]
+        if short_name in self.table_kinds:
+            return short_name
+        return table
+
+    def get_upstream_edges(self, table: str, column: str) -> List[Dict]:
+        """
+        Direct upstream edges of table.column, falling back to the table's "*" pass-through edges
+        """
+        table = self.resolve_table(table)
+        column = _normalize(column)
+
+        explicit = self.upstream_edges.get((table, column))
+        if explicit:
+            return explicit
+
+        inherited = []
+        for edge in self.upstream_edges.get((table, "*"), []):
+            if edge["column"] == "*" and edge["transformation_type"] != "snapshot" and not self._may_have_column(edge["table"], column):
+                continue
+            inherited.append(dict(edge, column=column if edge["column"] == "*" else edge["column"]))
+        return inherited
+
+    def _may_have_column(self, table: str, column: str) -> bool:
+        known = self.known_columns(table) if self.known_columns else None
+        return known is None or column in known
+
+    def get_downstream_edges(self, table: str, column: str) -> List[Dict]:
+        """
+        Direct downstream edges of table.column, including tables that pass it through via "*"
+        """
+        table = self.resolve_table(table)
+        column = _normalize(column)
+
+        edges = list(self.downstream_edges.get((table, column), []))
+        if column == "*":
+            return edges
+
+        for edge in self.downstream_edges.get((table, "*"), []):
+            if edge["column"] != "*":
+                continue
+            if edge["transformation_type"] != "snapshot" and not self._may_have_column(table, column):
+                continue
+            # An explicit projection of the same name shadows the star pass-through
+            if (edge["table"], column) in self.upstream_edges:
+                continue
+            edges.append(dict(edge, column=column))
+        return edges
+
+    def trace_upstream(self, table: str, column: str, max_depth: Optional[int] = None) -> List[Dict]:
+        """
+        Breadth-first walk from table.column to every upstream column
+
+        Returns:
+            One dict per reachable upstream column with its shortest path; "expression" and
+            "transformation_type" describe the edge that reached it (i.e. how the downstream column uses it)
+        """
+        return self._walk(table, column, self.get_upstream_edges, max_depth)
+
+    def trace_downstream(self, table: str, column: str, max_depth: Optional[int] = None) -> List[Dict]:
+        """
+        Breadth-first walk from table.column to every column computed from it (impact analysis)
+
+        Returns:
+            One dict per impacted column with its shortest path from the changed column
+        """
+        return self._walk(table, column, self.get_downstream_edges, max_depth)
+
+    def _walk(self, table: str, column: str, next_edges, max_depth: Optional[int]) -> List[Dict]:
+        start = (self.resolve_table(table), _normalize(column))
+        visited = {start}
+        queue = deque([(start, [f"{start[0]}.{start[1]}"])])
+        results = []
+
+        while queue:
+            (current_table, current_column), path = queue.popleft()
+            depth = len(path) - 1
+            if max_depth is not None and depth >= max_depth:
+                continue
+
+            for edge in next_edges(current_table, current_column):
+                node = (edge["table"], edge["column"])
+                if node in visited:
+                    continue
+                visited.add(node)
+
+                node_path = path + [f"{node[0]}.{node[1]}"]
+                results.append({
+                    "table": node[0],
+                    "column": node[1],
+                    "kind": self.table_kinds.get(node[0], "unknown"),
+                    "depth": depth + 1,
+                    "path": node_path,
+                    "expression": edge.get("expression"),
+                    "transformation_type": edge.get("transformation_type", "unknown")
+                })
+                queue.append((node, node_path))
+
+        return results
+
+    def get_sources(self, table: str, column: str) -> List[Dict]:
+        """
+        Ultimate upstream columns of table.column (nodes with no further upstream edges)
+        """
+        return [
+            node for node in self.trace_upstream(table, column)
+            if not self.get_upstream_edges(node["table"], node["column"])
+        ]
+
+    def summary(self) -> Dict:
+        """
+        Node, edge and table counts for reporting
+        """
+        kind_counts = {}
+        for kind in self.table_kinds.values():
+            kind_counts[kind] = kind_counts.get(kind, 0) + 1
+        return {
+            "tables": len(self.table_kinds),
+            "columns": sum(len(columns) for columns in self.table_columns.values()),
+            "edges": sum(len(edges) for edges in self.upstream_edges.values()),
+            "tables_by_kind": kind_counts
+        }
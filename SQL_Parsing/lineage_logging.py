@@ -0,0 +1,103 @@
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, TextIO, Union
+
+# Library code logs under "sql_parsing.*" and is silent unless the application configures a handler
+LOGGER_NAME = "sql_parsing"
+EVENT_LOGGER_NAME = f"{LOGGER_NAME}.events"
+
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+
+event_logger = logging.getLogger(EVENT_LOGGER_NAME)
+event_logger.propagate = False  # Structured events only go to event log handlers, never the console
+
+
+def get_logger(module_name: str) -> logging.Logger:
+    """
+    Logger for one module of the package (e.g. get_logger("tracer") -> "sql_parsing.tracer")
+    """
+    return logging.getLogger(f"{LOGGER_NAME}.{module_name}")
+
+
+def configure_console_logging(level: Union[int, str] = logging.INFO, stream: Optional[TextIO] = None) -> logging.Handler:
+    """
+    Print the tracer's status lines as plain messages, the way the CLI has always shown them
+
+    Returns:
+        The installed handler (pass it to logging.getLogger(LOGGER_NAME).removeHandler to undo)
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    package_logger = logging.getLogger(LOGGER_NAME)
+    package_logger.addHandler(handler)
+    package_logger.setLevel(level)
+    return handler
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    One JSON object per event record: {"event": ..., "ts": ..., **fields}
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = getattr(record, "event_fields", None) or {"event": record.getMessage(), "ts": record.created}
+        return json.dumps(payload, default=str)
+
+
+def enable_event_log(target: Union[str, TextIO]) -> logging.Handler:
+    """
+    Start writing structured events (per-model analysis timings, traces, graph builds) as JSON lines
+
+    Args:
+        target: file path to append to, or an open text stream
+
+    Returns:
+        The installed handler (pass it to disable_event_log to stop)
+    """
+    if isinstance(target, str):
+        handler = logging.FileHandler(target, encoding="utf-8")
+    else:
+        handler = logging.StreamHandler(target)
+    handler.setFormatter(JsonLinesFormatter())
+    event_logger.addHandler(handler)
+    event_logger.setLevel(logging.INFO)
+    return handler
+
+
+def disable_event_log(handler: logging.Handler) -> None:
+    event_logger.removeHandler(handler)
+    handler.close()
+
+
+def events_enabled() -> bool:
+    return event_logger.isEnabledFor(logging.INFO) and bool(event_logger.handlers)
+
+
+def emit_event(event: str, **fields) -> None:
+    """
+    Record one structured event; a no-op when no event log is enabled
+    """
+    if events_enabled():
+        event_logger.info(event, extra={"event_fields": {"event": event, "ts": time.time(), **fields}})
+
+
+@contextmanager
+def timed_event(event: str, **fields) -> Iterator[Dict]:
+    """
+    Time a block and emit it as an event with a "seconds" field
+
+    The yielded dict can be filled in inside the block with fields only known at the end
+    (e.g. whether a cache was hit). Nothing is timed when no event log is enabled.
+    """
+    if not events_enabled():
+        yield fields
+        return
+
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        emit_event(event, seconds=round(time.perf_counter() - start, 6), **fields)
@@ -0,0 +1,196 @@
+"""
+Compact representation of trace_column_lineage_across_files results
+
+The dict results repeat table/column names, dependency dicts and whole per-file analyses
+(including the rendered llm_context text) at every hop. CompactLineage keeps one
+__slots__ node per distinct (sub)result with interned strings, stores every dependency
+as a shared frozen tuple, and drops the large text fields of each per-file analysis.
+Those are re-rendered only when a caller asks for them (context() or to_dict()).
+"""
+import sys
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Result keys kept as LineageNode attributes; anything else lands in LineageNode.extra
+NODE_SLOTS = ('table', 'column', 'type', 'reason', 'sql_file', 'error')
+# Keys rebuilt from the node's structure rather than stored
+STRUCTURAL_KEYS = ('current_file_analysis', 'upstream_lineage', 'cte_transformations')
+# Text rendered per file analysis; dropped from the compact form unless keep_context=True
+LAZY_TEXT_FIELDS = ('llm_context',)
+
+Frozen = Tuple[Tuple[str, object], ...]
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _freeze(mapping: Dict, skip: Tuple[str, ...] = ()) -> Frozen:
+    return tuple((sys.intern(key), _intern(value)) for key, value in mapping.items() if key not in skip)
+
+
+class LineageEdge:
+    """
+    One upstream_lineage entry: the dependency as found in SQL, the traced upstream node, and any resolution flags
+    """
+    __slots__ = ('dependency', 'node', 'extra')
+
+    def __init__(self, dependency: Frozen, node: 'LineageNode', extra: Frozen = ()):
+        self.dependency = dependency
+        self.node = node
+        self.extra = extra
+
+
+class LineageNode:
+    """
+    One traced (table, column): its kind ("intermediate", "source", "snapshot", ...), the
+    stripped per-file analysis (None for sources) and the edges to its upstream nodes
+    """
+    __slots__ = NODE_SLOTS + ('analysis', 'edges', 'extra')
+
+    def __init__(self):
+        for slot in self.__slots__:
+            setattr(self, slot, None)
+        self.edges: List[LineageEdge] = []
+        self.extra: Frozen = ()
+
+    def __repr__(self):
+        return f"LineageNode({self.table}.{self.column}, {self.type}, {len(self.edges)} upstream)"
+
+
+class CompactLineage:
+    """
+    Node/edge view of one lineage result; shared subtrees (diamond DAGs) stay shared
+
+    Args:
+        root: node of the traced column
+        renderer: callable (table, column) -> per-file analysis dict (the trace_column_lineage
+                  output) used to render dropped text fields on demand; see
+                  DBTLineageTracer.render_single_file_trace
+    """
+    __slots__ = ('root', 'renderer', '_rendered')
+
+    def __init__(self, root: LineageNode, renderer: Optional[Callable[[str, str], Optional[Dict]]] = None):
+        self.root = root
+        self.renderer = renderer
+        self._rendered: Dict[Tuple[str, str], Optional[Dict]] = {}
+
+    @classmethod
+    def from_result(cls, result: Dict, renderer: Optional[Callable[[str, str], Optional[Dict]]] = None,
+                    keep_context: bool = False) -> 'CompactLineage':
+        """
+        Convert a trace_column_lineage_across_files result
+
+        Args:
+            keep_context: keep llm_context text in the compact analyses instead of re-rendering it later
+        """
+        nodes_by_id: Dict[int, LineageNode] = {}
+        analyses_by_id: Dict[int, Dict] = {}
+        dependencies: Dict[Frozen, Frozen] = {}
+        text_fields = () if keep_context else LAZY_TEXT_FIELDS
+
+        def compact_analysis(analysis: Dict) -> Dict:
+            compact = analyses_by_id.get(id(analysis))
+            if compact is None:
+                compact = {key: value for key, value in analysis.items() if key not in text_fields}
+                if not keep_context and compact.get('cte_transformations'):
+                    compact['cte_transformations'] = [
+                        {key: value for key, value in cte.items() if key != 'details'}
+                        for cte in compact['cte_transformations']
+                    ]
+                analyses_by_id[id(analysis)] = compact
+            return compact
+
+        def convert(result: Dict) -> LineageNode:
+            node = nodes_by_id.get(id(result))
+            if node is not None:
+                return node
+            node = LineageNode()
+            nodes_by_id[id(result)] = node
+
+            for slot in NODE_SLOTS:
+                setattr(node, slot, _intern(result.get(slot)))
+            node.extra = _freeze({key: value for key, value in result.items() if key not in NODE_SLOTS + STRUCTURAL_KEYS})
+            if 'current_file_analysis' in result:
+                node.analysis = compact_analysis(result['current_file_analysis'])
+
+            for entry in result.get('upstream_lineage', []):
+                dependency = _freeze(entry.get('dependency', {}))
+                dependency = dependencies.setdefault(dependency, dependency)
+                extra = _freeze(entry, skip=('dependency', 'upstream_trace'))
+                node.edges.append(LineageEdge(dependency, convert(entry.get('upstream_trace', {})), extra))
+            return node
+
+        return cls(convert(result), renderer)
+
+    def nodes(self) -> Iterator[LineageNode]:
+        """
+        Every distinct node, root first (depth-first)
+        """
+        seen = set()
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            yield node
+            stack.extend(reversed([edge.node for edge in node.edges]))
+
+    def edges(self) -> Iterator[Tuple[LineageNode, LineageEdge]]:
+        """
+        (downstream node, edge) for every edge, each shared node's edges listed once
+        """
+        for node in self.nodes():
+            for edge in node.edges:
+                yield node, edge
+
+    def rendered_analysis(self, node: LineageNode) -> Optional[Dict]:
+        """
+        Full per-file analysis of a node (with text fields), rendered once via the renderer and then cached
+        """
+        if node.analysis is None or self.renderer is None:
+            return node.analysis
+        key = (node.table, node.column)
+        if key not in self._rendered:
+            self._rendered[key] = self.renderer(node.table, node.column)
+        return self._rendered[key] or node.analysis
+
+    def context(self, node: Optional[LineageNode] = None) -> Optional[str]:
+        """
+        llm_context text of a node (default: the root), rendered lazily
+        """
+        analysis = self.rendered_analysis(node or self.root)
+        return analysis.get('llm_context') if analysis else None
+
+    def to_dict(self, include_context: bool = True) -> Dict:
+        """
+        Export to the trace_column_lineage_across_files dict shape; shared nodes export to shared dicts
+
+        Args:
+            include_context: re-render the dropped text fields (needs a renderer)
+        """
+        exported: Dict[int, Dict] = {}
+
+        def export(node: LineageNode) -> Dict:
+            if id(node) in exported:
+                return exported[id(node)]
+            result = {}
+            exported[id(node)] = result
+
+            analysis = self.rendered_analysis(node) if include_context else node.analysis
+            for slot in NODE_SLOTS:
+                value = getattr(node, slot)
+                if value is not None:
+                    result[slot] = value
+            if analysis is not None:
+                result['current_file_analysis'] = analysis
+                result['cte_transformations'] = analysis.get('cte_transformations', [])
+            if node.edges or node.type in ('intermediate', 'snapshot'):
+                result['upstream_lineage'] = [
+                    dict(dependency=dict(edge.dependency), upstream_trace=export(edge.node), **dict(edge.extra))
+                    for edge in node.edges
+                ]
+            result.update(node.extra)
+            return result
+
+        return export(self.root)
@@ -0,0 +1,266 @@
+"""
+Long-running lineage query server
+
+Builds one DBTLineageTracer (and its project lineage graph) at start-up and answers
+queries from memory over HTTP/JSON, so IDE plugins and catalogs skip the cold start
+of re-scanning, re-loading the manifest and re-parsing on every call.
+
+Routes (GET with query parameters, or POST with a JSON body):
+    /trace?table=T&column=C        cross-file lineage (trace_column_lineage_across_files; optional
+                                   &max_depth=N, &stop_at=stg_,snapshot and &time_budget_ms=N)
+    /impact?table=T&column=C       downstream impact (trace_column_impact)
+    /llm_context?table=T&column=C  LLM-ready technical context text (optional &token_budget=N)
+    /health                        model count, graph summary, last refresh
+    /reload                        re-check changed files and the manifest immediately
+
+Changed, added and removed compiled files (and a rewritten manifest.json) are picked up
+automatically: before answering, the server re-checks at most every --reload-interval seconds.
+
+Usage:
+    python lineage_server.py --compiled-dir target/compiled --manifest target/manifest.json --port 8765
+    curl 'http://127.0.0.1:8765/trace?table=fct_customer_orders&column=customer_segment'
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from dbt_lineage_tracer import (DEFAULT_PREFETCH_WORKERS, DBTLineageTracer, build_comprehensive_technical_context,
+                                format_context_for_llm)
+from lineage_logging import configure_console_logging, get_logger
+
+logger = get_logger("server")
+
+# Parameters each route accepts
+ROUTE_PARAMETERS = {
+    "trace": ("table", "column", "max_depth", "stop_at", "time_budget_ms"),
+    "impact": ("table", "column"),
+    "llm_context": ("table", "column", "token_budget"),
+    "health": (),
+    "reload": ()
+}
+NUMERIC_PARAMETERS = {"max_depth": int, "time_budget_ms": float, "token_budget": int}
+
+
+class LineageService:
+    """
+    Query API over one warm tracer; every call is serialised by a lock because the tracer's caches are not thread-safe
+    """
+
+    def __init__(self, tracer: DBTLineageTracer, reload_interval: float = 2.0, jobs: Optional[int] = None):
+        self.tracer = tracer
+        self.reload_interval = reload_interval
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.last_refresh = 0.0
+        self.manifest_mtime_ns = self._manifest_mtime_ns()
+
+        self.tracer.get_lineage_graph(jobs)
+        self.last_refresh = time.monotonic()
+
+    def _manifest_mtime_ns(self) -> Optional[int]:
+        try:
+            return os.stat(self.tracer.manifest_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self, force: bool = False) -> Dict:
+        """
+        Pick up changed compiled files (and a changed manifest) if reload_interval has passed
+        """
+        if not force and time.monotonic() - self.last_refresh < self.reload_interval:
+            return {"checked": False}
+        self.last_refresh = time.monotonic()
+
+        changes = self.tracer.refresh_changed_models()
+        manifest_mtime_ns = self._manifest_mtime_ns()
+        manifest_changed = manifest_mtime_ns != self.manifest_mtime_ns
+        if manifest_changed:
+            logger.info("📚 Manifest changed - reloading and rebuilding the lineage graph")
+            self.manifest_mtime_ns = manifest_mtime_ns
+            self.tracer.reload_manifest()
+            self.tracer.build_project_lineage_graph(self.jobs)
+        return dict(changes, checked=True, manifest_changed=manifest_changed)
+
+    def trace(self, table: str, column: str, trace_options: Optional[Dict] = None) -> Dict:
+        return self.tracer.trace_column_lineage_across_files(table, column, **(trace_options or {}))
+
+    def impact(self, table: str, column: str) -> Dict:
+        return self.tracer.trace_column_impact(table, column)
+
+    def llm_context(self, table: str, column: str, token_budget: Optional[int] = None) -> Dict:
+        technical_context = build_comprehensive_technical_context(self.tracer, table, column)
+        include_source_definitions = bool(self.tracer.source_definitions)
+        return {
+            "table": table,
+            "column": column,
+            "context": format_context_for_llm(technical_context, include_source_definitions, self.tracer, token_budget)
+        }
+
+    def health(self) -> Dict:
+        return {
+            "status": "ok",
+            "models": len(self.tracer.table_to_file_map),
+            "graph": self.tracer.lineage_graph.summary() if self.tracer.lineage_graph else None,
+            "seconds_since_refresh": round(time.monotonic() - self.last_refresh, 3)
+        }
+
+    def handle(self, route: str, params: Dict) -> Dict:
+        """
+        Answer one request that request_error accepted
+        """
+        with self.lock:
+            if route == "reload":
+                return self.refresh(force=True)
+            self.refresh()
+            if route == "health":
+                return self.health()
+
+            query = {"trace": self.trace, "impact": self.impact, "llm_context": self.llm_context}[route]
+            table, column = params["table"], params["column"]
+            if route == "llm_context" and params.get("token_budget"):
+                return query(table, column, int(params["token_budget"]))
+            if route == "trace":
+                return query(table, column, trace_options_from_params(params))
+            return query(table, column)
+
+
+def request_error(route: str, params: Dict) -> Optional[Tuple[int, str]]:
+    """
+    (HTTP status, message) for a request LineageService.handle cannot answer, or None if it is well formed
+    """
+    if route not in ROUTE_PARAMETERS:
+        return 404, f"Unknown route: /{route}"
+    unknown = sorted(set(params) - set(ROUTE_PARAMETERS[route]))
+    if unknown:
+        return 400, f"Unknown parameter(s) for /{route}: {', '.join(unknown)}"
+    if "table" in ROUTE_PARAMETERS[route] and (not params.get("table") or not params.get("column")):
+        return 400, "Both 'table' and 'column' parameters are required"
+    for name, parse in NUMERIC_PARAMETERS.items():
+        if params.get(name) not in (None, ""):
+            try:
+                parse(params[name])
+            except (TypeError, ValueError):
+                return 400, f"Parameter '{name}' must be a number"
+    return None
+
+
+def trace_options_from_params(params: Dict) -> Dict:
+    """
+    max_depth / stop_at / time_budget_ms request parameters as trace_column_lineage_across_files options
+    """
+    options = {}
+    if params.get("max_depth") not in (None, ""):
+        options["max_depth"] = int(params["max_depth"])
+    if params.get("time_budget_ms") not in (None, ""):
+        options["time_budget_ms"] = float(params["time_budget_ms"])
+    stop_at = params.get("stop_at")
+    if stop_at:
+        options["stop_at_layers"] = stop_at.split(",") if isinstance(stop_at, str) else list(stop_at)
+    return options
+
+
+def make_request_handler(service: LineageService):
+    """
+    BaseHTTPRequestHandler subclass bound to one LineageService
+    """
+
+    class LineageRequestHandler(BaseHTTPRequestHandler):
+
+        def _respond(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _dispatch(self, params: Dict) -> None:
+            route = urlparse(self.path).path.strip("/")
+            start = time.perf_counter()
+            error = request_error(route, params)
+            if error:
+                status, message = error
+                self._respond(status, {"error": message})
+            else:
+                try:
+                    self._respond(200, service.handle(route, params))
+                except Exception as e:
+                    logger.error("❌ Error answering /%s %s: %s", route, params, e)
+                    logger.debug("Traceback for /%s", route, exc_info=True)
+                    self._respond(500, {"error": str(e)})
+            logger.info("%s /%s %s (%.1f ms)", self.command, route, params, (time.perf_counter() - start) * 1000)
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            self._dispatch({key: values[-1] for key, values in query.items()})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                params = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError as e:
+                self._respond(400, {"error": f"Invalid JSON body: {e}"})
+                return
+            self._dispatch(params if isinstance(params, dict) else {})
+
+        def log_message(self, format, *args):
+            # Requests are already logged through the package logger in _dispatch
+            pass
+
+    return LineageRequestHandler
+
+
+def create_server(service: LineageService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """
+    HTTP server for a service; port=0 picks a free port (see server.server_address)
+    """
+    return ThreadingHTTPServer((host, port), make_request_handler(service))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='DBT column lineage query server')
+    parser.add_argument('--compiled-dir', default='target/compiled',
+                        help='Path to dbt compiled SQL directory (default: target/compiled)')
+    parser.add_argument('--internal-prefixes', nargs='+', default=['ph_'],
+                        help='Database prefixes for internal tables (default: ph_)')
+    parser.add_argument('--source-definitions', '-s', type=str,
+                        help='Path to JSON file containing source column definitions')
+    parser.add_argument('--manifest', type=str,
+                        help='Path to DBT manifest.json file (default: target/manifest.json)')
+    parser.add_argument('--cache-dir', type=str,
+                        help='Directory for the persistent parsed-model cache (e.g. .lineage_cache)')
+    parser.add_argument('--state-file', type=str,
+                        help='Incremental state file, so restarts only re-analyse changed models')
+    parser.add_argument('--jobs', '-j', type=int,
+                        help='Worker processes for the start-up analysis of all models (0 = all CPUs)')
+    parser.add_argument('--prefetch', nargs='?', type=int, const=DEFAULT_PREFETCH_WORKERS, metavar='THREADS',
+                        help='Read all compiled SQL concurrently at start-up')
+    parser.add_argument('--sql-bundle', type=str,
+                        help='Load compiled SQL from a bundle made by sql_bundle.py')
+    parser.add_argument('--dialect', type=str,
+                        help='sqlglot dialect of the compiled SQL (default: from the manifest adapter_type)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--reload-interval', type=float, default=2.0,
+                        help='Seconds between checks for changed files (default: 2.0)')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+
+    args = parser.parse_args()
+    configure_console_logging(args.log_level)
+
+    tracer = DBTLineageTracer(args.compiled_dir, args.internal_prefixes, args.source_definitions,
+                              args.manifest, args.cache_dir, args.state_file,
+                              prefetch_workers=args.prefetch, sql_bundle=args.sql_bundle, dialect=args.dialect)
+    server = create_server(LineageService(tracer, args.reload_interval, args.jobs), args.host, args.port)
+    print(f"🛰️  Lineage server listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
@@ -0,0 +1,110 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# Per-model counters, in report column order
+MODEL_FIELDS = ('parses', 'parse_seconds', 'memory_hits', 'disk_hits', 'disk_misses', 'state_hits', 'dependency_seconds')
+
+
+class LineageStats:
+    """
+    Counts and cumulative wall time per pipeline stage and per model for one tracer.
+
+    Stages are timed inclusively: "cross_file_trace" contains the "parse" and
+    "single_file_trace" time of every model it reaches, and nested calls of the
+    same stage (recursive traces) are only timed at the outermost level.
+    Always on - a stage costs two perf_counter calls.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict] = {}
+        self.models: Dict[str, Dict] = {}
+        self.counters: Dict[str, int] = {}
+        self._active: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time a block as one call of stage `name`
+        """
+        stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+        stage["calls"] += 1
+        outermost = not self._active.get(name)
+        self._active[name] = self._active.get(name, 0) + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active[name] -= 1
+            if outermost:
+                stage["seconds"] += time.perf_counter() - start
+
+    def add_stage_time(self, name: str, seconds: float, calls: int = 1) -> None:
+        """
+        Record time measured elsewhere (e.g. inside a worker process)
+        """
+        stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+        stage["calls"] += calls
+        stage["seconds"] += seconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_model(self, table_name: str, field: str, amount=1) -> None:
+        """
+        Add to one per-model counter (see MODEL_FIELDS)
+        """
+        model = self.models.setdefault(table_name, {name: 0.0 if name.endswith('_seconds') else 0 for name in MODEL_FIELDS})
+        model[field] += amount
+
+    def reparsed_models(self) -> Dict[str, int]:
+        """
+        Models parsed more than once, with the number of extra parses
+        """
+        return {table: model["parses"] - 1 for table, model in self.models.items() if model["parses"] > 1}
+
+    def to_dict(self) -> Dict:
+        """
+        JSON-serialisable snapshot of every stage, counter and model
+        """
+        return {
+            "stages": {name: {"calls": stage["calls"], "seconds": round(stage["seconds"], 6)}
+                       for name, stage in self.stages.items()},
+            "counters": dict(self.counters),
+            "models": {table: {field: round(value, 6) if isinstance(value, float) else value
+                               for field, value in model.items()}
+                       for table, model in self.models.items()},
+            "reparsed_models": self.reparsed_models()
+        }
+
+    def report(self, top_models: Optional[int] = 20) -> str:
+        """
+        Text report: stages sorted by cumulative time, counters, and the slowest models to parse
+        """
+        lines: List[str] = ["⏱️  PROFILE", "=" * 60, f"{'Stage':<28}{'Calls':>10}{'Seconds':>12}"]
+        for name, stage in sorted(self.stages.items(), key=lambda item: item[1]["seconds"], reverse=True):
+            lines.append(f"{name:<28}{stage['calls']:>10}{stage['seconds']:>12.4f}")
+
+        if self.counters:
+            lines.append("")
+            lines.append(f"{'Counter':<28}{'Value':>10}")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:<28}{value:>10}")
+
+        models = sorted(self.models.items(), key=lambda item: item[1]["parse_seconds"] + item[1]["dependency_seconds"], reverse=True)
+        if top_models is not None:
+            models = models[:top_models]
+        if models:
+            lines.append("")
+            lines.append(f"{'Model':<36}{'Parses':>7}{'Parse s':>10}{'Deps s':>10}{'Mem':>6}{'Disk':>6}{'Miss':>6}{'State':>6}")
+            for table, model in models:
+                lines.append(
+                    f"{table[:35]:<36}{model['parses']:>7}{model['parse_seconds']:>10.4f}{model['dependency_seconds']:>10.4f}"
+                    f"{model['memory_hits']:>6}{model['disk_hits']:>6}{model['disk_misses']:>6}{model['state_hits']:>6}"
+                )
+
+        reparsed = self.reparsed_models()
+        if reparsed:
+            lines.append("")
+            lines.append(f"⚠️  Re-parsed models: {', '.join(f'{table} (+{extra})' for table, extra in sorted(reparsed.items()))}")
+        return "\n".join(lines)
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from lineage_logging import get_logger
+
+try:
+    import ijson  # Optional: lets us stream manifest.json instead of loading it whole
+except ImportError:
+    ijson = None
+
+logger = get_logger("manifest")
+
+# The only node fields DBTLineageTracer ever reads
+MANIFEST_NODE_FIELDS = ('relation_name', 'depends_on', 'resource_type', 'name', 'alias', 'database', 'schema', 'checksum')
+COMPACT_MANIFEST_VERSION = 2
+
+
+def compact_manifest_path(manifest_path: str, cache_dir: Optional[str] = None) -> Path:
+    """
+    Location of the compact extract: next to the manifest (manifest.json -> manifest.lineage.json),
+    or in cache_dir under a name that also identifies the manifest's directory
+    """
+    path = Path(manifest_path)
+    if cache_dir is None:
+        return path.with_name(f"{path.stem}.lineage.json")
+    location = hashlib.sha256(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+    return Path(cache_dir) / f"{path.stem}.{location}.lineage.json"
+
+
+def _compact_node(node: Dict) -> Dict:
+    compact = {field: node[field] for field in MANIFEST_NODE_FIELDS if field in node}
+    if 'depends_on' in compact:
+        compact['depends_on'] = {'nodes': list(compact['depends_on'].get('nodes', []))}
+    return compact
+
+
+def _iter_manifest_nodes(manifest_path: str) -> Tuple[Dict, Iterator[Tuple[str, Dict]]]:
+    """
+    Return (metadata, iterator over (node_key, node)); streams with ijson when it is installed
+    """
+    if ijson is not None:
+        with open(manifest_path, 'rb') as f:
+            metadata = next(ijson.items(f, 'metadata', use_float=True), {})
+
+        def stream_nodes():
+            with open(manifest_path, 'rb') as f:
+                yield from ijson.kvitems(f, 'nodes', use_float=True)
+
+        return metadata, stream_nodes()
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    return manifest.get('metadata', {}), iter(manifest.get('nodes', {}).items())
+
+
+def load_compact_manifest(manifest_path: str, cache_dir: Optional[str] = None) -> Dict:
+    """
+    Load only the parts of manifest.json the tracer uses: metadata plus, per node,
+    relation_name, depends_on.nodes, resource_type, name, alias, database, schema and checksum.
+
+    The first load writes a compact extract (see compact_manifest_path); later loads use it
+    as long as the manifest's size and mtime and the extract version are unchanged, so macros,
+    docs, exposures and metrics are never parsed or held in memory again. If the extract cannot
+    be written (e.g. a read-only target/), the manifest is still loaded, just not cached.
+
+    Raises:
+        FileNotFoundError: if manifest_path does not exist
+    """
+    stat = os.stat(manifest_path)
+    source_signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "version": COMPACT_MANIFEST_VERSION}
+    compact_path = compact_manifest_path(manifest_path, cache_dir)
+
+    if compact_path.exists():
+        try:
+            with open(compact_path, 'r', encoding='utf-8') as f:
+                compact = json.load(f)
+            if compact.get('source') == source_signature:
+                return compact
+        except Exception as e:
+            logger.warning("⚠️  Ignoring unreadable compact manifest %s: %s", compact_path, e)
+
+    metadata, nodes = _iter_manifest_nodes(manifest_path)
+    compact = {
+        "source": source_signature,
+        "metadata": metadata,
+        "nodes": {key: _compact_node(node) for key, node in nodes}
+    }
+
+    tmp_path = None
+    try:
+        compact_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=compact_path.parent, prefix=f"{compact_path.name}.",
+                                         suffix=".tmp", delete=False) as f:
+            tmp_path = f.name
+            json.dump(compact, f)
+        os.replace(tmp_path, compact_path)
+    except OSError as e:
+        logger.warning("⚠️  Could not write compact manifest %s, continuing without it: %s", compact_path, e)
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return compact
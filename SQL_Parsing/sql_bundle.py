@@ -0,0 +1,113 @@
+"""
+Single-file bundle of a compiled SQL directory, read through mmap
+
+On network filesystems every compiled file costs an open/read round trip. A bundle
+holds the whole directory in one file (produced once, e.g. right after `dbt compile`
+in CI) so the tracer's prefetch stage can load every model from one mapping.
+
+Layout:
+    MAGIC (8 bytes) | index length (8 bytes, little endian) | index JSON | SQL bytes...
+Index: {relative path (posix): [offset, length, mtime_ns, size]}; offsets are relative
+to the end of the index. mtime_ns/size are the source file's stat at bundling time, so
+the tracer's change detection (file signatures) keeps working for bundled content.
+
+Usage:
+    python sql_bundle.py target/compiled target/compiled.sqlbundle
+"""
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"SQLBNDL1"
+HEADER = struct.Struct("<8sQ")
+
+
+def write_bundle(compiled_sql_directory: str, bundle_path: str) -> int:
+    """
+    Concatenate every .sql file under the directory into one bundle file
+
+    Returns:
+        Number of files bundled
+    """
+    root = Path(compiled_sql_directory)
+    index: Dict[str, List[int]] = {}
+    chunks = []
+    offset = 0
+    for sql_file in sorted(root.rglob("*.sql")):
+        data = sql_file.read_bytes()
+        stat = sql_file.stat()
+        index[sql_file.relative_to(root).as_posix()] = [offset, len(data), stat.st_mtime_ns, stat.st_size]
+        chunks.append(data)
+        offset += len(data)
+
+    index_bytes = json.dumps(index, sort_keys=True).encode("utf-8")
+    tmp_path = Path(bundle_path).with_suffix(Path(bundle_path).suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(index_bytes)))
+        f.write(index_bytes)
+        for chunk in chunks:
+            f.write(chunk)
+    tmp_path.replace(bundle_path)
+    return len(index)
+
+
+class SqlBundle:
+    """
+    Read-only mmap view of a bundle; use as a context manager or call close()
+    """
+
+    def __init__(self, bundle_path: str):
+        self.path = Path(bundle_path)
+        self._file = open(self.path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, index_length = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"Not a SQL bundle: {self.path}")
+            self._data_start = HEADER.size + index_length
+            self.index: Dict[str, List[int]] = json.loads(self._map[HEADER.size:self._data_start])
+        except Exception:
+            self.close()
+            raise
+
+    def read(self, relative_path: str) -> Optional[str]:
+        entry = self.index.get(relative_path)
+        if entry is None:
+            return None
+        start = self._data_start + entry[0]
+        return self._map[start:start + entry[1]].decode("utf-8")
+
+    def signature(self, relative_path: str) -> Optional[Tuple[int, int]]:
+        """
+        (mtime_ns, size) of the source file when it was bundled
+        """
+        entry = self.index.get(relative_path)
+        return (entry[2], entry[3]) if entry else None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index)
+
+    def close(self) -> None:
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> "SqlBundle":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Bundle a dbt compiled SQL directory into one mmap-able file')
+    parser.add_argument('compiled_dir', help='Path to dbt compiled SQL directory')
+    parser.add_argument('bundle', help='Output bundle file (e.g. target/compiled.sqlbundle)')
+    args = parser.parse_args()
+
+    print(f"📦 Bundled {write_bundle(args.compiled_dir, args.bundle)} SQL files into {args.bundle}")
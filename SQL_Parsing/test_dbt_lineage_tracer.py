@@ -0,0 +1,590 @@
+import json
+import os
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+from dbt_lineage_tracer import (DBTLineageTracer, build_comprehensive_technical_context, estimate_tokens,
+                                format_context_for_llm, get_upstream_tables, quick_lineage_summary)
+from lineage_dag import analyze_lineage
+from identifier_scan import scan_identifiers
+from lineage_diff import diff_lineage
+from lineage_logging import disable_event_log, enable_event_log
+import manifest_loader
+from manifest_loader import compact_manifest_path, load_compact_manifest
+from sql_bundle import write_bundle
+from column_lineage import trace_column_lineage
+
+BASE_DIR = Path(__file__).parent
+COMPILED_DIR = BASE_DIR / "target" / "compiled"
+MANIFEST_PATH = BASE_DIR / "target" / "manifest.json"
+
+sys.path.insert(0, str(BASE_DIR / "benchmarks"))
+from synthetic_project import generate_project
+from bench_manifest_lookups import linear_check_snapshot, linear_resolve_relation
+from bench_single_pass import collect_workload
+
+
+def make_tracer(**kwargs):
+    return DBTLineageTracer(str(COMPILED_DIR), manifest_path=str(MANIFEST_PATH), **kwargs)
+
+
+def test_analysis_cache_survives_new_tracer(tmp_path):
+    """
+    A second tracer pointed at the same cache_dir should load the model from disk instead of parsing
+    """
+    first = make_tracer(cache_dir=str(tmp_path))
+    first_result = first.trace_column_lineage_across_files("fct_customer_orders", "customer_segment")
+    assert first.disk_cache.misses > 0
+
+    second = make_tracer(cache_dir=str(tmp_path))
+    second_result = second.trace_column_lineage_across_files("fct_customer_orders", "customer_segment")
+    assert second.disk_cache.misses == 0
+    assert second.disk_cache.hits == first.disk_cache.misses
+
+    first_deps = first_result["current_file_analysis"]["next_columns_to_search"]
+    second_deps = second_result["current_file_analysis"]["next_columns_to_search"]
+    assert first_deps == second_deps
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_project_graph_matches_recursive_trace_sources():
+    """
+    The precomputed graph should reach the same ultimate sources as the recursive file-by-file trace
+    """
+    tracer = make_tracer()
+    graph = tracer.build_project_lineage_graph()
+
+    graph_sources = {
+        f"{node['table']}.{node['column']}"
+        for node in graph.get_sources("fct_customer_orders", "customer_segment")
+    }
+    assert graph_sources == {
+        "raw_ecommerce_db.public.orders.order_id",
+        "raw_ecommerce_db.public.orders.order_amount",
+    }
+
+    # Snapshot pass-through: fct_order reads snp_orders, which snapshots the three wrk_orders_* models
+    upstream_tables = {node["table"] for node in tracer.get_upstream_columns("fct_order", "order_amount")}
+    assert {"snp_orders", "wrk_orders_online", "wrk_orders_retail", "wrk_orders_mobile"} <= upstream_tables
+
+
+def test_column_impact_reaches_mart_columns():
+    tracer = make_tracer()
+    impact = tracer.trace_column_impact("raw_ecommerce_db.public.orders", "order_amount")
+
+    terminal = {f"{node['table']}.{node['column']}" for node in impact["terminal_columns"]}
+    assert "fct_customer_orders.customer_segment" in terminal
+    assert "fct_order_details.order_amount" in terminal
+
+    segment = next(node for node in impact["terminal_columns"] if node["column"] == "customer_segment")
+    assert segment["path"][0] == "raw_ecommerce_db.public.orders.order_amount"
+    assert segment["path"][-1] == "fct_customer_orders.customer_segment"
+
+    # Snapshot pass-through works in reverse too: wrk_orders_online feeds fct_order via snp_orders
+    downstream_tables = {node["table"] for node in tracer.get_downstream_columns("wrk_orders_online", "order_amount")}
+    assert {"snp_orders", "fct_order"} <= downstream_tables
+
+
+def test_parallel_analysis_builds_same_graph():
+    serial = make_tracer().build_project_lineage_graph()
+    parallel_tracer = make_tracer()
+    parallel = parallel_tracer.build_project_lineage_graph(jobs=2)
+
+    assert parallel.summary() == serial.summary()
+    assert parallel.upstream_edges == serial.upstream_edges
+    # Workers send back columns and dependencies only; a tree is parsed when a trace needs it
+    assert not any("parsed" in entry for entry in parallel_tracer.analysis_cache.values())
+    assert "error" not in parallel_tracer.trace_column_lineage_across_files("fct_customer_orders", "customer_segment")
+    assert "parsed" in parallel_tracer.analysis_cache["fct_customer_orders"]
+
+
+def test_parallel_trace_parses_each_visited_model_once(capsys):
+    tracer = make_tracer()
+    upstream = tracer.upstream_models("fct_customer_orders")
+    assert {"fct_customer_orders", "customer_order_summary", "wrk_orders_final", "stg_orders"} <= upstream
+    assert len(upstream) < len(tracer.table_to_file_map)
+
+    quick_lineage_summary(str(COMPILED_DIR), "fct_customer_orders", "customer_segment", jobs=2, tracer=tracer)
+    stats = tracer.stats.to_dict()
+    assert stats["reparsed_models"] == {}
+    assert set(stats["models"]) <= upstream
+    assert stats["models"]["fct_customer_orders"]["parses"] == 1
+
+
+def test_indexed_lookups_and_single_pass_traces_match_the_sample_project():
+    """
+    The checks the benchmarks make against their baselines, run over the sample project:
+    manifest indexes agree with linear scans, and tracing every column over one shared tree
+    per model gives the same results as parsing the model afresh for each column
+    """
+    tracer = make_tracer()
+    references = set()
+    for node in tracer.manifest_data["nodes"].values():
+        references.update({node.get("name", ""), (node.get("relation_name") or "").replace('"', ''), f"missing_{node.get('name', '')}"})
+    for reference in sorted(references - {""}):
+        assert tracer._resolve_table_to_relation_name(reference) == linear_resolve_relation(tracer.manifest_data, reference)
+        linear_keys = [key for key in linear_check_snapshot(tracer.manifest_data, reference) if key in tracer.manifest_data["nodes"]]
+        assert [dep["node_key"] for dep in tracer._check_snapshot_dependencies(reference)] == linear_keys
+
+    workload = collect_workload(str(COMPILED_DIR))
+    for model, sql, column in workload:
+        analysis = tracer.get_sql_analysis(model)
+        shared = trace_column_lineage(sql, column, parsed=analysis["parsed"], base_columns=analysis["columns"])
+        fresh = trace_column_lineage(sql, column)
+        assert shared.get("next_columns_to_search") == fresh.get("next_columns_to_search"), f"{model}.{column}"
+        assert shared.get("llm_context") == fresh.get("llm_context"), f"{model}.{column}"
+
+    models = {model for model, _, _ in workload}
+    assert all(tracer.stats.to_dict()["models"][model]["parses"] == 1 for model in models)
+
+
+def test_compact_manifest_extract_is_reused_until_the_manifest_changes(tmp_path, monkeypatch):
+    manifest = tmp_path / "target" / "manifest.json"
+    manifest.parent.mkdir()
+    shutil.copy(MANIFEST_PATH, manifest)
+    reads = []
+    iter_manifest_nodes = manifest_loader._iter_manifest_nodes
+    monkeypatch.setattr(manifest_loader, "_iter_manifest_nodes", lambda path: reads.append(path) or iter_manifest_nodes(path))
+
+    compact = load_compact_manifest(str(manifest))
+    assert compact_manifest_path(str(manifest)).exists() and len(reads) == 1
+    assert load_compact_manifest(str(manifest)) == compact and len(reads) == 1
+
+    # A new mtime, a new size or a new extract version each rebuild the extract
+    os.utime(manifest, ns=(manifest.stat().st_atime_ns, manifest.stat().st_mtime_ns + 10**9))
+    load_compact_manifest(str(manifest))
+    assert len(reads) == 2
+    manifest.write_text(manifest.read_text() + "\n")
+    load_compact_manifest(str(manifest))
+    assert len(reads) == 3
+    monkeypatch.setattr(manifest_loader, "COMPACT_MANIFEST_VERSION", manifest_loader.COMPACT_MANIFEST_VERSION + 1)
+    load_compact_manifest(str(manifest))
+    assert len(reads) == 4
+    assert load_compact_manifest(str(manifest))["nodes"] == compact["nodes"] and len(reads) == 4
+
+    # With a cache_dir the extract goes there; if it cannot be written, loading still works
+    cache_dir = tmp_path / "cache"
+    tracer = DBTLineageTracer(str(COMPILED_DIR), manifest_path=str(manifest), cache_dir=str(cache_dir))
+    assert compact_manifest_path(str(manifest), str(cache_dir)).exists()
+    assert tracer.manifest_data["nodes"] == compact["nodes"]
+    unwritable = tmp_path / "not_a_directory"
+    unwritable.write_text("")
+    assert load_compact_manifest(str(manifest), str(unwritable))["nodes"] == compact["nodes"]
+
+
+def test_incremental_state_reanalyses_only_changed_models(tmp_path):
+    compiled_copy = tmp_path / "compiled"
+    shutil.copytree(COMPILED_DIR, compiled_copy)
+    state_file = tmp_path / "lineage_state.json"
+
+    def incremental_tracer():
+        return DBTLineageTracer(str(compiled_copy), manifest_path=str(MANIFEST_PATH), state_file=str(state_file))
+
+    incremental_tracer().build_project_lineage_graph()
+    assert state_file.exists()
+
+    # Warm start: nothing needs parsing
+    warm = incremental_tracer()
+    assert set(warm.model_state) == set(warm.table_to_file_map)
+    warm.build_project_lineage_graph()
+    assert warm.analysis_cache == {}
+
+    # Touch one model: only that one is re-analysed, and the live graph is patched in place
+    fct_file = compiled_copy / "order" / "fct_customer_orders.sql"
+    fct_file.write_text(fct_file.read_text().replace("co.avg_order_value,", "co.avg_order_value,\n        co.total_revenue / 2 as half_revenue,"))
+    changes = warm.refresh_changed_models()
+    assert changes == {"changed": ["fct_customer_orders"], "added": [], "removed": []}
+    assert list(warm.analysis_cache) == ["fct_customer_orders"]
+    half_revenue_upstream = warm.get_upstream_columns("fct_customer_orders", "half_revenue", max_depth=1)
+    assert [(node["table"], node["column"]) for node in half_revenue_upstream] == [("customer_order_summary", "total_revenue")]
+
+    restarted = incremental_tracer()
+    assert set(restarted.model_state) == set(restarted.table_to_file_map)
+
+
+def test_impact_and_edges_save_and_reuse_the_state_file(tmp_path):
+    state_file = tmp_path / "lineage_state.json"
+
+    first = make_tracer(state_file=str(state_file))
+    first_impact = first.trace_column_impact("raw_ecommerce_db.public.orders", "order_amount")
+    first_edges = list(first.iter_lineage_edges("fct_customer_orders", "customer_segment"))
+    assert state_file.exists()
+
+    # A second run answers both from the state file without parsing the models it covers
+    second = make_tracer(state_file=str(state_file))
+    assert second.trace_column_impact("raw_ecommerce_db.public.orders", "order_amount") == first_impact
+    assert list(second.iter_lineage_edges("fct_customer_orders", "customer_segment")) == first_edges
+    stats = second.stats.to_dict()["models"]
+    assert stats["fct_customer_orders"]["state_hits"] >= 1
+    assert not any(model_stats.get("parses") for model_stats in stats.values())
+
+
+def write_models(directory, models):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, sql in models.items():
+        (directory / f"{name}.sql").write_text(sql)
+
+
+def test_diamond_dag_shares_memoized_subtree(tmp_path):
+    write_models(tmp_path / "compiled", {
+        "stg_base": "select id, amount from raw_db.public.base",
+        "wrk_left": "select id, amount from ph_db.staging.stg_base",
+        "wrk_right": "select id, amount * 2 as amount from ph_db.staging.stg_base",
+        "fct_diamond": """
+            select l.id, l.amount + r.amount as amount
+            from ph_db.work.wrk_left l
+            join ph_db.work.wrk_right r on l.id = r.id
+        """,
+    })
+    tracer = DBTLineageTracer(str(tmp_path / "compiled"), manifest_path=str(tmp_path / "missing.json"))
+    result = tracer.trace_column_lineage_across_files("fct_diamond", "amount")
+
+    branches = {entry["upstream_trace"]["table"]: entry["upstream_trace"] for entry in result["upstream_lineage"]}
+    left_base = branches["wrk_left"]["upstream_lineage"][0]["upstream_trace"]
+    right_base = branches["wrk_right"]["upstream_lineage"][0]["upstream_trace"]
+    assert left_base["table"] == "stg_base"
+    assert left_base is right_base
+    assert tracer.trace_column_lineage_across_files("fct_diamond", "amount") is result
+
+
+def test_cycles_are_still_detected(tmp_path):
+    write_models(tmp_path / "compiled", {
+        "wrk_ping": "select id from ph_db.work.wrk_pong",
+        "wrk_pong": "select id from ph_db.work.wrk_ping",
+    })
+    tracer = DBTLineageTracer(str(tmp_path / "compiled"), manifest_path=str(tmp_path / "missing.json"))
+    result = tracer.trace_column_lineage_across_files("wrk_ping", "id")
+
+    pong = result["upstream_lineage"][0]["upstream_trace"]
+    assert pong["table"] == "wrk_pong"
+    assert pong["upstream_lineage"][0]["upstream_trace"]["error"].startswith("Circular reference")
+    assert tracer.trace_memo == {}
+
+
+def test_trace_table_matches_per_column_traces():
+    expected = {
+        column: make_tracer().trace_column_lineage_across_files("fct_customer_orders", column)
+        for column in ("customer_id", "customer_segment", "total_revenue")
+    }
+
+    tracer = make_tracer()
+    table_traces = tracer.trace_table("fct_customer_orders")
+    assert set(expected) <= set(table_traces)
+    for column, result in expected.items():
+        assert table_traces[column]["current_file_analysis"] == result["current_file_analysis"]
+
+
+def test_library_is_silent_and_event_log_records_model_timings(tmp_path, capsys):
+    event_log = tmp_path / "events.jsonl"
+    handler = enable_event_log(str(event_log))
+    try:
+        make_tracer().trace_column_lineage_across_files("fct_customer_orders", "customer_segment")
+    finally:
+        disable_event_log(handler)
+
+    assert capsys.readouterr().out == ""
+
+    events = [json.loads(line) for line in event_log.read_text().splitlines()]
+    analysed = {event["table"] for event in events if event["event"] == "model_analyzed"}
+    assert "fct_customer_orders" in analysed
+    assert all(event["seconds"] >= 0 for event in events if "seconds" in event)
+    top_trace = events[-1]
+    assert (top_trace["event"], top_trace["table"], top_trace["depth"]) == ("column_traced", "fct_customer_orders", 0)
+
+
+def test_stats_record_stages_parses_and_cache_hits(tmp_path):
+    make_tracer(cache_dir=str(tmp_path)).trace_column_lineage_across_files("fct_customer_orders", "customer_segment")
+
+    tracer = make_tracer(cache_dir=str(tmp_path))
+    tracer.trace_column_lineage_across_files("fct_customer_orders", "customer_segment")
+    stats = tracer.stats.to_dict()
+
+    assert {"manifest_load", "file_discovery", "cross_file_trace", "single_file_trace"} <= set(stats["stages"])
+    assert "parse" not in stats["stages"]
+    assert stats["models"]["fct_customer_orders"]["disk_hits"] == 1
+    assert stats["reparsed_models"] == {}
+    assert "cross_file_trace" in tracer.stats.report()
+
+
+def test_synthetic_project_traces_to_raw_sources(tmp_path):
+    project = generate_project(str(tmp_path), models=30, depth=4, fan_in=2, columns=4, snapshot_ratio=0.3)
+    tracer = DBTLineageTracer(project["compiled_dir"], manifest_path=project["manifest_path"])
+    graph = tracer.get_lineage_graph()
+
+    assert graph.summary()["tables_by_kind"]["model"] == len(project["models"])
+    for mart in project["marts"]:
+        sources = graph.get_sources(mart, "col_1")
+        assert sources and all(node["table"].startswith("raw_bench_db.public.src_") for node in sources)
+
+
+def test_compact_lineage_round_trips_to_dict_shape():
+    tracer = make_tracer()
+    compact = tracer.trace_column_lineage_compact("fct_customer_orders", "customer_segment")
+    # The nested dicts the compact form is built from are not kept in the trace memo
+    assert tracer.trace_memo == {}
+    result = tracer.trace_column_lineage_across_files("fct_customer_orders", "customer_segment")
+
+    assert compact.root.analysis is not None and "llm_context" not in compact.root.analysis
+    assert compact.context() == result["current_file_analysis"]["llm_context"]
+    assert compact.to_dict() == result
+
+    tables = [node.table for node in compact.nodes()]
+    assert tables[0] == "fct_customer_orders" and "raw_ecommerce_db.public.orders" in tables
+    assert all(len(edge.dependency) > 0 for _, edge in compact.edges())
+
+    # Once the dict form is memoized, the compact trace reuses it and still adds nothing
+    memoized = dict(tracer.trace_memo)
+    assert tracer.trace_column_lineage_compact("fct_customer_orders", "customer_segment").to_dict() == result
+    assert tracer.trace_memo == memoized
+
+
+def test_export_lineage_graph_to_sqlite(tmp_path):
+    tracer = DBTLineageTracer(str(COMPILED_DIR), manifest_path=str(MANIFEST_PATH),
+                              source_definitions_file=str(BASE_DIR / "source_definitions.json"))
+    database = tmp_path / "lineage.db"
+    counts = tracer.export_lineage_graph(str(database))
+    assert counts["lineage_edges"] == tracer.lineage_graph.summary()["edges"]
+
+    connection = sqlite3.connect(database)
+    try:
+        upstream = connection.execute(
+            "SELECT upstream_table, upstream_column, transformation_type FROM lineage_edges WHERE table_name = ? AND column_name = ?",
+            ("fct_customer_orders", "customer_segment")
+        ).fetchall()
+        described = connection.execute(
+            "SELECT d.data_type FROM lineage_columns c JOIN source_definitions d USING (table_name, column_name) "
+            "WHERE c.table_name = 'raw_ecommerce_db.public.orders' AND c.column_name = 'order_amount'"
+        ).fetchall()
+    finally:
+        connection.close()
+
+    assert ("customer_order_summary", "customer_lifetime_value", "calculated") in upstream
+    assert described == [("DECIMAL(10,2)",)]
+
+
+def test_schema_aware_star_only_traces_tables_with_the_column(tmp_path):
+    write_models(tmp_path / "compiled", {
+        "stg_left": "select id, amount from raw_db.public.left_src",
+        "stg_right": "select id as right_id, discount from raw_db.public.right_src",
+        "fct_star": "select * from ph_db.staging.stg_left l join ph_db.staging.stg_right r on l.id = r.right_id",
+        "fct_cte": "with both as (select * from ph_db.staging.stg_left l join ph_db.staging.stg_right r on l.id = r.right_id) "
+                   "select discount from both",
+    })
+
+    def upstream_tables(**kwargs):
+        tracer = DBTLineageTracer(str(tmp_path / "compiled"), manifest_path=str(tmp_path / "missing.json"), **kwargs)
+        result = tracer.trace_column_lineage_across_files("fct_star", "discount")
+        return {entry["dependency"]["table"].split(".")[-1] for entry in result["upstream_lineage"]}
+
+    # Without column knowledge the star points at both tables (stg_left then fails to find the column)
+    assert upstream_tables() == {"stg_left", "stg_right"}
+    assert upstream_tables(schema_aware=True) == {"stg_right"}
+
+    # The graph, the edge iterator and impact analysis follow the same catalog
+    tracer = DBTLineageTracer(str(tmp_path / "compiled"), manifest_path=str(tmp_path / "missing.json"), schema_aware=True)
+    assert {edge["upstream_table"] for edge in tracer.iter_lineage_edges("fct_star", "discount", max_depth=1)} == {"stg_right"}
+    assert tracer.trace_column_impact("stg_left", "discount")["impacted_column_count"] == 0
+    assert {node["table"] for node in tracer.get_upstream_columns("fct_star", "discount", max_depth=1)} == {"stg_right"}
+    assert {node["table"] for node in tracer.get_upstream_columns("fct_cte", "discount", max_depth=1)} == {"stg_right"}
+
+    # Once stg_left gains the column, a refresh forgets the columns computed before
+    (tmp_path / "compiled" / "stg_left.sql").write_text("select id, amount, discount from raw_db.public.left_src")
+    tracer.refresh_changed_models()
+    assert {node["table"] for node in tracer.get_upstream_columns("fct_star", "discount", max_depth=1)} == {"stg_left", "stg_right"}
+    assert {node["table"] for node in tracer.get_upstream_columns("fct_cte", "discount", max_depth=1)} == {"stg_left", "stg_right"}
+
+
+def test_prefetch_and_bundle_load_same_sql_as_lazy_reads(tmp_path):
+    lazy = make_tracer()
+    expected = {table_name: lazy.load_sql_file(table_name) for table_name in lazy.table_to_file_map}
+
+    prefetched = make_tracer(prefetch_workers=4)
+    assert prefetched.file_cache == expected
+    assert prefetched.file_signatures == lazy.file_signatures
+
+    bundle = tmp_path / "compiled.sqlbundle"
+    assert write_bundle(str(COMPILED_DIR), str(bundle)) == len(expected)
+    bundled = make_tracer(sql_bundle=str(bundle))
+    assert bundled.file_cache == expected
+    assert bundled.file_signatures == lazy.file_signatures
+    assert bundled.refresh_changed_models() == {"changed": [], "added": [], "removed": []}
+
+
+def test_lineage_dag_analysis_is_shared_and_ordered(tmp_path):
+    write_models(tmp_path / "compiled", {
+        "stg_base": "select id, amount from raw_db.public.base",
+        "wrk_left": "select id, amount from ph_db.staging.stg_base",
+        "wrk_right": "select id, amount * 2 as amount from ph_db.work.wrk_left",
+        "fct_diamond": """
+            select l.id, l.amount + r.amount as amount
+            from ph_db.work.wrk_left l
+            join ph_db.work.wrk_right r on l.id = r.id
+        """,
+    })
+    tracer = DBTLineageTracer(str(tmp_path / "compiled"), manifest_path=str(tmp_path / "missing.json"))
+    result = tracer.trace_column_lineage_across_files("fct_diamond", "amount")
+
+    dag = analyze_lineage(result)
+    assert analyze_lineage(result) is dag
+    assert dag.topological_order == ["base", "stg_base", "wrk_left", "wrk_right", "fct_diamond"]
+    assert dag.critical_path("fct_diamond") == dag.topological_order
+    assert dag.order_within(["wrk_right", "wrk_left"], "work") == (
+        ["wrk_left", "wrk_right"], {"wrk_left": set(), "wrk_right": {"wrk_left"}}
+    )
+    assert get_upstream_tables(result)["fct_diamond"] == ["wrk_left", "wrk_right"]
+
+
+def test_token_budget_condenses_llm_context(tmp_path):
+    project = generate_project(str(tmp_path), models=60, depth=6, fan_in=3, columns=4)
+    tracer = DBTLineageTracer(project["compiled_dir"], manifest_path=project["manifest_path"])
+    technical_context = build_comprehensive_technical_context(tracer, project["marts"][0], project["columns"][1])
+
+    full = format_context_for_llm(technical_context)
+    condensed = format_context_for_llm(technical_context, token_budget=estimate_tokens(full) // 4)
+    assert estimate_tokens(condensed) <= estimate_tokens(full) // 4
+    assert "ULTIMATE DATA SOURCES:" in condensed and "[Condensed to" in condensed
+
+
+def test_dialect_comes_from_manifest_adapter_type(tmp_path):
+    write_models(tmp_path / "compiled", {
+        "stg_events": "select event_id, safe_cast(amount as numeric) as amount from `raw_proj.events.raw_events`",
+        "fct_events": "select e.event_id, e.amount from `ph_proj.staging.stg_events` as e",
+        "dim_plain": "select 1 as id",
+    })
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"metadata": {"adapter_type": "bigquery"}, "nodes": {}}))
+
+    tracer = DBTLineageTracer(str(tmp_path / "compiled"), manifest_path=str(manifest), cache_dir=str(tmp_path / "cache"))
+    assert tracer.dialect == "bigquery"
+    result = tracer.trace_column_lineage_across_files("fct_events", "amount")
+    staging = result["upstream_lineage"][0]["upstream_trace"]
+    assert staging["table"] == "stg_events"
+    assert "SAFE_CAST" in staging["current_file_analysis"]["llm_context"]
+
+    # The same SQL analysed as another dialect gets its own cache entries
+    postgres = DBTLineageTracer(str(tmp_path / "compiled"), manifest_path=str(manifest), cache_dir=str(tmp_path / "cache"),
+                                dialect="postgres")
+    assert postgres.get_sql_analysis("dim_plain")["cache_key"] != tracer.get_sql_analysis("dim_plain")["cache_key"]
+    assert postgres.stats.models["dim_plain"]["parses"] == 1
+
+    # An unknown adapter_type in a manifest falls back to snowflake; an unknown explicit dialect is an error
+    manifest.write_text(json.dumps({"metadata": {"adapter_type": "some_new_adapter"}, "nodes": {}}))
+    assert DBTLineageTracer(str(tmp_path / "compiled"), manifest_path=str(manifest)).dialect == "snowflake"
+    with pytest.raises(ValueError):
+        DBTLineageTracer(str(tmp_path / "compiled"), manifest_path=str(manifest), dialect="snowfalke")
+
+
+def test_lineage_diff_reports_changed_edges_and_impact(tmp_path):
+    base_dir = tmp_path / "base"
+    shutil.copytree(COMPILED_DIR, base_dir)
+    head_dir = tmp_path / "head"
+    shutil.copytree(COMPILED_DIR, head_dir)
+    summary_file = head_dir / "order" / "customer_order_summary.sql"
+    summary_file.write_text(summary_file.read_text().replace("customer_lifetime_value", "customer_lifetime_value_v2", 1))
+
+    base = DBTLineageTracer(str(base_dir), manifest_path=str(MANIFEST_PATH))
+    head = DBTLineageTracer(str(head_dir), manifest_path=str(MANIFEST_PATH))
+    diff = diff_lineage(base, head)
+
+    assert diff["models"] == {"added": [], "removed": [], "changed": ["customer_order_summary"]}
+    assert diff["summary"]["edges_added"] + diff["summary"]["edges_removed"] + diff["summary"]["edges_changed"] > 0
+    assert all(edge["table"] == "customer_order_summary" for kind in diff["edges"].values() for edge in kind)
+    # Only the changed model was analysed on the base side, and on the head side only the models downstream of it
+    assert set(base.analysis_cache) == {"customer_order_summary"}
+    assert "customer_order_summary" in head.analysis_cache and len(head.analysis_cache) < len(head.table_to_file_map)
+    assert any(column.startswith("fct_customer_orders.") for columns in diff["impacted_columns"].values() for column in columns)
+
+    # The impact matches the one computed from the full head project graph
+    full_head = DBTLineageTracer(str(head_dir), manifest_path=str(MANIFEST_PATH))
+    full_head.build_project_lineage_graph()
+    assert diff_lineage(DBTLineageTracer(str(base_dir), manifest_path=str(MANIFEST_PATH)), full_head)["impacted_columns"] == diff["impacted_columns"]
+
+
+def test_bounded_trace_marks_frontier_whatever_was_memoized():
+    tracer = make_tracer()
+    bounded = tracer.trace_column_lineage_across_files("fct_customer_orders", "customer_segment", max_depth=1)
+    assert bounded["truncated"] is True
+    assert {node["reason"] for node in bounded["frontier"]} == {"max_depth"}
+    assert all(node["table"] == "wrk_orders_final" for node in bounded["frontier"])
+
+    full = tracer.trace_column_lineage_across_files("fct_customer_orders", "customer_segment")
+    assert "truncated" not in full
+    assert "wrk_orders_final" in get_upstream_tables(full)
+
+    # Limits still apply once the full lineage is memoized
+    again = tracer.trace_column_lineage_across_files("fct_customer_orders", "customer_segment", max_depth=1)
+    assert again["frontier"] == bounded["frontier"]
+    stopped = tracer.trace_column_lineage_across_files("fct_customer_orders", "customer_segment", stop_at_layers=["wrk_"])
+    assert {node["reason"] for node in stopped["frontier"]} == {"stop_at_layer"}
+    assert "stg_orders" not in get_upstream_tables(stopped)
+    technical_context = build_comprehensive_technical_context(make_tracer(), "fct_customer_orders", "customer_segment",
+                                                              {"stop_at_layers": ["work"]})
+    assert technical_context["summary"]["truncated_frontier"]
+    assert "TRACE TRUNCATED" in format_context_for_llm(technical_context)
+
+
+def test_lineage_edge_iterator_is_lazy_and_matches_graph():
+    tracer = make_tracer()
+    edges = tracer.iter_lineage_edges("fct_customer_orders", "customer_segment")
+    first = next(edges)
+    assert first["depth"] == 1 and first["upstream_table"] == "customer_order_summary"
+    assert set(tracer.analysis_cache) == {"fct_customer_orders"}
+
+    all_edges = [first] + list(edges)
+    assert [edge["depth"] for edge in all_edges] == sorted(edge["depth"] for edge in all_edges)
+    upstream = {(node["table"], node["column"]) for node in make_tracer().get_upstream_columns("fct_customer_orders", "customer_segment")}
+    assert {(edge["upstream_table"], edge["upstream_column"]) for edge in all_edges} == upstream
+
+    pruned = list(make_tracer().iter_lineage_edges(
+        "fct_customer_orders", "customer_segment", on_edge=lambda edge: edge["upstream_table"] != "wrk_orders_final"))
+    assert max(edge["depth"] for edge in pruned) == 2
+
+
+def test_lineage_edge_iterator_uses_each_union_branch_expression(tmp_path):
+    write_models(tmp_path / "compiled", {
+        "stg_web": "select id, amount from raw_db.public.web_orders",
+        "stg_shop": "select id, price from raw_db.public.shop_orders",
+        "fct_orders": """
+            select w.id, w.amount as revenue from ph_db.staging.stg_web w
+            union all
+            select s.id, s.price * 2 as revenue from ph_db.staging.stg_shop s
+        """,
+    })
+    tracer = DBTLineageTracer(str(tmp_path / "compiled"), manifest_path=str(tmp_path / "missing.json"))
+    edges = {edge["upstream_table"]: edge for edge in tracer.iter_lineage_edges("fct_orders", "revenue", max_depth=1)}
+    assert edges["stg_web"]["expression"] == "w.amount AS revenue"
+    assert edges["stg_shop"]["expression"] == "s.price * 2 AS revenue"
+    assert edges["stg_shop"]["transformation_type"] == "calculated"
+
+    graph = tracer.get_lineage_graph()
+    assert {edge["table"]: edge["expression"] for edge in graph.get_upstream_edges("fct_orders", "revenue")} == {
+        table: edge["expression"] for table, edge in edges.items()
+    }
+
+
+def test_identifier_prescan_skips_models_that_cannot_reference_the_column():
+    scan = scan_identifiers("""
+        -- legacy_amount was dropped
+        select o.order_id, count(*) as "Order Count", 'skipped_value' as label, a * b as product
+        from ph_db.staging.stg_orders o
+    """)
+    assert scan.mentions("ORDER_ID") and scan.mentions("order count") and scan.mentions("stg_orders")
+    assert not scan.mentions("legacy_amount") and not scan.mentions("skipped_value")
+    assert not scan.has_star and scan_identifiers("select o.* from t o").has_star
+    assert scan_identifiers("select top 10 * from t").has_star
+    assert scan_identifiers("select distinct on (a) * from t").has_star
+    assert not scan_identifiers("select a * b, 2 * (c + 1), count(*) from t").has_star
+
+    full = make_tracer()
+    full.get_lineage_graph()
+    lazy = make_tracer()
+    assert lazy.trace_column_impact("stg_orders", "order_amount") == full.trace_column_impact("stg_orders", "order_amount")
+    assert len(lazy.analysis_cache) < len(lazy.table_to_file_map) // 2
+
+    tracer = make_tracer()
+    missing = tracer.trace_column_lineage_across_files("fct_customer_orders", "no_such_column")
+    assert "not found" in missing["error"] and not tracer.analysis_cache
@@ -0,0 +1,106 @@
+import json
+import shutil
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from column_catalog import DBT_SNAPSHOT_COLUMNS
+from dbt_lineage_tracer import DBTLineageTracer
+from lineage_server import LineageService, create_server
+
+BASE_DIR = Path(__file__).parent
+COMPILED_DIR = BASE_DIR / "target" / "compiled"
+MANIFEST_PATH = BASE_DIR / "target" / "manifest.json"
+
+
+def get_json(base_url, path):
+    try:
+        with urllib.request.urlopen(base_url + path) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_server_answers_from_warm_tracer_and_hot_reloads(tmp_path):
+    compiled_copy = tmp_path / "compiled"
+    shutil.copytree(COMPILED_DIR, compiled_copy)
+    tracer = DBTLineageTracer(str(compiled_copy), manifest_path=str(MANIFEST_PATH))
+    service = LineageService(tracer, reload_interval=3600)
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        status, trace = get_json(base_url, "/trace?table=fct_customer_orders&column=customer_segment")
+        assert status == 200 and trace["table"] == "fct_customer_orders"
+
+        status, bounded = get_json(base_url, "/trace?table=fct_customer_orders&column=customer_segment&stop_at=work")
+        assert status == 200 and bounded["truncated"] and bounded["frontier"][0]["reason"] == "stop_at_layer"
+
+        status, impact = get_json(base_url, "/impact?table=stg_orders&column=order_amount")
+        assert status == 200 and "fct_customer_orders" in impact["impacted_tables"]
+
+        status, context = get_json(base_url, "/llm_context?table=fct_customer_orders&column=customer_segment")
+        assert status == 200 and "customer_segment" in context["context"]
+
+        assert get_json(base_url, "/trace?table=fct_customer_orders")[0] == 400
+        assert get_json(base_url, "/nope")[0] == 404
+
+        fct_file = compiled_copy / "order" / "fct_customer_orders.sql"
+        fct_file.write_text(fct_file.read_text().replace("co.avg_order_value,", "co.avg_order_value,\n        co.total_revenue / 2 as half_revenue,"))
+        status, changes = get_json(base_url, "/reload")
+        assert status == 200 and changes["changed"] == ["fct_customer_orders"]
+
+        status, impact = get_json(base_url, "/impact?table=customer_order_summary&column=total_revenue")
+        assert "half_revenue" in impact["impacted_tables"]["fct_customer_orders"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server_requests_after_a_manifest_refresh_use_the_new_manifest(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    shutil.copy(MANIFEST_PATH, manifest)
+    state_file = tmp_path / "lineage_state.json"
+    tracer = DBTLineageTracer(str(COMPILED_DIR), manifest_path=str(manifest), state_file=str(state_file))
+    service = LineageService(tracer, reload_interval=3600)
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        assert tracer.dialect == "snowflake" and tracer.model_state["wrk_orders_online"]["manifest_checksum"] is None
+        data = json.loads(manifest.read_text())
+        data["metadata"]["adapter_type"] = "postgres"
+        data["nodes"]["model.ph_idea_core.wrk_orders_online"]["checksum"] = {"name": "sha256", "checksum": "changed"}
+        manifest.write_text(json.dumps(data))
+
+        status, changes = get_json(base_url, "/reload")
+        assert status == 200 and changes["manifest_changed"]
+        assert tracer.dialect == "postgres"
+        assert tracer.model_state["wrk_orders_online"]["manifest_checksum"] == "changed"
+
+        status, trace = get_json(base_url, "/trace?table=fct_order&column=order_amount")
+        assert status == 200 and trace["type"] == "intermediate"
+
+        # Malformed requests are rejected up front; errors inside a handler are server errors
+        assert get_json(base_url, "/trace?table=fct_order&column=order_amount&max_dept=1")[0] == 400
+        assert get_json(base_url, "/trace?table=fct_order&column=order_amount&max_depth=one")[0] == 400
+
+        def broken_impact(table, column):
+            raise KeyError(column)
+
+        service.impact = broken_impact
+        assert get_json(base_url, "/impact?table=stg_orders&column=order_amount")[0] == 500
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Snapshot columns computed for the schema-aware catalog follow the new manifest too
+    schema_aware = DBTLineageTracer(str(COMPILED_DIR), manifest_path=str(manifest), schema_aware=True)
+    assert schema_aware.column_catalog.get("snp_orders") != schema_aware.column_catalog.get("wrk_customers") | DBT_SNAPSHOT_COLUMNS
+    data["nodes"]["snapshot.ph_idea_core.snp_orders"]["depends_on"]["nodes"] = ["model.ph_idea_core.wrk_customers"]
+    manifest.write_text(json.dumps(data))
+    schema_aware.reload_manifest()
+    assert schema_aware.column_catalog.get("snp_orders") == schema_aware.column_catalog.get("wrk_customers") | DBT_SNAPSHOT_COLUMNS